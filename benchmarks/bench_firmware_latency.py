@@ -0,0 +1,108 @@
+"""
+Replay randomized, bouncy pedal traces through the firmware simulator and
+report press/release latency distributions and debounce correctness.
+
+Each trace drives six pedals (GP0-GP5, keys A-F) with random presses; six
+stays within the rollover limit of the 8-byte keyboard report. A
+press counts as missed if no HID press arrives before the physical release,
+extra if bounce produced more than one HID press, and stuck if a key is still
+down when the trace ends.
+
+    python -m benchmarks.bench_firmware_latency [--traces 200] [--engine keypad]
+        [--hid raw] [--seed 1] [--max-p99-ms 30]
+
+Exits with status 1 if any press is missed, duplicated or stuck, or when the
+p99 press latency exceeds --max-p99-ms, so it can gate CI.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from config.action_config import SCAN_ENGINES, HID_MODES
+from config.keycode_map import HID_KEYCODES
+from firmware_sim import FirmwareSimulator, check_presses, keyboard_transitions, random_presses
+
+PEDALS = [("GP{}".format(i), chr(ord("A") + i)) for i in range(6)]
+TRACE_MS = 1500
+SETTLE_MS = 100
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_trace(seed, settings):
+    rng = random.Random(seed)
+    duration_us = TRACE_MS * 1000
+    traces = {}
+    expected = {}
+    for pin, key in PEDALS:
+        edges, presses = random_presses(rng, duration_us - SETTLE_MS * 1000)
+        traces[pin] = edges
+        expected[HID_KEYCODES[key]] = presses
+
+    config = {"settings": settings, "buttons": [[pin, "key", key] for pin, key in PEDALS]}
+    sim = FirmwareSimulator({"config.json": json.dumps(config)}, TRACE_MS, traces=traces)
+    transitions = keyboard_transitions(sim.run())
+
+    results = []
+    for code, presses in expected.items():
+        own = [item for item in transitions if item[1] == code]
+        results.append(check_presses(presses, own))
+    return results
+
+
+def summarize(label, results, elapsed):
+    press = [us / 1000 for r in results for us in r["press_latency"]]
+    release = [us / 1000 for r in results for us in r["release_latency"]]
+    missed = sum(r["missed"] for r in results)
+    extra = sum(r["extra"] for r in results)
+    stuck = sum(r["stuck"] for r in results)
+    print("{}: {} presses in {:.1f} s".format(label, len(press) + missed, elapsed))
+    for name, values in (("press", press), ("release", release)):
+        print("  {:<8} p50 {:6.2f} ms  p95 {:6.2f} ms  p99 {:6.2f} ms  max {:6.2f} ms".format(
+            name,
+            percentile(values, 0.50),
+            percentile(values, 0.95),
+            percentile(values, 0.99),
+            max(values) if values else 0.0,
+        ))
+    print("  missed {}  extra {}  stuck {}".format(missed, extra, stuck))
+    return percentile(press, 0.99), missed + extra + stuck
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--traces", type=int, default=200)
+    parser.add_argument("--engine", choices=SCAN_ENGINES + ("all",), default="all")
+    parser.add_argument("--hid", choices=HID_MODES, default="raw")
+    parser.add_argument("--debounce-ms", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    engines = SCAN_ENGINES if args.engine == "all" else (args.engine,)
+    failed = False
+    for engine in engines:
+        settings = {"scan": engine, "hid": args.hid, "debounce_ms": args.debounce_ms}
+        started = time.perf_counter()
+        results = []
+        for index in range(args.traces):
+            results.extend(run_trace(args.seed * 100003 + index, settings))
+        p99, errors = summarize(
+            "{} / {} HID, {} traces".format(engine, args.hid, args.traces),
+            results,
+            time.perf_counter() - started,
+        )
+        if errors or (args.max_p99_ms is not None and p99 > args.max_p99_ms):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Compare the SQLite preset store with one JSON file per preset.
+
+Creates N generated presets with each backend in a temporary directory and
+times: writing them all, listing names cold, loading every preset, matching a
+config to its preset without and then with a saved index, and saving one
+more preset.
+
+    python -m benchmarks.bench_preset_store [--presets 10000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from config.action_config import CONSUMER_CONTROL_OPTIONS, normalize_config
+from config.preset_db import SqlitePresetStore
+from config.preset_index import PresetIndex
+
+KEYS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def make_preset(rng):
+    config = []
+    for pin in range(rng.randint(2, 8)):
+        kind = rng.choice(("key", "cmb", "ccc"))
+        if kind == "key":
+            value = rng.choice(KEYS)
+        elif kind == "cmb":
+            value = ["CONTROL", rng.choice(("SHIFT", "ALT")), rng.choice(KEYS)]
+        else:
+            value = rng.choice(CONSUMER_CONTROL_OPTIONS)[0]
+        config.append(["GP{}".format(pin), kind, value])
+    return config
+
+
+def read_preset_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return normalize_config(json.load(f))
+
+
+def time_ms(function):
+    started = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def bench_files(directory, presets):
+    """The file backend as preset_manager implements it, without its in-process caches."""
+    os.makedirs(directory)
+
+    def write_all():
+        for name, config in presets:
+            path = os.path.join(directory, name + ".json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(normalize_config(config, strict=True), f, indent=4)
+            os.replace(path + ".tmp", path)
+
+    def list_names():
+        return sorted(f[:-5] for f in os.listdir(directory) if f.endswith(".json"))
+
+    def load_all():
+        return [read_preset_file(os.path.join(directory, name + ".json")) for name in list_names()]
+
+    def find_cold():
+        # No saved index yet: every preset is parsed once
+        return PresetIndex(directory, read_preset_file).find(presets[-1][1])
+
+    def save_one():
+        path = os.path.join(directory, "extra.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(normalize_config(presets[0][1], strict=True), f, indent=4)
+        os.replace(path + ".tmp", path)
+
+    def find_warm():
+        # A new process reading the index saved by find_cold()
+        return PresetIndex(directory, read_preset_file).find(presets[-1][1])
+
+    return [
+        ("write all", time_ms(write_all)[0]),
+        ("list names", time_ms(list_names)[0]),
+        ("load all", time_ms(load_all)[0]),
+        ("match (cold)", time_ms(find_cold)[0]),
+        ("match (index)", time_ms(find_warm)[0]),
+        ("save one", time_ms(save_one)[0]),
+    ]
+
+
+def bench_sqlite(path, presets):
+    store = SqlitePresetStore(path)
+    try:
+        results = [
+            ("write all", time_ms(lambda: store.save_presets(presets))[0]),
+            ("list names", time_ms(store.list_presets)[0]),
+            ("load all", time_ms(lambda: [store.load_preset(name) for name in store.list_presets()])[0]),
+        ]
+        store.close()
+        store = SqlitePresetStore(path)
+        results.append(("match (cold)", time_ms(lambda: store.find(presets[-1][1]))[0]))
+        results.append(("match (index)", time_ms(lambda: store.find(presets[-1][1]))[0]))
+        results.append(("save one", time_ms(lambda: store.save_preset("extra", presets[0][1]))[0]))
+        return results
+    finally:
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--presets", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    presets = [("preset-{:05d}".format(i), make_preset(rng)) for i in range(args.presets)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = bench_files(os.path.join(tmp, "presets"), presets)
+        sqlite = bench_sqlite(os.path.join(tmp, "presets.db"), presets)
+
+    print("{} presets".format(args.presets))
+    print("{:<14} {:>12} {:>12}".format("", "files", "sqlite"))
+    for (name, files_ms), (_, sqlite_ms) in zip(files, sqlite):
+        print("{:<14} {:>9.1f} ms {:>9.1f} ms".format(name, files_ms, sqlite_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Compare the framed control protocol with the line-based text stream.
+
+Both directions run over a pseudo-terminal pair so the numbers include real
+read()/write() syscalls. The "device" side runs in a thread.
+
+    python -m benchmarks.bench_protocol [--events 20000] [--round-trips 2000]
+"""
+import argparse
+import os
+import select
+import statistics
+import struct
+import threading
+import time
+import tty
+
+from pico_serial.protocol import EVENT, PING, RESPONSE_FLAG, FrameDecoder, encode_frame, schema
+
+
+def open_pty():
+    host_fd, device_fd = os.openpty()
+    tty.setraw(host_fd)
+    tty.setraw(device_fd)
+    return host_fd, device_fd
+
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def read_some(fd, size=65536):
+    select.select([fd], [], [])
+    return os.read(fd, size)
+
+
+# ---------------------------------------------------------------------------
+# Event stream throughput
+
+
+def text_events(count):
+    return [f"event {i % 8} {i % 2} {i * 7}\r\n".encode("ascii") for i in range(count)]
+
+
+def framed_events(count):
+    return [
+        encode_frame(EVENT, 0, struct.pack(schema.EVENT_FORMAT, i % 8, i % 2, i * 7))
+        for i in range(count)
+    ]
+
+
+def parse_text_stream(fd, count):
+    buffer = b""
+    parsed = 0
+    while parsed < count:
+        buffer += read_some(fd)
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            text = line.decode("utf-8", errors="ignore").strip()
+            if text:
+                _, key, pressed, stamp = text.split(" ")
+                int(key), int(pressed), int(stamp)
+                parsed += 1
+
+
+def parse_framed_stream(fd, count):
+    decoder = FrameDecoder()
+    parsed = 0
+    while parsed < count:
+        for _, _, body in decoder.feed(read_some(fd)):
+            struct.unpack(schema.EVENT_FORMAT, body)
+            parsed += 1
+
+
+def bench_stream(name, messages, parse):
+    host_fd, device_fd = open_pty()
+    payload = b"".join(messages)
+    writer = threading.Thread(target=write_all, args=(device_fd, payload))
+    start = time.perf_counter()
+    writer.start()
+    parse(host_fd, len(messages))
+    elapsed = time.perf_counter() - start
+    writer.join()
+    os.close(host_fd)
+    os.close(device_fd)
+    print(
+        f"{name:>8} stream: {len(messages) / elapsed:10.0f} events/s, "
+        f"{len(payload) / len(messages):5.1f} bytes/event"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Request/response round trip
+
+
+def text_device(fd, count):
+    buffer = b""
+    answered = 0
+    while answered < count:
+        buffer += read_some(fd)
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            write_all(fd, b"ok " + line.strip() + b"\r\n")
+            answered += 1
+
+
+def framed_device(fd, count):
+    decoder = FrameDecoder()
+    answered = 0
+    while answered < count:
+        for message_type, sequence, body in decoder.feed(read_some(fd)):
+            write_all(fd, encode_frame(message_type | RESPONSE_FLAG, sequence, body))
+            answered += 1
+
+
+def text_request(fd, index, state):
+    write_all(fd, b"ping %d\n" % index)
+    while b"\n" not in state["buffer"]:
+        state["buffer"] += read_some(fd)
+    line, state["buffer"] = state["buffer"].split(b"\n", 1)
+    assert line.decode("utf-8").strip() == f"ok ping {index}"
+
+
+def framed_request(fd, index, state):
+    sequence = index & 0xFF
+    write_all(fd, encode_frame(PING, sequence, b"%d" % index))
+    while True:
+        for message_type, reply_sequence, _ in state["decoder"].feed(read_some(fd)):
+            if message_type == PING | RESPONSE_FLAG and reply_sequence == sequence:
+                return
+
+
+def bench_round_trip(name, device, request, count):
+    host_fd, device_fd = open_pty()
+    thread = threading.Thread(target=device, args=(device_fd, count), daemon=True)
+    thread.start()
+    state = {"buffer": b"", "decoder": FrameDecoder()}
+    samples = []
+    for index in range(count):
+        start = time.perf_counter()
+        request(host_fd, index, state)
+        samples.append((time.perf_counter() - start) * 1e6)
+    thread.join(timeout=1)
+    os.close(host_fd)
+    os.close(device_fd)
+    samples.sort()
+    print(
+        f"{name:>8} round trip: median {statistics.median(samples):7.1f} us, "
+        f"p95 {samples[int(len(samples) * 0.95)]:7.1f} us, "
+        f"p99 {samples[int(len(samples) * 0.99)]:7.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--round-trips", type=int, default=2000)
+    args = parser.parse_args()
+
+    bench_stream("text", text_events(args.events), parse_text_stream)
+    bench_stream("framed", framed_events(args.events), parse_framed_stream)
+    bench_round_trip("text", text_device, text_request, args.round_trips)
+    bench_round_trip("framed", framed_device, framed_request, args.round_trips)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compare the chunked SerialReader with the previous readline() loop.
+
+A thread plays the Pico and writes log lines into a pseudo-terminal as fast
+as it can; the reader under test opens the other end with pyserial. Reports
+lines per second end to end and how long stop() takes on an idle port.
+
+    python -m benchmarks.bench_serial_reader [--lines 50000] [--batch 100]
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+import tty
+
+import serial
+
+from pico_serial.serial_reader import SerialReader
+
+
+def open_pty():
+    device_fd, host_fd = os.openpty()
+    tty.setraw(device_fd)
+    tty.setraw(host_fd)
+    return device_fd, os.ttyname(host_fd), host_fd
+
+
+LINE = b"stats actions=123 reports=246 reports_per_action=2.00\r\n"
+
+
+def write_lines(fd, count, batch):
+    line = LINE
+    chunk = line * batch
+    sent = 0
+    while sent < count:
+        size = min(batch, count - sent)
+        data = chunk if size == batch else line * size
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        sent += size
+
+
+class ReadlineReader:
+    """The reader before the rewrite: readline() with a 1 s timeout, decode per line."""
+
+    def __init__(self, port):
+        self.ser = serial.Serial(port, 115200, timeout=1)
+        self.q = queue.Queue()
+        self.running = True
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.thread.start()
+
+    def _read_loop(self):
+        while self.running:
+            try:
+                line = self.ser.readline().decode("utf-8", errors="ignore").strip()
+                if line:
+                    self.q.put(line)
+            except Exception:
+                self.running = False
+
+    def get_lines(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self.q.get_nowait())
+            except queue.Empty:
+                return lines
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.ser.close()
+
+
+def run(name, make_reader, count, batch):
+    device_fd, port, host_fd = open_pty()
+    reader = make_reader(port)
+    started = time.perf_counter()
+    writer = threading.Thread(target=write_lines, args=(device_fd, count, batch), daemon=True)
+    writer.start()
+
+    received = 0
+    while received < count:
+        received += len(reader.get_lines())
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - started
+    writer.join()
+
+    # Idle port: measure how long shutdown waits for the reader thread.
+    time.sleep(0.2)
+    stop_started = time.perf_counter()
+    reader.stop()
+    stop_ms = (time.perf_counter() - stop_started) * 1000
+    os.close(device_fd)
+    os.close(host_fd)
+
+    print("{:<9} {:>10.0f} lines/s  {:>6.1f} MB/s  stop {:7.1f} ms".format(
+        name, count / elapsed, count * len(LINE) / elapsed / 1e6, stop_ms))
+
+
+def start_serial_reader(port):
+    reader = SerialReader(port, capacity=10 ** 7)
+    reader.start()
+    return reader
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--batch", type=int, default=100, help="lines per write() on the device side")
+    args = parser.parse_args()
+
+    run("readline", ReadlineReader, args.lines, args.batch)
+    run("chunked", start_serial_reader, args.lines, args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import hashlib
+import json
+
 from config.keycode_map import translate_keys
 
 CONSUMER_CONTROL_OPTIONS = [
@@ -17,6 +20,47 @@ CONSUMER_CONTROL_OPTIONS = [
 CONSUMER_CONTROL_LABELS = dict(CONSUMER_CONTROL_OPTIONS)
 CONSUMER_CONTROL_NAMES = set(CONSUMER_CONTROL_LABELS)
 
+# ConsumerControlCode name → HID usage ID, mirroring adafruit_hid.consumer_control_code
+CONSUMER_CONTROL_CODES = {
+    "PLAY_PAUSE": 0xCD,
+    "PLAY": 0xB0,
+    "PAUSE": 0xB1,
+    "STOP": 0xB7,
+    "MUTE": 0xE2,
+    "VOLUME_INCREMENT": 0xE9,
+    "VOLUME_DECREMENT": 0xEA,
+    "SCAN_NEXT_TRACK": 0xB5,
+    "SCAN_PREVIOUS_TRACK": 0xB6,
+    "FAST_FORWARD": 0xB3,
+    "REWIND": 0xB4,
+}
+
+# Firmware-wide options stored next to the button list in the device config.json
+SCAN_ENGINES = ("keypad", "poll")
+HID_MODES = ("raw", "adafruit")
+DEVICE_SETTING_CHOICES = {
+    "scan": SCAN_ENGINES,
+    "hid": HID_MODES,
+}
+DEVICE_SETTING_NAMES = (
+    "scan",
+    "hid",
+    "debounce_ms",
+    "poll_interval_ms",
+    "scan_interval_ms",
+    "stats_every",
+    "telemetry_ms",
+    "pin_debounce_ms",
+)
+# Settings holding a {pin: whole number} map instead of a single value
+DEVICE_PIN_SETTINGS = ("pin_debounce_ms",)
+
+# Optional per-pin options, stored as a 4th element of a config entry:
+# ["GP0", "key", "A", {"debounce": "eager", "press_lockout_ms": 30, "release_lockout_ms": 5}]
+DEBOUNCE_MODES = ("window", "eager")
+LOCKOUT_OPTIONS = ("press_lockout_ms", "release_lockout_ms")
+ENTRY_OPTION_NAMES = ("debounce",) + LOCKOUT_OPTIONS
+
 
 def normalize_consumer_control(value):
     """Normalize one ConsumerControlCode name and validate it."""
@@ -26,16 +70,62 @@ def normalize_consumer_control(value):
     return normalized
 
 
+def normalize_entry_options(options, strict=False):
+    """
+    Validate the per-pin options of a config entry.
+
+    Lockouts only apply to the eager debounce mode. In non-strict mode unknown
+    options are dropped and lockouts without eager mode are ignored.
+    """
+    if not isinstance(options, dict):
+        raise ValueError("Pin options must be an object: {}".format(options))
+
+    normalized = {}
+    for name, value in options.items():
+        if name not in ENTRY_OPTION_NAMES:
+            if strict:
+                raise ValueError("Unsupported pin option: {}".format(name))
+            continue
+        if name == "debounce":
+            value = str(value).strip().lower()
+            if value not in DEBOUNCE_MODES:
+                raise ValueError("Unsupported debounce mode: {}".format(value))
+        else:
+            value = normalize_whole_number(name, value)
+        normalized[name] = value
+
+    if normalized.get("debounce") != "eager":
+        lockouts = [name for name in LOCKOUT_OPTIONS if name in normalized]
+        if lockouts and strict:
+            raise ValueError("'{}' requires \"debounce\": \"eager\".".format(lockouts[0]))
+        for name in lockouts:
+            del normalized[name]
+    if normalized.get("debounce") == "window":
+        # The default mode needs no options at all.
+        del normalized["debounce"]
+    return normalized
+
+
 def normalize_config_entry(entry, strict=False):
     """
-    Normalize one config entry to the canonical shape [pin, type, value].
+    Normalize one config entry to the canonical shape [pin, type, value],
+    or [pin, type, value, options] when it carries per-pin options.
 
     In non-strict mode old or slightly inconsistent data is coerced into the
     closest valid representation. In strict mode invalid user input raises.
     """
-    if not isinstance(entry, list) or len(entry) != 3:
+    if not isinstance(entry, list) or len(entry) not in (3, 4):
         raise ValueError("Invalid config entry: {}".format(entry))
 
+    options = normalize_entry_options(entry[3], strict=strict) if len(entry) == 4 else {}
+    normalized = normalize_entry_action(entry, strict)
+    if options:
+        normalized.append(options)
+    return normalized
+
+
+def normalize_entry_action(entry, strict):
+    """Normalize the [pin, type, value] part of a config entry."""
     pin = str(entry[0]).strip().upper()
     action_type = str(entry[1]).strip().lower()
     value = entry[2]
@@ -80,3 +170,85 @@ def normalize_config_entry(entry, strict=False):
 def normalize_config(config, strict=False):
     """Normalize a whole pedal configuration."""
     return [normalize_config_entry(entry, strict=strict) for entry in config]
+
+
+def canonical_config_bytes(config):
+    """
+    Serialize a normalized configuration in one fixed form (sorted keys, no
+    whitespace), so equal configurations always give equal bytes.
+
+    Uses the non-strict normalization of load_config() and load_preset(), so
+    any config the app loads can be hashed and compared; strict validation
+    belongs to saving from the editor.
+    """
+    return json.dumps(normalize_config(config), sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def config_hash(config):
+    """SHA-256 hex digest of canonical_config_bytes()."""
+    return hashlib.sha256(canonical_config_bytes(config)).hexdigest()
+
+
+def normalize_device_settings(settings):
+    """Validate the optional firmware settings block of a device config.json."""
+    if not isinstance(settings, dict):
+        raise ValueError("Device settings must be an object: {}".format(settings))
+
+    normalized = {}
+    for name, value in settings.items():
+        if name not in DEVICE_SETTING_NAMES:
+            raise ValueError("Unsupported device setting: {}".format(name))
+        if name in DEVICE_SETTING_CHOICES:
+            value = str(value).strip().lower()
+            if value not in DEVICE_SETTING_CHOICES[name]:
+                raise ValueError("Unsupported value for '{}': {}".format(name, value))
+        elif name in DEVICE_PIN_SETTINGS:
+            value = normalize_pin_setting(name, value)
+        else:
+            value = normalize_whole_number(name, value)
+        normalized[name] = value
+    return normalized
+
+
+def normalize_whole_number(name, value):
+    """Validate one non-negative integer setting."""
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Setting '{}' must be a whole number.".format(name))
+    if value < 0:
+        raise ValueError("Setting '{}' cannot be negative.".format(name))
+    return value
+
+
+def normalize_pin_setting(name, value):
+    """Validate a {pin: whole number} setting such as pin_debounce_ms."""
+    if not isinstance(value, dict):
+        raise ValueError("Setting '{}' must map pin names to numbers.".format(name))
+    normalized = {}
+    for pin, pin_value in value.items():
+        pin = str(pin).strip().upper()
+        if not pin:
+            raise ValueError("Setting '{}' has an empty pin name.".format(name))
+        normalized[pin] = normalize_whole_number("{}.{}".format(name, pin), pin_value)
+    return normalized
+
+
+def split_device_config(raw_config):
+    """
+    Split a device config.json into (settings, entries).
+
+    The firmware accepts either a plain list of entries or an object of the
+    form {"settings": {...}, "buttons": [...]}.
+    """
+    if isinstance(raw_config, dict):
+        settings = normalize_device_settings(raw_config.get("settings", {}))
+        return settings, raw_config.get("buttons", [])
+    return {}, raw_config
+
+
+def build_device_config(entries, settings=None):
+    """Build the device config.json payload, keeping the plain list form when possible."""
+    if not settings:
+        return entries
+    return {"settings": settings, "buttons": entries}
@@ -0,0 +1,118 @@
+import os
+import threading
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Cached configs are read-only; use thaw() to get an editable copy.")
+
+
+class FrozenList(list):
+    """A list that refuses to change, so a cached config cannot be edited in place."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+class FrozenDict(dict):
+    """A dict that refuses to change; see FrozenList."""
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    pop = popitem = clear = update = setdefault = _read_only
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze(value):
+    """Return a read-only copy of nested lists and dicts. JSON and == work as before."""
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    return value
+
+
+def thaw(value):
+    """Return an editable copy of a frozen config."""
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    return value
+
+
+def file_signature(path):
+    """(mtime_ns, size, inode) of a file; raises OSError if it cannot be stat'ed."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class StatCache:
+    """
+    Parsed files kept in memory while their (mtime_ns, size, inode) is unchanged.
+
+    Values are frozen, so every caller can share the same object. Atomic
+    writes replace the file, which changes the inode, so an external editor
+    saving a file is noticed even within one mtime tick.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, load):
+        """Return the cached value for ``path``, calling ``load(path)`` when the file changed."""
+        key = os.path.abspath(path)
+        signature = file_signature(path)
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is not None and cached[0] == signature:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+        value = freeze(load(path))
+        with self.lock:
+            self.entries[key] = (signature, value)
+        return value
+
+    def put(self, path, value):
+        """Record what we just wrote to ``path`` so the next read needs no parse."""
+        key = os.path.abspath(path)
+        try:
+            signature = file_signature(path)
+        except OSError:
+            self.invalidate(path)
+            return
+        frozen = freeze(value)
+        with self.lock:
+            self.entries[key] = (signature, frozen)
+
+    def invalidate(self, path=None):
+        """Forget one file, or everything."""
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(os.path.abspath(path), None)
+
+    def stats(self):
+        """Hit and miss counters and the number of cached files."""
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
@@ -1,6 +1,8 @@
 import json
 import os
 from config.action_config import normalize_config
+from config.config_cache import StatCache, freeze
+from config.history import CONFIG_TARGET, record_baselines_quietly, record_quietly
 
 # Path to the main configuration file
 CONFIG_PATH = "config/config.json"
@@ -11,12 +13,23 @@ DEFAULT_CONFIG = [
     ["GP1", "cmb", ["GUI", "TAB"]],
 ]
 
+# Parsed config.json, reused until the file changes on disk
+CONFIG_CACHE = StatCache()
+
 
 def load_config():
-    """Load configuration from file or return default config if missing."""
+    """
+    Load configuration from file or return default config if missing.
+    The result is read-only and shared; use config_cache.thaw() to edit it.
+    """
     if not os.path.exists(CONFIG_PATH):
-        return normalize_config(DEFAULT_CONFIG)
-    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        return freeze(normalize_config(DEFAULT_CONFIG))
+    return CONFIG_CACHE.get(CONFIG_PATH, read_config_file)
+
+
+def read_config_file(path):
+    """Parse and normalize a config file, bypassing the cache."""
+    with open(path, "r", encoding="utf-8") as f:
         return normalize_config(json.load(f))
 
 
@@ -25,9 +38,35 @@ def save_config(cfg):
     Save configuration to config.json using an atomic write.
     Writes to a temporary file first, then replaces the original.
     """
-    os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
     normalized = normalize_config(cfg, strict=True)
+    record_baselines_quietly([CONFIG_TARGET], lambda target: current_config_file())
+    write_config_text(json.dumps(normalized, indent=4), normalized)
+    record_quietly([(CONFIG_TARGET, normalized)])
+
+
+def write_config_text(text, normalized):
+    """
+    Atomically write config.json content serialized ahead of time by
+    json.dumps(normalized, indent=4), as save_config() does.
+
+    Records no history: switching presets by hotkey goes through here and
+    would otherwise push user edits out of the history.
+    """
+    os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
     tmp = CONFIG_PATH + ".tmp"
     with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(normalized, f, indent=4)
+        f.write(text)
     os.replace(tmp, CONFIG_PATH)  # atomic replace
+    CONFIG_CACHE.put(CONFIG_PATH, normalized)
+
+
+def current_config_file():
+    """The configuration config.json holds now, or None."""
+    if not os.path.exists(CONFIG_PATH):
+        return None
+    return load_config()
+
+
+def config_cache_stats():
+    """Hit/miss counters of the config.json cache."""
+    return CONFIG_CACHE.stats()
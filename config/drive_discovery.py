@@ -0,0 +1,233 @@
+import os
+import re
+import select
+import threading
+import time
+
+import psutil
+
+VOLUME_LABEL = "CIRCUITPY"
+BOOT_FILENAME = "boot_out.txt"
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+SYS_DEV_BLOCK_PATH = "/sys/dev/block"
+BY_LABEL_PATH = "/dev/disk/by-label"
+# Without mountinfo (Windows, macOS) the partition list is rescanned at most this often
+FALLBACK_TTL = 2.0
+OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+class CircuitpyDrive:
+    """A mounted CIRCUITPY volume and, when sysfs knows it, the USB identity of its board."""
+
+    def __init__(self, mountpoint, source=None, vid=None, pid=None, serial_number=None):
+        self.mountpoint = mountpoint
+        self.source = source
+        self.vid = vid
+        self.pid = pid
+        self.serial_number = serial_number
+
+    def __repr__(self):
+        return f"<CircuitpyDrive {self.mountpoint} serial={self.serial_number}>"
+
+
+def unescape_mount_field(field):
+    """mountinfo writes space, tab, newline and backslash as octal escapes (\\040 ...)."""
+    if "\\" not in field:
+        return field
+    return OCTAL_ESCAPE.sub(lambda match: chr(int(match.group(1), 8)), field)
+
+
+def parse_mountinfo(text):
+    """Yield (major:minor, mount point, filesystem type, source) for every mount."""
+    for line in text.splitlines():
+        fields = line.split()
+        try:
+            separator = fields.index("-", 6)
+        except ValueError:
+            continue
+        if len(fields) < separator + 3:
+            continue
+        yield fields[2], unescape_mount_field(fields[4]), fields[separator + 1], fields[separator + 2]
+
+
+def read_sysfs_attribute(directory, name):
+    try:
+        with open(os.path.join(directory, name), "r", encoding="ascii", errors="ignore") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def usb_identity(major_minor, sys_dev_block=SYS_DEV_BLOCK_PATH):
+    """
+    Return (vid, pid, serial number) of the USB device behind a block device,
+    or None when it is not on USB. Only sysfs is read, never the filesystem.
+    """
+    path = os.path.realpath(os.path.join(sys_dev_block, major_minor))
+    while path.startswith("/sys/devices/"):
+        vendor = read_sysfs_attribute(path, "idVendor")
+        if vendor is not None:
+            product = read_sysfs_attribute(path, "idProduct")
+            serial = read_sysfs_attribute(path, "serial")
+            try:
+                return int(vendor, 16), int(product or "0", 16), serial.upper() if serial else None
+            except ValueError:
+                return None
+        path = os.path.dirname(path)
+    return None
+
+
+def labeled_devices(by_label=BY_LABEL_PATH):
+    """Return the real paths of block devices whose volume label is CIRCUITPY..."""
+    try:
+        names = os.listdir(by_label)
+    except OSError:
+        return set()
+    return {os.path.realpath(os.path.join(by_label, name)) for name in names if name.startswith(VOLUME_LABEL)}
+
+
+def scan_mountinfo(text, by_label=BY_LABEL_PATH, sys_dev_block=SYS_DEV_BLOCK_PATH):
+    """
+    Return the CIRCUITPY drives in a mountinfo table.
+
+    A mount counts when its mount point or its device's volume label starts
+    with CIRCUITPY (automounters name the mount point after the label, with a
+    number added for the second board). Unrelated mounts are never touched.
+    """
+    labels = None
+    drives = []
+    for major_minor, mountpoint, fstype, source in parse_mountinfo(text):
+        if fstype not in ("vfat", "msdos", "fat"):
+            continue
+        if not os.path.basename(mountpoint).startswith(VOLUME_LABEL):
+            if labels is None:
+                labels = labeled_devices(by_label)
+            if os.path.realpath(source) not in labels:
+                continue
+        identity = usb_identity(major_minor, sys_dev_block) or (None, None, None)
+        drives.append(CircuitpyDrive(mountpoint, source, *identity))
+    return drives
+
+
+def scan_partitions():
+    """
+    Portable scan through psutil for systems without /proc/self/mountinfo.
+    Partitions named CIRCUITPY are taken as they are; boot_out.txt is only
+    opened on the others.
+    """
+    drives = []
+    for part in psutil.disk_partitions(all=False):
+        if VOLUME_LABEL in part.device or VOLUME_LABEL in part.mountpoint:
+            drives.append(CircuitpyDrive(part.mountpoint, part.device))
+            continue
+        try:
+            boot_file = os.path.join(part.mountpoint, BOOT_FILENAME)
+            if os.path.exists(boot_file):
+                with open(boot_file, "r", encoding="utf-8", errors="ignore") as f:
+                    if "Adafruit CircuitPython" in f.read():
+                        drives.append(CircuitpyDrive(part.mountpoint, part.device))
+        except Exception:
+            pass
+    return drives
+
+
+class DriveDiscovery:
+    """
+    Cached list of CIRCUITPY drives.
+
+    On Linux the mount table is read from /proc/self/mountinfo and the file
+    is kept open: the kernel flags it with POLLPRI when anything is mounted
+    or unmounted, so a lookup is one zero-timeout poll() until that happens.
+    Elsewhere the psutil scan is cached for FALLBACK_TTL seconds.
+    """
+
+    def __init__(self, mountinfo_path=MOUNTINFO_PATH, by_label=BY_LABEL_PATH, sys_dev_block=SYS_DEV_BLOCK_PATH):
+        self.mountinfo_path = mountinfo_path
+        self.by_label = by_label
+        self.sys_dev_block = sys_dev_block
+        self.lock = threading.Lock()
+        self.mountinfo = None
+        self.poller = None
+        self.cached = None
+        self.scanned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+
+    def drives(self):
+        """Return the CIRCUITPY drives, rescanning only after the mount table changed."""
+        with self.lock:
+            if self.cached is None or self._changed():
+                self.misses += 1
+                self.cached = self._scan()
+                self.scanned_at = time.monotonic()
+            else:
+                self.hits += 1
+            return list(self.cached)
+
+    def mountpoints(self):
+        """Return the mount points of the CIRCUITPY drives."""
+        return [drive.mountpoint for drive in self.drives()]
+
+    def find(self, mountpoint):
+        """Return the cached CircuitpyDrive mounted at ``mountpoint``, or None."""
+        for drive in self.drives():
+            if drive.mountpoint == mountpoint:
+                return drive
+        return None
+
+    def invalidate(self):
+        """Forget the cached drives; the next lookup rescans."""
+        with self.lock:
+            self.cached = None
+
+    def close(self):
+        """Close the mountinfo file."""
+        with self.lock:
+            if self.mountinfo is not None:
+                self.mountinfo.close()
+            self.mountinfo = None
+            self.poller = None
+            self.cached = None
+
+    # ------------------------------------------------------------------
+
+    def _changed(self):
+        if self.poller is not None:
+            return bool(self.poller.poll(0))
+        return time.monotonic() - self.scanned_at > FALLBACK_TTL
+
+    def _scan(self):
+        text = self._read_mountinfo()
+        if text is None:
+            return scan_partitions()
+        return scan_mountinfo(text, self.by_label, self.sys_dev_block)
+
+    def _read_mountinfo(self):
+        if self.mountinfo is None:
+            if not hasattr(select, "poll") or not os.path.exists(self.mountinfo_path):
+                return None
+            try:
+                self.mountinfo = open(self.mountinfo_path, "r", encoding="utf-8", errors="replace")
+            except OSError:
+                return None
+            self.poller = select.poll()
+            self.poller.register(self.mountinfo, select.POLLPRI | select.POLLERR)
+        # Reading the table from the start clears the pending change event.
+        self.mountinfo.seek(0)
+        return self.mountinfo.read()
+
+
+_shared_discovery = None
+_shared_discovery_lock = threading.Lock()
+
+
+def shared_discovery():
+    """Return the process-wide DriveDiscovery."""
+    global _shared_discovery
+    with _shared_discovery_lock:
+        if _shared_discovery is None:
+            _shared_discovery = DriveDiscovery()
+        return _shared_discovery
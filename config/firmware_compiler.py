@@ -0,0 +1,206 @@
+import struct
+import zlib
+
+from config.action_config import (
+    CONSUMER_CONTROL_CODES,
+    DEBOUNCE_MODES,
+    HID_MODES,
+    SCAN_ENGINES,
+    normalize_config,
+    normalize_device_settings,
+)
+from config.keycode_map import HID_KEYCODES
+
+# Name of the compiled action table on the CIRCUITPY drive
+COMPILED_FILENAME = "config.bin"
+
+# Layout (little-endian), mirrored by load_compiled_config() in firmware/code.py:
+#
+#   header  "PDLC" | version u8 | entry count u8 | scan u8 | hid u8
+#           | debounce_ms u16 | poll_interval_ms u16 | scan_interval_ms u16
+#           | stats_every u16 | telemetry_ms u16
+#           | config.json size u32 | config.json crc32 u32
+#   entry   pin name length u8 | pin name | action u8 | code count u8 | codes u16...
+#           | debounce_ms u16 (from the pin_debounce_ms setting)
+#           | debounce mode u8 | press_lockout_ms u16 | release_lockout_ms u16
+#
+# Unset settings are stored as 0xFF / 0xFFFF so the firmware keeps its defaults.
+MAGIC = b"PDLC"
+VERSION = 4
+HEADER = struct.Struct("<4sBBBBHHHHHII")
+UNSET_U8 = 0xFF
+UNSET_U16 = 0xFFFF
+
+ACTION_CODES = {"key": 1, "cmb": 2, "ccc": 3}
+ACTION_NAMES = {value: name for name, value in ACTION_CODES.items()}
+SETTING_FIELDS = ("debounce_ms", "poll_interval_ms", "scan_interval_ms", "stats_every", "telemetry_ms")
+
+
+def resolve_keycode(name):
+    """Return the HID usage ID for one adafruit_hid Keycode name."""
+    try:
+        return HID_KEYCODES[name]
+    except KeyError:
+        raise ValueError("Unknown keyboard key: {}".format(name))
+
+
+def compile_entry(entry, debounce_ms=UNSET_U16):
+    """Encode one normalized [pin, type, value(, options)] entry."""
+    pin, action_type, value = entry[:3]
+    options = entry[3] if len(entry) > 3 else {}
+    if action_type == "ccc":
+        codes = [CONSUMER_CONTROL_CODES[value]]
+    elif isinstance(value, list):
+        codes = [resolve_keycode(item) for item in value]
+    else:
+        codes = [resolve_keycode(value)]
+
+    pin_bytes = pin.encode("ascii")
+    return (
+        struct.pack("<B", len(pin_bytes))
+        + pin_bytes
+        + struct.pack("<BB", ACTION_CODES[action_type], len(codes))
+        + struct.pack("<{}H".format(len(codes)), *codes)
+        + struct.pack("<H", min(debounce_ms, UNSET_U16))
+        + struct.pack(
+            "<BHH",
+            DEBOUNCE_MODES.index(options["debounce"]) if "debounce" in options else UNSET_U8,
+            min(options.get("press_lockout_ms", UNSET_U16), UNSET_U16),
+            min(options.get("release_lockout_ms", UNSET_U16), UNSET_U16),
+        )
+    )
+
+
+def compile_config(config, settings=None, source=b""):
+    """
+    Compile a pedal configuration into the binary action table read by the firmware.
+
+    ``source`` is the exact config.json content written next to the table; its
+    size and CRC let the firmware detect a stale table and fall back to JSON.
+    The config is normalized like load_config() does, so every config the
+    app loads compiles; strict validation is done when the editor saves.
+    """
+    entries = normalize_config(config)
+    settings = normalize_device_settings(settings or {})
+    if len(entries) > 255:
+        raise ValueError("A configuration can hold at most 255 pins.")
+
+    scan = settings.get("scan")
+    hid = settings.get("hid")
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(entries),
+        SCAN_ENGINES.index(scan) if scan else UNSET_U8,
+        HID_MODES.index(hid) if hid else UNSET_U8,
+        *[min(settings.get(name, UNSET_U16), UNSET_U16) for name in SETTING_FIELDS],
+        len(source),
+        zlib.crc32(source),
+    )
+
+    pin_debounce = settings.get("pin_debounce_ms", {})
+    body = []
+    for entry in entries:
+        try:
+            body.append(compile_entry(entry, pin_debounce.get(entry[0], UNSET_U16)))
+        except ValueError as exc:
+            raise ValueError("{}: {}".format(entry[0], exc))
+    return header + b"".join(body)
+
+
+def decode_compiled_config(blob):
+    """Decode a compiled action table back into (settings, entries) of HID codes."""
+    magic, version, count, scan, hid, *values = HEADER.unpack_from(blob, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Unsupported compiled config format.")
+
+    settings = {}
+    if scan != UNSET_U8:
+        settings["scan"] = SCAN_ENGINES[scan]
+    if hid != UNSET_U8:
+        settings["hid"] = HID_MODES[hid]
+    for name, value in zip(SETTING_FIELDS, values):
+        if value != UNSET_U16:
+            settings[name] = value
+
+    entries = []
+    pin_debounce = {}
+    offset = HEADER.size
+    for _ in range(count):
+        pin_length = blob[offset]
+        pin = blob[offset + 1:offset + 1 + pin_length].decode("ascii")
+        offset += 1 + pin_length
+        action, code_count = struct.unpack_from("<BB", blob, offset)
+        offset += 2
+        codes = list(struct.unpack_from("<{}H".format(code_count), blob, offset))
+        offset += 2 * code_count
+        debounce, mode, press_lockout, release_lockout = struct.unpack_from("<HBHH", blob, offset)
+        offset += 7
+        if debounce != UNSET_U16:
+            pin_debounce[pin] = debounce
+        entry = [pin, ACTION_NAMES[action], codes]
+        options = {}
+        if mode != UNSET_U8:
+            options["debounce"] = DEBOUNCE_MODES[mode]
+        if press_lockout != UNSET_U16:
+            options["press_lockout_ms"] = press_lockout
+        if release_lockout != UNSET_U16:
+            options["release_lockout_ms"] = release_lockout
+        if options:
+            entry.append(options)
+        entries.append(entry)
+    if pin_debounce:
+        settings["pin_debounce_ms"] = pin_debounce
+    return settings, entries
+
+
+# Preset bank holding several compiled tables, switched on the device over serial:
+#
+#   "PDLB" | version u8 | preset count u8
+#   per preset: name length u8 | name (utf-8) | table length u16 | compiled table
+BANK_FILENAME = "presets.bin"
+BANK_MAGIC = b"PDLB"
+BANK_VERSION = 1
+
+
+def compile_bank(presets):
+    """
+    Compile (name, config) pairs into one preset bank.
+
+    The tables carry no firmware settings: switching presets on the device only
+    swaps the button mapping and keeps the scan engine and timings.
+    """
+    presets = list(presets)
+    if len(presets) > 255:
+        raise ValueError("A preset bank can hold at most 255 presets.")
+
+    parts = [BANK_MAGIC, struct.pack("<BB", BANK_VERSION, len(presets))]
+    for name, config in presets:
+        name_bytes = name.encode("utf-8")
+        if len(name_bytes) > 255:
+            raise ValueError("Preset name is too long: {}".format(name))
+        try:
+            table = compile_config(config)
+        except ValueError as exc:
+            raise ValueError("Preset '{}': {}".format(name, exc))
+        parts.append(struct.pack("<B", len(name_bytes)) + name_bytes)
+        parts.append(struct.pack("<H", len(table)) + table)
+    return b"".join(parts)
+
+
+def decode_bank(blob):
+    """Return {name: compiled table} from a preset bank."""
+    if blob[:4] != BANK_MAGIC or blob[4] != BANK_VERSION:
+        raise ValueError("Unsupported preset bank format.")
+
+    bank = {}
+    offset = 6
+    for _ in range(blob[5]):
+        length = blob[offset]
+        name = blob[offset + 1:offset + 1 + length].decode("utf-8")
+        offset += 1 + length
+        (size,) = struct.unpack_from("<H", blob, offset)
+        offset += 2
+        bank[name] = blob[offset:offset + size]
+        offset += size
+    return bank
@@ -0,0 +1,225 @@
+"""
+Install or upgrade the firmware/ bundle on a CIRCUITPY drive, copying only
+the files that changed.
+
+    python -m config.firmware_deploy [--drive PATH] [--dry-run] [--force]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from config.pico_sync import (
+    CONFIG_FILENAME,
+    drive_lock,
+    file_sha256,
+    find_circuitpy_drive,
+    read_back_sha256,
+    write_file_atomic,
+)
+
+FIRMWARE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "firmware")
+# Hashes and sizes of the bundle files last installed on the drive
+DEPLOY_MANIFEST_FILENAME = ".pedals_firmware.json"
+# Files of the bundle that are not installed on the board
+BUNDLE_EXCLUDES = ("README.md",)
+# Files that belong to the user once installed: only copied to a board without one
+USER_FILES = (CONFIG_FILENAME,)
+# Changing code.py reloads the board; written last, the reload finds every library in place
+ENTRY_POINT = "code.py"
+# Only run at a hard reset (e.g. enabling the usb_cdc data port), not on the reload
+BOOT_FILES = ("boot.py",)
+
+
+class DeployReport:
+    """What a firmware deploy copied, left alone and removed."""
+
+    def __init__(self, drive, dry_run=False):
+        self.drive = drive
+        self.dry_run = dry_run
+        self.copied = []
+        self.unchanged = []
+        self.kept = []
+        self.removed = []
+        # Stale manifest paths that point outside the drive and were left alone
+        self.rejected = []
+        self.bytes_written = 0
+        self.bytes_saved = 0
+        self.seconds = 0.0
+
+    @property
+    def reset_required(self):
+        """True when a copied file only takes effect after a hard reset of the board."""
+        return any(path in BOOT_FILES for path in self.copied)
+
+    def summary(self):
+        """One line for the log or the terminal."""
+        verb = "Would copy" if self.dry_run else "Copied"
+        text = "{} {} file(s), {} bytes; {} unchanged".format(
+            verb, len(self.copied), self.bytes_written, len(self.unchanged)
+        )
+        if self.removed:
+            text += ", {} removed".format(len(self.removed))
+        total = self.bytes_written + self.bytes_saved
+        text += "; saved {} of {} bytes in {:.2f} s".format(self.bytes_saved, total, self.seconds)
+        return text
+
+
+def bundle_manifest(source_dir=FIRMWARE_DIR):
+    """Return {relative path: {"size": bytes, "sha256": hex}} for the files of the bundle."""
+    manifest = {}
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = sorted(name for name in dirs if name != "__pycache__" and not name.startswith("."))
+        for name in sorted(files):
+            if name.startswith(".") or name.endswith(".pyc"):
+                continue
+            path = os.path.relpath(os.path.join(root, name), source_dir).replace(os.sep, "/")
+            if path in BUNDLE_EXCLUDES:
+                continue
+            with open(os.path.join(root, name), "rb") as f:
+                data = f.read()
+            manifest[path] = {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+    return manifest
+
+
+def read_deploy_manifest(drive):
+    """Return {relative path: {"size", "sha256"}} recorded by the last deploy, or {}."""
+    try:
+        with open(os.path.join(drive, DEPLOY_MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    files = manifest.get("files") if isinstance(manifest, dict) else None
+    return files if isinstance(files, dict) else {}
+
+
+def inside_drive(drive, path):
+    """True when ``path`` (from the manifest on the drive) names a file on ``drive``."""
+    root = os.path.realpath(drive)
+    target = os.path.realpath(os.path.join(drive, path))
+    try:
+        return target != root and os.path.commonpath([root, target]) == root
+    except ValueError:
+        # Another drive letter on Windows
+        return False
+
+
+def deploy_order(paths):
+    """Libraries and data first, code.py last."""
+    return sorted(paths, key=lambda path: (path == ENTRY_POINT, path.count("/") == 0, path))
+
+
+def installed_matches(target, info):
+    """True when the drive already holds this file: same size, then same hash."""
+    try:
+        if os.path.getsize(target) != info["size"]:
+            return False
+    except OSError:
+        return False
+    return file_sha256(target) == info["sha256"]
+
+
+def deploy_firmware(drive=None, source_dir=FIRMWARE_DIR, force=False, dry_run=False, verify=True, check=None):
+    """
+    Bring the firmware on a CIRCUITPY drive up to date with ``source_dir``.
+
+    Files whose size and hash already match are skipped, config.json is only
+    installed on a board that has none, and files a previous deploy installed
+    but the bundle no longer has are removed. Each copied file is read back
+    and checked against its hash. ``check()`` is called before each file is
+    written or removed and may raise to cancel; the manifest is then left as
+    it was, so the next deploy copies what is still missing. Returns a
+    DeployReport.
+    """
+    drive = drive or find_circuitpy_drive()
+    if not drive:
+        raise RuntimeError("No connected Pico (CIRCUITPY) was found.")
+    with drive_lock(drive):
+        return install_bundle(drive, source_dir, force, dry_run, verify, check)
+
+
+def install_bundle(drive, source_dir, force, dry_run, verify, check):
+    """The body of deploy_firmware(), run while holding the drive lock."""
+    start = time.perf_counter()
+    report = DeployReport(drive, dry_run)
+    bundle = bundle_manifest(source_dir)
+    installed = read_deploy_manifest(drive)
+
+    to_copy = []
+    for path, info in bundle.items():
+        target = os.path.join(drive, path)
+        if path in USER_FILES and os.path.exists(target):
+            report.kept.append(path)
+        elif not force and installed_matches(target, info):
+            report.unchanged.append(path)
+            report.bytes_saved += info["size"]
+        else:
+            to_copy.append(path)
+    stale = sorted(path for path in installed if path not in bundle and path not in USER_FILES)
+
+    for path in deploy_order(to_copy):
+        if check is not None:
+            check()
+        report.copied.append(path)
+        report.bytes_written += bundle[path]["size"]
+        if dry_run:
+            continue
+        target = os.path.join(drive, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(os.path.join(source_dir, path), "rb") as f:
+            write_file_atomic(target, f.read())
+        if verify and read_back_sha256(target) != bundle[path]["sha256"]:
+            raise OSError(f"{path} read back different from what was written")
+
+    for path in stale:
+        if not inside_drive(drive, path):
+            report.rejected.append(path)
+            continue
+        target = os.path.join(drive, path)
+        if os.path.exists(target):
+            if check is not None:
+                check()
+            report.removed.append(path)
+            if not dry_run:
+                os.remove(target)
+
+    if not dry_run and installed != bundle:
+        write_file_atomic(
+            os.path.join(drive, DEPLOY_MANIFEST_FILENAME),
+            json.dumps({"files": bundle}, indent=4, sort_keys=True).encode("utf-8"),
+        )
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--drive", help="CIRCUITPY mount point (default: the first one found)")
+    parser.add_argument("--source", default=FIRMWARE_DIR, help="firmware bundle directory")
+    parser.add_argument("--dry-run", action="store_true", help="only show what would be copied")
+    parser.add_argument("--force", action="store_true", help="copy every file, even unchanged ones")
+    args = parser.parse_args(argv)
+
+    try:
+        report = deploy_firmware(args.drive, args.source, force=args.force, dry_run=args.dry_run)
+    except (OSError, RuntimeError) as e:
+        print("Deploy failed: {}".format(e), file=sys.stderr)
+        return 1
+    for path in report.copied:
+        print("{} {}".format("would copy" if args.dry_run else "copied", path))
+    for path in report.removed:
+        print("{} {}".format("would remove" if args.dry_run else "removed", path))
+    for path in report.kept:
+        print("kept {} (already on the board)".format(path))
+    for path in report.rejected:
+        print("ignored {} (outside the drive)".format(path), file=sys.stderr)
+    print(report.summary())
+    if report.reset_required and not args.dry_run:
+        print("boot.py changed: reset the board (or unplug and replug it) to apply it")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config_manager import load_config
+from config.pico_sync import (
+    CONFIG_FILENAME,
+    build_device_files,
+    device_config_current,
+    drive_lock,
+    find_circuitpy_drives,
+    read_back_sha256,
+    read_device_settings,
+    write_device_files,
+)
+
+# Writes to separate USB drives do not contend with each other; beyond this
+# the boards share one host controller and extra threads only add overhead.
+MAX_WORKERS = 16
+
+
+class DriveSyncResult:
+    """Outcome of writing one CIRCUITPY drive."""
+
+    def __init__(self, drive, ok, seconds, bytes_written=0, error=None, up_to_date=False):
+        self.drive = drive
+        self.ok = ok
+        self.seconds = seconds
+        self.bytes_written = bytes_written
+        self.error = error
+        self.up_to_date = up_to_date
+
+    def __repr__(self):
+        state = "up to date" if self.up_to_date else "ok" if self.ok else f"failed: {self.error}"
+        return f"<DriveSyncResult {self.drive} {state} {self.seconds * 1000:.0f} ms>"
+
+
+class FleetSyncReport:
+    """Per-drive results of a fleet sync, in the order the drives were given."""
+
+    def __init__(self, results, seconds):
+        self.results = results
+        self.seconds = seconds
+
+    @property
+    def succeeded(self):
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self):
+        return [result for result in self.results if not result.ok]
+
+    def summary(self):
+        """One line for the log: how many boards were synced, how fast, which failed."""
+        text = "Synced {}/{} boards in {:.2f} s".format(len(self.succeeded), len(self.results), self.seconds)
+        up_to_date = sum(1 for result in self.results if result.up_to_date)
+        if up_to_date:
+            text += ", {} already up to date".format(up_to_date)
+        if self.succeeded:
+            slowest = max(result.seconds for result in self.succeeded)
+            text += " (slowest {:.0f} ms)".format(slowest * 1000)
+        if self.failed:
+            text += "; failed: " + ", ".join(f"{result.drive}: {result.error}" for result in self.failed)
+        return text
+
+
+def sync_drive(drive, entries, verify=True, check=None):
+    """
+    Write config.bin and config.json to one drive, keeping its firmware
+    settings, and check the files read back unchanged. A drive that already
+    runs ``entries`` is left alone. Never raises except from ``check()``,
+    which is called before the drive is written: errors are returned in the
+    result so one bad board does not stop the others.
+    """
+    with drive_lock(drive):
+        if check is not None:
+            check()
+        start = time.perf_counter()
+        try:
+            if device_config_current(drive, entries):
+                return DriveSyncResult(drive, True, time.perf_counter() - start, up_to_date=True)
+            settings = read_device_settings(os.path.join(drive, CONFIG_FILENAME))
+            files = build_device_files(entries, settings)
+            written = write_device_files(drive, entries, files)
+            if verify:
+                for filename, data in files:
+                    if read_back_sha256(os.path.join(drive, filename)) != hashlib.sha256(data).hexdigest():
+                        raise OSError(f"{filename} read back different from what was written")
+        except Exception as e:
+            return DriveSyncResult(drive, False, time.perf_counter() - start, error=e)
+        return DriveSyncResult(drive, True, time.perf_counter() - start, written)
+
+
+def fleet_sync(entries=None, drives=None, verify=True, max_workers=None, check=None):
+    """
+    Push one config to many boards at once.
+
+    ``entries`` defaults to the local config.json and ``drives`` to every
+    CIRCUITPY drive found. Each drive is written by its own worker, so the
+    total time is close to that of the slowest board instead of the sum.
+    ``check()`` is called before each drive is written and may raise to
+    cancel the drives not started yet; the exception is raised once the
+    drives already being written are done.
+    """
+    if entries is None:
+        entries = load_config()
+    if drives is None:
+        drives = find_circuitpy_drives()
+    if not drives:
+        raise RuntimeError("No connected Pico (CIRCUITPY) was found.")
+
+    start = time.perf_counter()
+    workers = max_workers or min(MAX_WORKERS, len(drives))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet-sync") as pool:
+        results = list(pool.map(lambda drive: sync_drive(drive, entries, verify, check), drives))
+    return FleetSyncReport(results, time.perf_counter() - start)
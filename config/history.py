@@ -0,0 +1,407 @@
+"""
+Revision history of every preset and of config.json, for rolling back a bad edit.
+
+    python -m config.history list [TARGET]        # e.g. config.json or preset:navigation
+    python -m config.history show REVISION
+    python -m config.history diff REVISION [OTHER]
+    python -m config.history restore REVISION
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from config.action_config import normalize_config
+from config.config_cache import freeze
+
+HISTORY_PATH = "config/history.db"
+CONFIG_TARGET = "config.json"
+PRESET_TARGET_PREFIX = "preset:"
+# Revisions kept per target; older ones are dropped PRUNE_BATCH at a time
+MAX_REVISIONS = 1000
+PRUNE_BATCH = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS configs (
+    id INTEGER PRIMARY KEY,
+    digest BLOB NOT NULL UNIQUE,
+    entry_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revisions (
+    id INTEGER PRIMARY KEY,
+    target TEXT NOT NULL,
+    config_id INTEGER REFERENCES configs (id),
+    created_ns INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    removed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS revisions_target ON revisions (target, id);
+"""
+
+
+def preset_target(name):
+    """History target of a preset."""
+    return PRESET_TARGET_PREFIX + name
+
+
+def entry_bytes(entry):
+    """Canonical JSON of one config entry."""
+    return json.dumps(entry, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def digest(data):
+    """16-byte content address; collisions are not a concern at this scale."""
+    return hashlib.sha256(data).digest()[:16]
+
+
+class Revision:
+    """One saved version of a target; ``config_id`` is None for a deletion."""
+
+    def __init__(self, id, target, config_id, created_ns, added, removed):
+        self.id = id
+        self.target = target
+        self.config_id = config_id
+        self.created_ns = created_ns
+        self.added = added
+        self.removed = removed
+
+    @property
+    def deleted(self):
+        return self.config_id is None
+
+    def describe(self):
+        """One line for a revision list."""
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created_ns / 1e9))
+        change = "deleted" if self.deleted else "+{} -{} entries".format(self.added, self.removed)
+        return "{:>6}  {}  {:<28} {}".format(self.id, when, self.target, change)
+
+
+class ConfigHistory:
+    """
+    Content-addressed history of pedal configurations.
+
+    Each distinct config entry (one pin mapping) is stored once, and each
+    distinct configuration once, as the list of its entry ids. A revision is
+    a small row pointing at a configuration, so a save that changes one pin
+    stores one new entry, and saving a configuration seen before (switching
+    back and forth between presets) stores only the revision row. Saving the
+    configuration a target already has stores nothing.
+
+    Restoring any revision reads one configuration row and its entries,
+    however long the history is. Listing reads revision rows only.
+    """
+
+    def __init__(self, path=HISTORY_PATH, max_revisions=MAX_REVISIONS):
+        self.path = path
+        self.max_revisions = max_revisions
+        self.lock = threading.RLock()
+        self.connection = None
+        self.configs = {}
+
+    def connect(self):
+        """Open the database and create the tables on first use."""
+        with self.lock:
+            if self.connection is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.executescript(SCHEMA)
+                self.connection = connection
+            return self.connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    # ------------------------------------------------------------------
+
+    def record(self, target, config):
+        """Record a saved configuration; returns the new revision id, or None if it is unchanged."""
+        return self.record_many([(target, config)])[0]
+
+    def record_deleted(self, target):
+        """Record that a target was deleted; returns the revision id, or None if already deleted."""
+        return self.record_many([(target, None)])[0]
+
+    def record_many(self, changes):
+        """Record several (target, config or None) changes in one transaction."""
+        with self.lock:
+            connection = self.connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [self._record(connection, target, config) for target, config in changes]
+                for target in {target for target, _ in changes}:
+                    self._prune(connection, target)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            return ids
+
+    def revisions(self, target=None, limit=50):
+        """Return the newest revisions, of one target or of all, newest first."""
+        query = "SELECT id, target, config_id, created_ns, added, removed FROM revisions"
+        params = ()
+        if target is not None:
+            query += " WHERE target = ?"
+            params = (target,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self.lock:
+            rows = self.connect().execute(query, params + (limit,)).fetchall()
+        return [Revision(*row) for row in rows]
+
+    def revision(self, revision_id):
+        """Return one Revision; raises KeyError if it does not exist."""
+        with self.lock:
+            row = self.connect().execute(
+                "SELECT id, target, config_id, created_ns, added, removed FROM revisions WHERE id = ?",
+                (revision_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError("No revision {}".format(revision_id))
+        return Revision(*row)
+
+    def load(self, revision_id):
+        """Return the read-only configuration of a revision, or None for a deletion."""
+        revision = self.revision(revision_id)
+        if revision.deleted:
+            return None
+        return self._load_config(revision.config_id)
+
+    def has_history(self, target):
+        with self.lock:
+            row = self.connect().execute("SELECT 1 FROM revisions WHERE target = ? LIMIT 1", (target,)).fetchone()
+        return row is not None
+
+    def targets(self):
+        """Return every target with history, sorted."""
+        with self.lock:
+            rows = self.connect().execute("SELECT DISTINCT target FROM revisions ORDER BY target").fetchall()
+        return [target for target, in rows]
+
+    def diff(self, old_id, new_id):
+        """Return (removed entries, added entries) between two revisions."""
+        old = self._entry_ids(self.revision(old_id).config_id)
+        new = self._entry_ids(self.revision(new_id).config_id)
+        return self._entries(old - new), self._entries(new - old)
+
+    def stats(self):
+        """Row counts and the size of the history file."""
+        with self.lock:
+            connection = self.connect()
+            counts = {
+                table: connection.execute("SELECT count(*) FROM {}".format(table)).fetchone()[0]
+                for table in ("revisions", "configs", "entries")
+            }
+        counts["bytes"] = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return counts
+
+    # ------------------------------------------------------------------
+
+    def _record(self, connection, target, config):
+        latest = connection.execute(
+            "SELECT config_id FROM revisions WHERE target = ? ORDER BY id DESC LIMIT 1", (target,)
+        ).fetchone()
+        previous_id = latest[0] if latest else None
+        if config is None:
+            if latest is None or previous_id is None:
+                return None
+            config_id = None
+            added, removed = 0, len(self._entry_ids(previous_id))
+        else:
+            config_id = self._store_config(connection, normalize_config(config))
+            if latest is not None and config_id == previous_id:
+                return None
+            new = self._entry_ids(config_id)
+            old = self._entry_ids(previous_id) if previous_id is not None else set()
+            added, removed = len(new - old), len(old - new)
+        cursor = connection.execute(
+            "INSERT INTO revisions (target, config_id, created_ns, added, removed) VALUES (?, ?, ?, ?, ?)",
+            (target, config_id, time.time_ns(), added, removed),
+        )
+        return cursor.lastrowid
+
+    def _store_config(self, connection, entries):
+        entry_ids = [self._store_entry(connection, entry) for entry in entries]
+        ids_text = ",".join(str(entry_id) for entry_id in entry_ids)
+        config_digest = digest(ids_text.encode("ascii"))
+        row = connection.execute("SELECT id FROM configs WHERE digest = ?", (config_digest,)).fetchone()
+        if row is not None:
+            return row[0]
+        return connection.execute(
+            "INSERT INTO configs (digest, entry_ids) VALUES (?, ?)", (config_digest, ids_text)
+        ).lastrowid
+
+    def _store_entry(self, connection, entry):
+        data = entry_bytes(entry)
+        entry_digest = digest(data)
+        row = connection.execute("SELECT id FROM entries WHERE digest = ?", (entry_digest,)).fetchone()
+        if row is not None:
+            return row[0]
+        return connection.execute(
+            "INSERT INTO entries (digest, data) VALUES (?, ?)", (entry_digest, data.decode("utf-8"))
+        ).lastrowid
+
+    def _entry_id_list(self, config_id):
+        if config_id is None:
+            return []
+        with self.lock:
+            row = self.connect().execute("SELECT entry_ids FROM configs WHERE id = ?", (config_id,)).fetchone()
+        return [int(entry_id) for entry_id in row[0].split(",")] if row and row[0] else []
+
+    def _entry_ids(self, config_id):
+        return set(self._entry_id_list(config_id))
+
+    def _entries(self, entry_ids):
+        if not entry_ids:
+            return []
+        entry_ids = list(entry_ids)
+        with self.lock:
+            rows = self.connect().execute(
+                "SELECT id, data FROM entries WHERE id IN ({})".format(",".join("?" * len(entry_ids))),
+                entry_ids,
+            ).fetchall()
+        data = dict(rows)
+        return [json.loads(data[entry_id]) for entry_id in entry_ids]
+
+    def _load_config(self, config_id):
+        config = self.configs.get(config_id)
+        if config is None:
+            # Configurations never change once stored, so caching by id is safe
+            config = freeze(self._entries(self._entry_id_list(config_id)))
+            self.configs[config_id] = config
+        return config
+
+    def _prune(self, connection, target):
+        # Dropped in batches, so the unreferenced rows are collected once per PRUNE_BATCH saves
+        overflow = connection.execute(
+            "SELECT id FROM revisions WHERE target = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (target, self.max_revisions + PRUNE_BATCH),
+        ).fetchone()
+        if overflow is None:
+            return
+        oldest_kept = connection.execute(
+            "SELECT id FROM revisions WHERE target = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (target, self.max_revisions - 1),
+        ).fetchone()[0]
+        connection.execute("DELETE FROM revisions WHERE target = ? AND id < ?", (target, oldest_kept))
+        connection.execute(
+            "DELETE FROM configs WHERE id NOT IN (SELECT config_id FROM revisions WHERE config_id IS NOT NULL)"
+        )
+        used = set()
+        for ids_text, in connection.execute("SELECT entry_ids FROM configs"):
+            used.update(int(entry_id) for entry_id in ids_text.split(",") if entry_id)
+        stale = [(entry_id,) for entry_id, in connection.execute("SELECT id FROM entries") if entry_id not in used]
+        connection.executemany("DELETE FROM entries WHERE id = ?", stale)
+        self.configs.clear()
+
+
+# Shared history written by config_manager and preset_manager
+HISTORY = ConfigHistory()
+
+
+def record_quietly(changes):
+    """Record (target, config or None) changes; history must never make a save fail."""
+    try:
+        HISTORY.record_many(changes)
+    except (OSError, ValueError, sqlite3.Error):
+        pass
+
+
+def record_baselines_quietly(targets, current):
+    """
+    Before the first recorded change of a target, record the version it is
+    about to replace, as returned by ``current(target)``, so that the first
+    bad edit can be rolled back too.
+    """
+    try:
+        changes = []
+        for target in targets:
+            if not HISTORY.has_history(target):
+                config = current(target)
+                if config is not None:
+                    changes.append((target, config))
+        if changes:
+            HISTORY.record_many(changes)
+    except (OSError, ValueError, sqlite3.Error):
+        pass
+
+
+def restore(revision_id):
+    """Write a revision back as the current preset or config.json; returns its target."""
+    from config.config_manager import save_config
+    from config.preset_manager import delete_preset, save_preset
+
+    revision = HISTORY.revision(revision_id)
+    config = HISTORY.load(revision_id)
+    if revision.target == CONFIG_TARGET:
+        if config is None:
+            raise ValueError("config.json revisions cannot be deletions")
+        save_config(config)
+    elif revision.target.startswith(PRESET_TARGET_PREFIX):
+        name = revision.target[len(PRESET_TARGET_PREFIX):]
+        if config is None:
+            delete_preset(name)
+        else:
+            save_preset(name, config)
+    else:
+        raise ValueError("Unknown history target: {}".format(revision.target))
+    return revision.target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="show the newest revisions")
+    list_parser.add_argument("target", nargs="?")
+    list_parser.add_argument("--limit", type=int, default=50)
+    show_parser = commands.add_parser("show", help="print the configuration of a revision")
+    show_parser.add_argument("revision", type=int)
+    diff_parser = commands.add_parser("diff", help="entries changed since a revision (or between two)")
+    diff_parser.add_argument("revision", type=int)
+    diff_parser.add_argument("other", type=int, nargs="?")
+    restore_parser = commands.add_parser("restore", help="make a revision current again")
+    restore_parser.add_argument("revision", type=int)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "list":
+            for revision in HISTORY.revisions(args.target, args.limit):
+                print(revision.describe())
+        elif args.command == "show":
+            print(json.dumps(HISTORY.load(args.revision), indent=4))
+        elif args.command == "diff":
+            other = args.other
+            if other is None:
+                other = HISTORY.revisions(HISTORY.revision(args.revision).target, 1)[0].id
+            removed, added = HISTORY.diff(args.revision, other)
+            for entry in removed:
+                print("- {}".format(json.dumps(entry)))
+            for entry in added:
+                print("+ {}".format(json.dumps(entry)))
+        else:
+            print("Restored revision {} of {}".format(args.revision, restore(args.revision)))
+    except (KeyError, ValueError, OSError, sqlite3.Error) as e:
+        print("History error: {}".format(e), file=sys.stderr)
+        return 1
+    finally:
+        HISTORY.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -101,6 +101,106 @@ HID_TO_GUI.update({
 })
 
 
+# HID name → USB HID usage ID, mirroring adafruit_hid.keycode.Keycode
+HID_KEYCODES = {
+    # Letters
+    **{chr(ord("A") + i): 0x04 + i for i in range(26)},
+
+    # Number keys (top row)
+    "ONE": 0x1E,
+    "TWO": 0x1F,
+    "THREE": 0x20,
+    "FOUR": 0x21,
+    "FIVE": 0x22,
+    "SIX": 0x23,
+    "SEVEN": 0x24,
+    "EIGHT": 0x25,
+    "NINE": 0x26,
+    "ZERO": 0x27,
+
+    # Common keys
+    "ENTER": 0x28,
+    "RETURN": 0x28,
+    "ESCAPE": 0x29,
+    "BACKSPACE": 0x2A,
+    "TAB": 0x2B,
+    "SPACEBAR": 0x2C,
+    "SPACE": 0x2C,
+    "MINUS": 0x2D,
+    "EQUALS": 0x2E,
+    "LEFT_BRACKET": 0x2F,
+    "RIGHT_BRACKET": 0x30,
+    "BACKSLASH": 0x31,
+    "POUND": 0x32,
+    "SEMICOLON": 0x33,
+    "QUOTE": 0x34,
+    "GRAVE_ACCENT": 0x35,
+    "COMMA": 0x36,
+    "PERIOD": 0x37,
+    "FORWARD_SLASH": 0x38,
+    "CAPS_LOCK": 0x39,
+
+    # Function keys
+    **{f"F{i}": 0x3A + i - 1 for i in range(1, 13)},
+    **{f"F{i}": 0x68 + i - 13 for i in range(13, 25)},
+
+    # Navigation
+    "PRINT_SCREEN": 0x46,
+    "SCROLL_LOCK": 0x47,
+    "PAUSE": 0x48,
+    "INSERT": 0x49,
+    "HOME": 0x4A,
+    "PAGE_UP": 0x4B,
+    "DELETE": 0x4C,
+    "END": 0x4D,
+    "PAGE_DOWN": 0x4E,
+    "RIGHT_ARROW": 0x4F,
+    "LEFT_ARROW": 0x50,
+    "DOWN_ARROW": 0x51,
+    "UP_ARROW": 0x52,
+
+    # Numeric keypad
+    "KEYPAD_NUMLOCK": 0x53,
+    "KEYPAD_FORWARD_SLASH": 0x54,
+    "KEYPAD_ASTERISK": 0x55,
+    "KEYPAD_MINUS": 0x56,
+    "KEYPAD_PLUS": 0x57,
+    "KEYPAD_ENTER": 0x58,
+    "KEYPAD_ONE": 0x59,
+    "KEYPAD_TWO": 0x5A,
+    "KEYPAD_THREE": 0x5B,
+    "KEYPAD_FOUR": 0x5C,
+    "KEYPAD_FIVE": 0x5D,
+    "KEYPAD_SIX": 0x5E,
+    "KEYPAD_SEVEN": 0x5F,
+    "KEYPAD_EIGHT": 0x60,
+    "KEYPAD_NINE": 0x61,
+    "KEYPAD_ZERO": 0x62,
+    "KEYPAD_PERIOD": 0x63,
+    "KEYPAD_BACKSLASH": 0x64,
+    "APPLICATION": 0x65,
+    "POWER": 0x66,
+    "KEYPAD_EQUALS": 0x67,
+
+    # Modifiers
+    "LEFT_CONTROL": 0xE0,
+    "CONTROL": 0xE0,
+    "LEFT_SHIFT": 0xE1,
+    "SHIFT": 0xE1,
+    "LEFT_ALT": 0xE2,
+    "ALT": 0xE2,
+    "OPTION": 0xE2,
+    "LEFT_GUI": 0xE3,
+    "GUI": 0xE3,
+    "WINDOWS": 0xE3,
+    "COMMAND": 0xE3,
+    "RIGHT_CONTROL": 0xE4,
+    "RIGHT_SHIFT": 0xE5,
+    "RIGHT_ALT": 0xE6,
+    "RIGHT_GUI": 0xE7,
+}
+
+
 def translate_keys(value):
     """
     Convert GUI-style key names (e.g. 'CTRL+ALT+A')
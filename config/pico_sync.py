@@ -1,56 +1,251 @@
+import hashlib
 import os
 import json
-import psutil
+import threading
+from config.action_config import build_device_config, config_hash, normalize_device_settings, split_device_config
 from config.config_manager import load_config, save_config
+from config.drive_discovery import BOOT_FILENAME, shared_discovery
+from config.firmware_compiler import (
+    BANK_FILENAME,
+    COMPILED_FILENAME,
+    compile_bank,
+    compile_config,
+    decode_bank,
+)
 
 CONFIG_FILENAME = "config.json"
-VOLUME_LABEL = "CIRCUITPY"
+# Hashes of what the app last wrote, so an unchanged config is not rewritten
+SYNC_MANIFEST_FILENAME = ".pedals_sync.json"
+
+_drive_locks = {}
+_drive_locks_lock = threading.Lock()
+
+
+def drive_lock(drive):
+    """
+    Lock held while writing a CIRCUITPY drive. Every writer takes it, so two
+    background jobs never write the same board at once (write_file_atomic
+    uses fixed temporary names).
+    """
+    key = os.path.normcase(os.path.realpath(drive))
+    with _drive_locks_lock:
+        return _drive_locks.setdefault(key, threading.RLock())
+
+
+def find_circuitpy_drives():
+    """
+    Returns the mount points of every connected CIRCUITPY drive. The list is
+    cached by config.drive_discovery until something is mounted or unmounted.
+    """
+    return shared_discovery().mountpoints()
 
 
 def find_circuitpy_drive():
     """
     Returns the mount point of the CIRCUITPY drive (e.g. 'E:\\') or None if not found.
     """
-    for part in psutil.disk_partitions(all=False):
-        if VOLUME_LABEL in part.device or VOLUME_LABEL in part.mountpoint:
-            return part.mountpoint
-        try:
-            boot_file = os.path.join(part.mountpoint, "boot_out.txt")
-            if os.path.exists(boot_file):
-                with open(boot_file, "r", encoding="utf-8", errors="ignore") as f:
-                    if "Adafruit CircuitPython" in f.read():
-                        return part.mountpoint
-        except Exception:
-            pass
+    drives = find_circuitpy_drives()
+    return drives[0] if drives else None
+
+
+def drive_serial(drive):
+    """
+    Return the USB serial number of the board a drive belongs to: from sysfs
+    when discovery knows it, otherwise from the UID in boot_out.txt.
+    """
+    found = shared_discovery().find(drive)
+    if found is not None and found.serial_number:
+        return found.serial_number
+    return read_board_uid(drive)
+
+
+def read_board_uid(drive):
+    """
+    Return the board UID CircuitPython writes to boot_out.txt ("UID:..."), or
+    None. It is the same value the board reports as its USB serial number.
+    """
+    try:
+        with open(os.path.join(drive, BOOT_FILENAME), "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if line.startswith("UID:"):
+                    return line[4:].strip().upper() or None
+    except OSError:
+        pass
     return None
 
 
-def sync_to_pico():
+def read_device_settings(path):
+    """
+    Return the firmware settings block of a device config.json, or {} when the
+    file is missing, unreadable or uses the plain list form.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            settings, _ = split_device_config(json.load(f))
+    except (OSError, ValueError):
+        return {}
+    return settings
+
+
+def write_file_atomic(path, data):
+    """Write bytes to a temporary file, fsync it and move it over the target."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, or None if it cannot be read."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def read_back_sha256(path):
+    """SHA-256 hex digest of a file as read back from the drive, to verify a write."""
+    with open(path, "rb") as f:
+        if hasattr(os, "posix_fadvise"):
+            # Drop cached pages so the bytes come from the device, not from
+            # the copy the kernel kept while writing them.
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_sync_manifest(drive):
+    """Return the sync manifest of a drive, or {} when there is none."""
+    try:
+        with open(os.path.join(drive, SYNC_MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def device_config_current(drive, entries):
+    """
+    Return True when the drive already runs ``entries``.
+
+    The manifest must record the same canonical config hash, and config.bin
+    and config.json must still hash to what it recorded, so a file edited by
+    hand is noticed. Only small files are hashed; nothing is parsed.
     """
-    Copy the local config.json to the connected Pico (CIRCUITPY drive).
+    manifest = read_sync_manifest(drive)
+    files = manifest.get("files")
+    if manifest.get("config_sha256") != config_hash(entries) or not isinstance(files, dict):
+        return False
+    for filename in (COMPILED_FILENAME, CONFIG_FILENAME):
+        recorded = files.get(filename)
+        if not recorded or file_sha256(os.path.join(drive, filename)) != recorded:
+            return False
+    return True
+
+
+def sync_to_pico(drive=None, entries=None, check=None):
     """
-    drive = find_circuitpy_drive()
+    Copy the local config.json (or ``entries``) to the connected Pico
+    (CIRCUITPY drive), or to ``drive`` when several boards are connected.
+    Firmware settings already present on the device (scan engine, debounce)
+    are kept.
+
+    A precompiled action table (config.bin) is written next to config.json so
+    the firmware can boot without parsing JSON or resolving key names.
+
+    Returns (path of config.json, whether anything was written). Nothing is
+    written when the device is already up to date, which saves a flash write
+    and the CircuitPython reload that follows it. ``check()`` is called
+    before writing and may raise to cancel.
+    """
+    drive = drive or find_circuitpy_drive()
     if not drive:
         raise RuntimeError("No connected Pico (CIRCUITPY) was found.")
 
-    local_cfg = load_config()
+    local_cfg = load_config() if entries is None else entries
     path = os.path.join(drive, CONFIG_FILENAME)
-    tmp = path + ".tmp"
+    with drive_lock(drive):
+        if device_config_current(drive, local_cfg):
+            return path, False
+        if check is not None:
+            check()
+        write_device_config(drive, local_cfg, read_device_settings(path))
+    return path, True
 
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(local_cfg, f, indent=4)
-        f.flush()
-        os.fsync(f.fileno())
 
-    os.replace(tmp, path)
-    return path
+def build_device_files(entries, settings):
+    """
+    Return [(file name, bytes)] for config.bin and config.json, in write order.
+
+    The table is written first: if CircuitPython reloads in between, the
+    firmware sees a table that does not match config.json and uses JSON.
+    """
+    source = json.dumps(build_device_config(entries, settings), indent=4).encode("utf-8")
+    return [
+        (COMPILED_FILENAME, compile_config(entries, settings, source)),
+        (CONFIG_FILENAME, source),
+    ]
+
 
+def write_device_config(drive, entries, settings):
+    """Write config.json and its compiled table (config.bin) to a CIRCUITPY drive."""
+    write_device_files(drive, entries, build_device_files(entries, settings))
+    return os.path.join(drive, CONFIG_FILENAME)
 
-def sync_from_pico():
+
+def write_device_files(drive, entries, files):
+    """
+    Write the output of build_device_files(), skipping a file whose content
+    is already on the drive, and record the hashes in the sync manifest.
+    Returns the number of bytes written.
+    """
+    hashes = {}
+    written = 0
+    for filename, data in files:
+        target = os.path.join(drive, filename)
+        hashes[filename] = hashlib.sha256(data).hexdigest()
+        if file_sha256(target) != hashes[filename]:
+            write_file_atomic(target, data)
+            written += len(data)
+
+    manifest = {"config_sha256": config_hash(entries), "files": hashes}
+    if read_sync_manifest(drive) != manifest:
+        write_file_atomic(
+            os.path.join(drive, SYNC_MANIFEST_FILENAME),
+            json.dumps(manifest, indent=4, sort_keys=True).encode("utf-8"),
+        )
+    return written
+
+
+def update_device_settings(changes, drive=None):
     """
-    Copy config.json from the connected Pico to the local config directory.
+    Merge firmware settings (e.g. pin_debounce_ms from calibration) into the
+    device config.json, keeping its button mapping.
     """
-    drive = find_circuitpy_drive()
+    drive = drive or find_circuitpy_drive()
+    if not drive:
+        raise RuntimeError("No connected Pico (CIRCUITPY) was found.")
+
+    path = os.path.join(drive, CONFIG_FILENAME)
+    with drive_lock(drive):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File '{CONFIG_FILENAME}' not found on Pico.")
+        with open(path, "r", encoding="utf-8") as f:
+            settings, entries = split_device_config(json.load(f))
+
+        settings.update(normalize_device_settings(changes))
+        return write_device_config(drive, entries, settings)
+
+
+def sync_from_pico(drive=None):
+    """
+    Copy config.json from the connected Pico (or ``drive``) to the local config directory.
+    """
+    drive = drive or find_circuitpy_drive()
     if not drive:
         raise RuntimeError("No connected Pico (CIRCUITPY) was found.")
 
@@ -59,7 +254,41 @@ def sync_from_pico():
         raise FileNotFoundError(f"File '{CONFIG_FILENAME}' not found on Pico.")
 
     with open(path, "r", encoding="utf-8") as f:
-        pico_cfg = json.load(f)
+        _, pico_cfg = split_device_config(json.load(f))
 
     save_config(pico_cfg)
     return path
+
+
+def upload_preset_bank(presets, drive=None):
+    """
+    Write a bank of compiled presets to the connected Pico (presets.bin).
+
+    After this single write the device can switch between the presets on a
+    serial command, without touching the drive again.
+    """
+    drive = drive or find_circuitpy_drive()
+    if not drive:
+        raise RuntimeError("No connected Pico (CIRCUITPY) was found.")
+
+    path = os.path.join(drive, BANK_FILENAME)
+    data = compile_bank(presets)
+    with drive_lock(drive):
+        write_file_atomic(path, data)
+    return path
+
+
+def read_preset_bank(drive=None):
+    """Return {name: compiled table} for the bank on the connected Pico (or ``drive``), or {}."""
+    drive = drive or find_circuitpy_drive()
+    if not drive:
+        return {}
+
+    path = os.path.join(drive, BANK_FILENAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as f:
+            return decode_bank(f.read())
+    except (OSError, ValueError):
+        return {}
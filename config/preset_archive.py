@@ -0,0 +1,314 @@
+"""
+Move preset libraries between machines as .zip or .tar(.gz) archives of
+<name>.json files.
+
+    python -m config.preset_archive export ARCHIVE [NAME ...]
+    python -m config.preset_archive import ARCHIVE [--overwrite]
+"""
+import argparse
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import posixpath
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from config.action_config import normalize_config
+from config.preset_manager import list_presets, load_preset, save_presets
+
+# Archive members larger than this are not presets and are not read
+MAX_ENTRY_BYTES = 1024 * 1024
+# Entries sent to a validation worker at a time
+BATCH_SIZE = 250
+# Smaller archives are validated in this process; starting workers would take longer
+POOL_THRESHOLD = 500
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+# Preset names must also be valid Windows file names (":" would even name a drive)
+UNSAFE_NAME_CHARS = set('<>:"/\\|?*')
+RESERVED_NAMES = {"CON", "PRN", "AUX", "NUL"} | {
+    "{}{}".format(prefix, number) for prefix in ("COM", "LPT") for number in range(1, 10)
+}
+
+
+class ArchiveReport:
+    """What an import or export did with each archive entry."""
+
+    def __init__(self, path):
+        self.path = path
+        self.saved = []
+        self.skipped = []
+        self.errors = {}
+        self.seconds = 0.0
+
+    def summary(self):
+        """One line for the log or the terminal."""
+        text = "{} preset(s)".format(len(self.saved))
+        if self.skipped:
+            text += ", {} already present and skipped".format(len(self.skipped))
+        if self.errors:
+            text += ", {} invalid".format(len(self.errors))
+        return text + " in {:.2f} s".format(self.seconds)
+
+
+def archive_kind(path):
+    """Return "zip" or "tar" from the archive file name."""
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        return "zip"
+    if lower.endswith(TAR_SUFFIXES):
+        return "tar"
+    raise ValueError("Unsupported archive type (use .zip, .tar or .tar.gz): {}".format(path))
+
+
+def preset_name(member_name):
+    """Preset name of an archive member, or None for members that are not presets."""
+    base = posixpath.basename(member_name.replace("\\", "/"))
+    if not base.endswith(".json") or base.startswith("."):
+        return None
+    name = base[:-5].strip()
+    return name or None
+
+
+def check_preset_name(name):
+    """Raise ValueError unless ``name`` is a plain file name on every platform."""
+    if any(char in UNSAFE_NAME_CHARS or ord(char) < 32 for char in name):
+        raise ValueError("preset name contains a character that is not allowed in file names: {}".format(name))
+    if name.endswith((".", " ")):
+        raise ValueError("preset name cannot end with a dot or a space: {}".format(name))
+    if name.split(".")[0].strip().upper() in RESERVED_NAMES:
+        raise ValueError("preset name is reserved on Windows: {}".format(name))
+
+
+def iter_archive(path):
+    """
+    Yield (member name, data or None, error) for the .json members of an
+    archive, one at a time: a tar is read as a stream and a zip member by member.
+    Members whose name is not a safe preset name are yielded with an error.
+    """
+    if archive_kind(path) == "zip":
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or preset_name(info.filename) is None:
+                    continue
+                error = entry_error(info.filename, info.file_size)
+                if error is not None:
+                    yield info.filename, None, error
+                    continue
+                yield info.filename, archive.read(info), None
+    else:
+        with tarfile.open(path, "r|*") as archive:
+            for info in archive:
+                if not info.isfile() or preset_name(info.name) is None:
+                    continue
+                error = entry_error(info.name, info.size)
+                if error is not None:
+                    yield info.name, None, error
+                    continue
+                yield info.name, archive.extractfile(info).read(), None
+
+
+def entry_error(member_name, size):
+    """Why an archive member cannot be imported as a preset, or None."""
+    try:
+        check_preset_name(preset_name(member_name))
+    except ValueError as e:
+        return str(e)
+    if size > MAX_ENTRY_BYTES:
+        return "larger than {} bytes".format(MAX_ENTRY_BYTES)
+    return None
+
+
+def validate_entries(entries):
+    """
+    Parse and strictly normalize (member name, data) pairs; runs in worker processes.
+    Returns (member name, config or None, error or None) for each.
+    """
+    results = []
+    for member, data in entries:
+        try:
+            config = normalize_config(json.loads(data.decode("utf-8")), strict=True)
+        except (UnicodeDecodeError, ValueError, TypeError) as e:
+            results.append((member, None, str(e)))
+            continue
+        results.append((member, config, None))
+    return results
+
+
+def validated_entries(path, report, workers=None, check=None):
+    """
+    Yield (member name, config) for every valid entry of an archive, in
+    archive order. Errors are recorded in ``report``. Big archives are
+    validated in a process pool with a bounded number of batches in flight,
+    so memory stays flat however large the archive is.
+    """
+    batches = batched_entries(path, report)
+    head = list(itertools.islice(batches, 2))
+    if sum(len(batch) for batch in head) < POOL_THRESHOLD:
+        for batch in itertools.chain(head, batches):
+            if check is not None:
+                check()
+            yield from collect(validate_entries(batch), report)
+        return
+
+    # spawn, not fork: the GUI calls this from a thread
+    workers = workers or os.cpu_count() or 2
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = []
+        for batch in itertools.chain(head, batches):
+            if check is not None:
+                check()
+            pending.append(pool.submit(validate_entries, batch))
+            if len(pending) >= workers * 2:
+                yield from collect(pending.pop(0).result(), report)
+        for future in pending:
+            yield from collect(future.result(), report)
+
+
+def batched_entries(path, report):
+    """Group the readable entries of an archive into lists of BATCH_SIZE (member name, data) pairs."""
+    batch = []
+    for member, data, error in iter_archive(path):
+        if error is not None:
+            report.errors[member] = error
+            continue
+        batch.append((member, data))
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def collect(results, report):
+    """Yield the valid (member name, config) results and record the errors in ``report``."""
+    for member, config, error in results:
+        if error is not None:
+            report.errors[member] = error
+        else:
+            yield member, config
+
+
+def import_archive(path, overwrite=False, workers=None, progress=None, check=None):
+    """
+    Import the presets of an archive. Every entry is validated first and the
+    valid ones are saved in one batch; existing presets are kept unless
+    ``overwrite``. ``progress(message)`` and ``check()`` (which may raise to
+    cancel) are called along the way. Returns an ArchiveReport.
+    """
+    start = time.perf_counter()
+    report = ArchiveReport(path)
+    existing = set(list_presets())
+    presets = {}
+    for member, config in validated_entries(path, report, workers, check):
+        name = preset_name(member)
+        if name in presets:
+            report.errors[member] = "another entry has the same preset name"
+        elif name in existing and not overwrite:
+            report.skipped.append(name)
+        else:
+            presets[name] = config
+        if progress is not None and (len(presets) + len(report.skipped)) % 1000 == 0:
+            progress("Validated {} preset(s)…".format(len(presets) + len(report.skipped)))
+
+    if check is not None:
+        check()
+    if progress is not None:
+        progress("Saving {} preset(s)…".format(len(presets)))
+    save_presets(presets.items())
+    report.saved = list(presets)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def export_archive(path, names=None, progress=None, check=None):
+    """
+    Write presets (all by default) to a .zip or .tar(.gz) archive, one entry
+    at a time. The archive is written next to ``path`` and moved into place
+    when complete. Returns an ArchiveReport.
+    """
+    start = time.perf_counter()
+    kind = archive_kind(path)
+    report = ArchiveReport(path)
+    names = list(list_presets() if names is None else names)
+    tmp = path + ".tmp"
+    try:
+        if kind == "zip":
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as archive:
+                for name, data in preset_payloads(names, report, progress, check):
+                    info = zipfile.ZipInfo(f"{name}.json", time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    with archive.open(info, "w") as f:
+                        f.write(data)
+        else:
+            mode = "w"
+            if path.lower().endswith((".gz", ".tgz")):
+                mode = "w:gz"
+            elif path.lower().endswith(".bz2"):
+                mode = "w:bz2"
+            elif path.lower().endswith(".xz"):
+                mode = "w:xz"
+            with tarfile.open(tmp, mode) as archive:
+                for name, data in preset_payloads(names, report, progress, check):
+                    info = tarfile.TarInfo(f"{name}.json")
+                    info.size = len(data)
+                    info.mtime = int(time.time())
+                    archive.addfile(info, io.BytesIO(data))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def preset_payloads(names, report, progress, check):
+    """Yield (name, config.json bytes) of each preset, formatted like save_preset()."""
+    for count, name in enumerate(names, 1):
+        if check is not None:
+            check()
+        try:
+            data = json.dumps(load_preset(name), indent=4).encode("utf-8")
+        except (OSError, ValueError) as e:
+            report.errors[name] = str(e)
+            continue
+        report.saved.append(name)
+        if progress is not None and count % 1000 == 0:
+            progress("Exported {} of {} preset(s)…".format(count, len(names)))
+        yield name, data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write presets to an archive")
+    export_parser.add_argument("archive")
+    export_parser.add_argument("names", nargs="*", help="presets to export (default: all)")
+    import_parser = commands.add_parser("import", help="add the presets of an archive")
+    import_parser.add_argument("archive")
+    import_parser.add_argument("--overwrite", action="store_true", help="replace presets that already exist")
+    import_parser.add_argument("--workers", type=int, help="validation processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            report = export_archive(args.archive, args.names or None)
+            verb = "Exported"
+        else:
+            report = import_archive(args.archive, args.overwrite, args.workers)
+            verb = "Imported"
+    except (OSError, ValueError, tarfile.TarError, zipfile.BadZipFile) as e:
+        print("Archive error: {}".format(e), file=sys.stderr)
+        return 1
+    for member, error in sorted(report.errors.items()):
+        print("skipped {}: {}".format(member, error), file=sys.stderr)
+    print("{} {} → {}".format(verb, report.summary(), args.archive))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
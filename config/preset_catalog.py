@@ -0,0 +1,138 @@
+"""
+In-process catalog of the preset directory: a sorted name list with
+metadata, refreshed by a background watcher and announced to subscribers.
+"""
+import threading
+import time
+
+from config.config_cache import FrozenList
+
+# How often the watcher stats the preset directory
+POLL_INTERVAL = 0.5
+# Files edited in place do not touch the directory; stat each of them this often
+FULL_SCAN_INTERVAL = 2.0
+# Wait for the directory to stay unchanged this long before rescanning a burst of writes
+DEBOUNCE = 0.3
+
+
+class PresetInfo:
+    """Name, size, mtime and config hash of one preset file."""
+
+    def __init__(self, name, size, mtime_ns, hash):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.hash = hash
+
+
+class PresetCatalog:
+    """
+    Sorted preset names and PresetInfo, derived from a PresetIndex.
+
+    ``names()`` returns the same read-only list until the index changes, so
+    listing presets costs nothing. The list is rebuilt when save_preset() or
+    delete_preset() report a change, or when the watcher notices files
+    changed outside the app. Subscribers are called with the new list from
+    the thread that noticed the change.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.lock = threading.RLock()
+        self.version = None
+        self.sorted_names = FrozenList()
+        self.infos = {}
+        self.listeners = []
+        self.watcher = None
+        self.stop_event = threading.Event()
+
+    # ------------------------------------------------------------------
+
+    def names(self):
+        """Return the sorted, read-only list of preset names."""
+        if self.version is None:
+            self.sync()
+        return self.sorted_names
+
+    def info(self, name):
+        """Return the PresetInfo of a preset, or None."""
+        if self.version is None:
+            self.sync()
+        return self.infos.get(name)
+
+    def __contains__(self, name):
+        return self.info(name) is not None
+
+    def subscribe(self, callback):
+        """Call ``callback(names)`` after every change; returns a function that unsubscribes."""
+        with self.lock:
+            self.listeners.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def sync(self):
+        """Rebuild the name list if the index changed, and tell the subscribers."""
+        with self.lock:
+            entries = self.index.entries()
+            if self.index.version == self.version:
+                return False
+            self.version = self.index.version
+            infos = {}
+            for name, entry in entries.items():
+                mtime_ns, size, _ = entry["signature"]
+                infos[name] = PresetInfo(name, size, mtime_ns, entry["hash"])
+            self.infos = infos
+            self.sorted_names = FrozenList(sorted(infos, key=str.casefold))
+            names = self.sorted_names
+            listeners = list(self.listeners)
+        for callback in listeners:
+            callback(names)
+        return True
+
+    def rescan(self):
+        """Stat every preset file now and pick up changes made outside the app."""
+        self.index.refresh()
+        return self.sync()
+
+    # ------------------------------------------------------------------
+
+    def start_watching(self):
+        """Poll the preset directory on a daemon thread until stop_watching()."""
+        if self.watcher is not None and self.watcher.is_alive():
+            return
+        self.stop_event.clear()
+        self.watcher = threading.Thread(target=self._watch, name="preset-catalog", daemon=True)
+        self.watcher.start()
+
+    def stop_watching(self):
+        self.stop_event.set()
+        if self.watcher is not None:
+            self.watcher.join(timeout=1.0)
+            self.watcher = None
+
+    def _watch(self):
+        last_full_scan = time.monotonic()
+        while not self.stop_event.wait(POLL_INTERVAL):
+            try:
+                if self.index.directory_changed():
+                    self._settle()
+                elif time.monotonic() - last_full_scan < FULL_SCAN_INTERVAL:
+                    continue
+                self.rescan()
+                last_full_scan = time.monotonic()
+            except Exception:
+                # A preset being written or removed mid-scan; the next round sees it settled
+                continue
+
+    def _settle(self):
+        """Wait until the directory stops changing, so a burst of writes is scanned once."""
+        mtime_ns = self.index.stat_directory()
+        while not self.stop_event.wait(DEBOUNCE):
+            current = self.index.stat_directory()
+            if current == mtime_ns:
+                return
+            mtime_ns = current
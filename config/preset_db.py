@@ -0,0 +1,326 @@
+"""
+Optional SQLite preset library for collections of thousands of presets.
+
+When config/presets.db exists, preset_manager keeps presets there instead of
+one JSON file each in presets/. Move presets in or out with:
+
+    python -m config.preset_db import [DIR]     # presets/*.json -> config/presets.db
+    python -m config.preset_db export DIR       # config/presets.db -> DIR/*.json
+    python -m config.preset_db list [--tag TAG]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from config.action_config import canonical_config_bytes, config_hash, normalize_config
+from config.config_cache import freeze
+
+DEFAULT_DB_PATH = "config/presets.db"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS presets (
+    name TEXT PRIMARY KEY,
+    config BLOB NOT NULL,
+    hash TEXT NOT NULL,
+    created_ns INTEGER NOT NULL,
+    updated_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS presets_hash ON presets (hash);
+CREATE TABLE IF NOT EXISTS preset_tags (
+    name TEXT NOT NULL REFERENCES presets (name) ON DELETE CASCADE ON UPDATE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (name, tag)
+);
+CREATE INDEX IF NOT EXISTS preset_tags_tag ON preset_tags (tag);
+"""
+
+
+class SqlitePresetStore:
+    """
+    Presets in one SQLite database in WAL mode: the canonical config bytes,
+    their config_hash(), tags and created/updated timestamps.
+
+    Offers the preset_manager API (list_presets, load_preset, save_preset,
+    delete_preset) plus hash lookups, tags and transactions spanning several
+    presets. It also stands in for PresetIndex behind the PresetCatalog:
+    ``version`` changes on every write, including commits made by other
+    processes sharing the database.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = None
+        self.depth = 0
+        self.files = None
+        self.version = 0
+        self.data_version = None
+        self.configs = {}
+
+    # ------------------------------------------------------------------
+
+    def connect(self):
+        """Open the database and create the tables on first use."""
+        with self.lock:
+            if self.connection is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.execute("PRAGMA foreign_keys=ON")
+                connection.executescript(SCHEMA)
+                connection.execute("PRAGMA user_version={}".format(SCHEMA_VERSION))
+                self.connection = connection
+            return self.connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one atomic commit; transactions may nest."""
+        with self.lock:
+            connection = self.connect()
+            if self.depth == 0:
+                connection.execute("BEGIN IMMEDIATE")
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    connection.execute("ROLLBACK")
+                    self.files = None
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                connection.execute("COMMIT")
+                self._changed()
+
+    # ------------------------------------------------------------------
+
+    def list_presets(self):
+        """Return the sorted preset names."""
+        with self.lock:
+            rows = self.connect().execute("SELECT name FROM presets ORDER BY name").fetchall()
+        return [name for name, in rows]
+
+    def load_preset(self, name):
+        """Return the read-only configuration of a preset; raises FileNotFoundError like the file backend."""
+        with self.lock:
+            row = self.connect().execute("SELECT hash, config FROM presets WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                raise FileNotFoundError("No preset named '{}' in {}".format(name, self.path))
+            digest, blob = row
+            config = self.configs.get(digest)
+            if config is None:
+                # Stored blobs were normalized by save_presets(); parsing is enough
+                config = freeze(json.loads(blob))
+                self.configs[digest] = config
+            return config
+
+    def save_preset(self, name, config, tags=None):
+        """Validate and store a preset, replacing one of the same name; ``tags`` replaces its tags."""
+        self.save_presets([(name, config)], tags={name: tags} if tags is not None else None)
+
+    def save_presets(self, presets, tags=None):
+        """Validate and store (name, config) pairs in one transaction; nothing is stored if one is invalid."""
+        rows = []
+        for name, config in presets:
+            blob = canonical_config_bytes(normalize_config(config, strict=True))
+            # The same digest as config_hash(), without normalizing twice
+            rows.append((name, blob, hashlib.sha256(blob).hexdigest()))
+        now = time.time_ns()
+        with self.transaction() as store:
+            store.connection.executemany(
+                "INSERT INTO presets (name, config, hash, created_ns, updated_ns) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET config = excluded.config, hash = excluded.hash, "
+                "updated_ns = excluded.updated_ns",
+                [(name, blob, digest, now, now) for name, blob, digest in rows],
+            )
+            for name, preset_tags in (tags or {}).items():
+                if preset_tags is not None:
+                    store.set_tags(name, preset_tags)
+        return len(rows)
+
+    def delete_preset(self, name):
+        """Delete a preset if it exists."""
+        self.delete_presets([name])
+
+    def delete_presets(self, names):
+        """Delete several presets in one transaction."""
+        with self.transaction() as store:
+            store.connection.executemany("DELETE FROM presets WHERE name = ?", [(name,) for name in names])
+
+    def rename_preset(self, name, new_name):
+        """Rename a preset, keeping its tags."""
+        with self.transaction() as store:
+            store.connection.execute(
+                "UPDATE presets SET name = ?, updated_ns = ? WHERE name = ?", (new_name, time.time_ns(), name)
+            )
+
+    # ------------------------------------------------------------------
+
+    def find(self, config):
+        """Return the name of the preset equal to ``config``, or None."""
+        try:
+            digest = config_hash(config)
+        except (TypeError, ValueError):
+            return None
+        with self.lock:
+            row = self.connect().execute(
+                "SELECT name FROM presets WHERE hash = ? ORDER BY name LIMIT 1", (digest,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def tags(self, name):
+        """Return the sorted tags of a preset."""
+        with self.lock:
+            rows = self.connect().execute(
+                "SELECT tag FROM preset_tags WHERE name = ? ORDER BY tag", (name,)
+            ).fetchall()
+        return [tag for tag, in rows]
+
+    def set_tags(self, name, tags):
+        """Replace the tags of a preset."""
+        with self.transaction() as store:
+            store.connection.execute("DELETE FROM preset_tags WHERE name = ?", (name,))
+            store.connection.executemany(
+                "INSERT OR IGNORE INTO preset_tags (name, tag) VALUES (?, ?)",
+                [(name, str(tag).strip()) for tag in tags if str(tag).strip()],
+            )
+
+    def presets_with_tag(self, tag):
+        """Return the sorted names of the presets carrying ``tag``."""
+        with self.lock:
+            rows = self.connect().execute(
+                "SELECT name FROM preset_tags WHERE tag = ? ORDER BY name", (tag,)
+            ).fetchall()
+        return [name for name, in rows]
+
+    # ------------------------------------------------------------------
+
+    def import_directory(self, directory):
+        """
+        Store every *.json preset of a directory in one transaction.
+        Returns (number imported, {file name: error}); invalid files are skipped.
+        """
+        presets = []
+        errors = {}
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, file_name), "r", encoding="utf-8") as f:
+                    config = normalize_config(json.load(f), strict=True)
+            except (OSError, ValueError) as e:
+                errors[file_name] = str(e)
+                continue
+            presets.append((file_name[:-5], config))
+        return self.save_presets(presets), errors
+
+    def export_directory(self, directory):
+        """Write every preset as DIR/<name>.json, formatted like save_preset(). Returns the count."""
+        os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            rows = self.connect().execute("SELECT name, config FROM presets ORDER BY name").fetchall()
+        for name, blob in rows:
+            path = os.path.join(directory, f"{name}.json")
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(json.loads(blob), f, indent=4)
+            os.replace(tmp, path)
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # PresetIndex interface, used by the PresetCatalog
+
+    def entries(self):
+        """Return {name: {"signature": [updated_ns, size, 0], "hash": hex}}."""
+        with self.lock:
+            if self.files is None or self.directory_changed():
+                self._load_entries()
+            return dict(self.files)
+
+    def directory_changed(self):
+        """True when the database changed since the entries were read, in this or another process."""
+        return self.stat_directory() != self.data_version
+
+    def stat_directory(self):
+        """What directory_changed() compares: SQLite's data_version and our own write counter."""
+        with self.lock:
+            return self.connect().execute("PRAGMA data_version").fetchone()[0], self.version
+
+    def refresh(self):
+        """Reread the entries if the database changed. Returns True when it did."""
+        with self.lock:
+            if self.files is not None and not self.directory_changed():
+                return False
+            self._load_entries()
+            return True
+
+    def _load_entries(self):
+        self.data_version = self.stat_directory()
+        rows = self.connection.execute(
+            "SELECT name, hash, updated_ns, length(config) FROM presets"
+        ).fetchall()
+        self.files = {
+            name: {"signature": [updated_ns, size, 0], "hash": digest}
+            for name, digest, updated_ns, size in rows
+        }
+        self.version += 1
+        self.data_version = self.stat_directory()
+
+    def _changed(self):
+        # Our own commits do not change PRAGMA data_version; bump the version instead
+        self.version += 1
+        self.files = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="copy *.json presets into the database")
+    import_parser.add_argument("directory", nargs="?", default="presets")
+    export_parser = commands.add_parser("export", help="write every preset as a .json file")
+    export_parser.add_argument("directory")
+    list_parser = commands.add_parser("list", help="print preset names")
+    list_parser.add_argument("--tag")
+    args = parser.parse_args(argv)
+
+    store = SqlitePresetStore(args.db)
+    try:
+        if args.command == "import":
+            start = time.perf_counter()
+            count, errors = store.import_directory(args.directory)
+            for file_name, error in errors.items():
+                print("skipped {}: {}".format(file_name, error), file=sys.stderr)
+            print("Imported {} preset(s) into {} in {:.2f} s".format(count, args.db, time.perf_counter() - start))
+        elif args.command == "export":
+            print("Exported {} preset(s) to {}".format(store.export_directory(args.directory), args.directory))
+        else:
+            for name in store.presets_with_tag(args.tag) if args.tag else store.list_presets():
+                print(name)
+    except (OSError, sqlite3.Error) as e:
+        print("Preset database error: {}".format(e), file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Persistent index from the canonical hash of each preset to its name, so a
+device config can be matched to a preset without parsing every file.
+"""
+import json
+import os
+import threading
+
+from config.action_config import config_hash
+
+# Stored next to the presets; not a .json file, so list_presets() ignores it
+INDEX_FILENAME = ".preset_index"
+INDEX_VERSION = 1
+
+
+def preset_config_hash(config):
+    """config_hash() of a config, or None when it is not a valid configuration."""
+    try:
+        return config_hash(config)
+    except (TypeError, ValueError):
+        return None
+
+
+def scan_preset_files(directory):
+    """Return {preset name: [mtime_ns, size, inode]} for the .json files of a directory."""
+    signatures = {}
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return signatures
+    for entry in entries:
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        signatures[entry.name[:-5]] = [st.st_mtime_ns, st.st_size, st.st_ino]
+    return signatures
+
+
+class PresetIndex:
+    """
+    Maps config_hash() of every preset to its name.
+
+    The index is saved in the preset directory with the stat signature of
+    each file it hashed. On first use only the files whose signature changed
+    are parsed again; after that the index is updated by save_preset() and
+    delete_preset(). A lookup checks the directory mtime and the stat of the
+    matching file, and falls back to a stat-only rescan on a miss, so files
+    edited outside the app are still found.
+    """
+
+    def __init__(self, directory, load):
+        self.directory = directory
+        self.load = load
+        self.lock = threading.RLock()
+        self.files = None
+        self.by_hash = {}
+        self.directory_mtime_ns = None
+        # Bumped on every change, so readers can tell when to rebuild derived views
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.rehashed = 0
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, INDEX_FILENAME)
+
+    # ------------------------------------------------------------------
+
+    def find(self, config):
+        """Return the name of the preset equal to ``config``, or None."""
+        digest = preset_config_hash(config)
+        if digest is None:
+            return None
+        with self.lock:
+            if self.files is None:
+                self._open()
+            elif self.directory_changed():
+                self.refresh()
+            name = self._lookup(digest)
+            if name is None and self.refresh():
+                name = self._lookup(digest)
+            if name is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return name
+
+    def update(self, name, config):
+        """Record a preset that was just written."""
+        self.update_many([(name, config)])
+
+    def update_many(self, presets):
+        """Record several (name, config) presets that were just written, saving the index once."""
+        with self.lock:
+            if self.files is None:
+                return
+            for name, config in presets:
+                path = os.path.join(self.directory, f"{name}.json")
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    self._discard(name)
+                    continue
+                self._set(name, [st.st_mtime_ns, st.st_size, st.st_ino], preset_config_hash(config))
+            self._save()
+
+    def remove(self, name):
+        """Forget a preset that was just deleted."""
+        with self.lock:
+            if self.files is None or name not in self.files:
+                return
+            self._discard(name)
+            self._save()
+
+    def entries(self):
+        """Return {name: {"signature": [mtime_ns, size, inode], "hash": hex}}, loading the index if needed."""
+        with self.lock:
+            if self.files is None:
+                self._open()
+            return dict(self.files)
+
+    def directory_changed(self):
+        """True when a file was added, removed or replaced since the last refresh."""
+        return self.stat_directory() != self.directory_mtime_ns
+
+    def stat_directory(self):
+        """mtime_ns of the preset directory, or None if it does not exist."""
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self):
+        """
+        Stat every preset file and rehash the changed ones.
+        Returns True when the index changed.
+        """
+        with self.lock:
+            if self.files is None:
+                self.files = {}
+            self.directory_mtime_ns = self.stat_directory()
+            signatures = scan_preset_files(self.directory)
+            changed = False
+            for name in [name for name in self.files if name not in signatures]:
+                self._discard(name)
+                changed = True
+            for name, signature in signatures.items():
+                entry = self.files.get(name)
+                if entry is not None and entry["signature"] == signature:
+                    continue
+                self._set(name, signature, self._hash_file(name))
+                self.rehashed += 1
+                changed = True
+            if changed:
+                self._save()
+            return changed
+
+    def stats(self):
+        with self.lock:
+            return {
+                "presets": len(self.files or {}),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rehashed": self.rehashed,
+            }
+
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        self.files = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = None
+        if isinstance(stored, dict) and stored.get("version") == INDEX_VERSION:
+            for name, entry in stored.get("files", {}).items():
+                if isinstance(entry, dict) and "signature" in entry:
+                    self._set(name, entry["signature"], entry.get("hash"))
+        self.refresh()
+
+    def _lookup(self, digest):
+        for name in sorted(self.by_hash.get(digest, ())):
+            entry = self.files[name]
+            try:
+                st = os.stat(os.path.join(self.directory, f"{name}.json"))
+            except OSError:
+                continue
+            if [st.st_mtime_ns, st.st_size, st.st_ino] == entry["signature"]:
+                return name
+        return None
+
+    def _hash_file(self, name):
+        try:
+            return preset_config_hash(self.load(os.path.join(self.directory, f"{name}.json")))
+        except (OSError, ValueError):
+            return None
+
+    def _set(self, name, signature, digest):
+        self._discard(name)
+        self.files[name] = {"signature": list(signature), "hash": digest}
+        self.version += 1
+        if digest is not None:
+            self.by_hash.setdefault(digest, set()).add(name)
+
+    def _discard(self, name):
+        entry = self.files.pop(name, None)
+        if entry is None:
+            return
+        self.version += 1
+        if entry["hash"] is None:
+            return
+        names = self.by_hash.get(entry["hash"])
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self.by_hash[entry["hash"]]
+
+    def _save(self):
+        if not os.path.isdir(self.directory):
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "files": self.files}, f, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError:
+            # The index is only a cache: a missing file is rebuilt on next start
+            return
+        # Writing the index touches the directory; do not take that for a preset change
+        self.directory_mtime_ns = self.stat_directory()
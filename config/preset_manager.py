@@ -1,47 +1,129 @@
 import os
 import json
 from config.action_config import normalize_config
+from config.config_cache import StatCache
+from config.history import PRESET_TARGET_PREFIX, preset_target, record_baselines_quietly, record_quietly
+from config.preset_catalog import PresetCatalog
+from config.preset_db import DEFAULT_DB_PATH, SqlitePresetStore
+from config.preset_index import PresetIndex
 
 # Directory where all preset JSON files are stored
 PRESET_DIR = "presets"
+# Optional SQLite preset library, used instead of PRESET_DIR when it exists
+# (create it with: python -m config.preset_db import)
+PRESET_DB_PATH = DEFAULT_DB_PATH
+PRESET_STORE = SqlitePresetStore(PRESET_DB_PATH) if os.path.exists(PRESET_DB_PATH) else None
+
+# Parsed preset files, reused until a file changes on disk
+PRESET_CACHE = StatCache()
 
 
 def list_presets():
     """
-    Return a list of available preset names (without .json extension).
-    Creates the presets directory if it doesn't exist.
+    Return the sorted, read-only list of preset names (without .json extension).
+    Creates the presets directory on first use if it doesn't exist.
     """
-    if not os.path.exists(PRESET_DIR):
-        os.makedirs(PRESET_DIR)
-    return [f[:-5] for f in os.listdir(PRESET_DIR) if f.endswith(".json")]
+    if PRESET_CATALOG.version is None and PRESET_STORE is None:
+        os.makedirs(PRESET_DIR, exist_ok=True)
+    return PRESET_CATALOG.names()
 
 
 def load_preset(name):
     """
     Load a preset by name and return its configuration data.
+    The result is read-only and shared; use config_cache.thaw() to edit it.
     """
-    path = os.path.join(PRESET_DIR, f"{name}.json")
+    if PRESET_STORE is not None:
+        return PRESET_STORE.load_preset(name)
+    return load_preset_file(os.path.join(PRESET_DIR, f"{name}.json"))
+
+
+def read_preset_file(path):
+    """Parse and normalize a preset file, bypassing the cache."""
     with open(path, "r", encoding="utf-8") as f:
         return normalize_config(json.load(f))
 
 
+def load_preset_file(path):
+    """Load a preset file through the cache."""
+    return PRESET_CACHE.get(path, read_preset_file)
+
+
+# config hash -> preset name, kept in PRESET_DIR across runs (the database has its own)
+PRESET_INDEX = PRESET_STORE or PresetIndex(PRESET_DIR, load_preset_file)
+# Sorted names and metadata; start_watching() picks up changes made outside the app
+PRESET_CATALOG = PresetCatalog(PRESET_INDEX)
+
+
+def find_preset(config):
+    """Return the name of the preset whose configuration equals ``config``, or None."""
+    return PRESET_INDEX.find(config)
+
+
 def save_preset(name, config):
     """
     Save the given configuration under the specified preset name.
     Creates the presets directory if needed.
     """
-    if not os.path.exists(PRESET_DIR):
-        os.makedirs(PRESET_DIR)
-    path = os.path.join(PRESET_DIR, f"{name}.json")
-    normalized = normalize_config(config, strict=True)
-    with open(path, "w", encoding="utf-8") as f:
+    save_presets([(name, config)])
+
+
+def save_presets(presets):
+    """
+    Save several (name, config) pairs at once: one database transaction, or
+    one preset file each followed by a single index update. Every config is
+    validated before anything is written.
+    """
+    presets = [(name, normalize_config(config, strict=True)) for name, config in presets]
+    record_baselines_quietly([preset_target(name) for name, _ in presets], current_preset)
+    if PRESET_STORE is not None:
+        PRESET_STORE.save_presets(presets)
+    else:
+        os.makedirs(PRESET_DIR, exist_ok=True)
+        for name, normalized in presets:
+            write_preset_file(os.path.join(PRESET_DIR, f"{name}.json"), normalized)
+        PRESET_INDEX.update_many(presets)
+    PRESET_CATALOG.sync()
+    record_quietly([(preset_target(name), normalized) for name, normalized in presets])
+    return len(presets)
+
+
+def write_preset_file(path, normalized):
+    """Atomically write one normalized preset."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
         json.dump(normalized, f, indent=4)
+    # Atomic replace: a new inode, so no reader can match a stale cache entry
+    os.replace(tmp, path)
+    PRESET_CACHE.put(path, normalized)
 
 
 def delete_preset(name):
     """
     Delete the preset file with the given name if it exists.
+    The history keeps its last version, so a deletion can be undone.
     """
-    path = os.path.join(PRESET_DIR, f"{name}.json")
-    if os.path.exists(path):
-        os.remove(path)
+    record_baselines_quietly([preset_target(name)], current_preset)
+    if PRESET_STORE is not None:
+        PRESET_STORE.delete_preset(name)
+    else:
+        path = os.path.join(PRESET_DIR, f"{name}.json")
+        if os.path.exists(path):
+            os.remove(path)
+        PRESET_CACHE.invalidate(path)
+        PRESET_INDEX.remove(name)
+    PRESET_CATALOG.sync()
+    record_quietly([(preset_target(name), None)])
+
+
+def current_preset(target):
+    """The configuration a preset history target holds now, or None."""
+    try:
+        return load_preset(target[len(PRESET_TARGET_PREFIX):])
+    except (OSError, ValueError):
+        return None
+
+
+def preset_cache_stats():
+    """Hit/miss counters of the preset cache."""
+    return PRESET_CACHE.stats()
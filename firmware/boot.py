@@ -0,0 +1,5 @@
+import usb_cdc
+
+# Expose a second USB serial port for the framed control protocol
+# (lib/pedal_protocol.py) next to the REPL console.
+usb_cdc.enable(console=True, data=True)
@@ -1,18 +1,94 @@
+import gc
 import json
+import struct
 import time
 
 import board
 import digitalio
+import supervisor
+import usb_cdc
 import usb_hid
+from adafruit_hid import find_device
 from adafruit_hid.consumer_control import ConsumerControl
 from adafruit_hid.consumer_control_code import ConsumerControlCode
 from adafruit_hid.keyboard import Keyboard
 from adafruit_hid.keycode import Keycode
 
+try:
+    import keypad
+except ImportError:
+    keypad = None
+
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+try:
+    import pedal_protocol
+except ImportError:
+    pedal_protocol = None
+
 CONFIG_PATH = "/config.json"
+COMPILED_PATH = "/config.bin"
+BANK_PATH = "/presets.bin"
 POLL_INTERVAL = 0.01
 DEBOUNCE_INTERVAL = 0.02
 
+# supervisor.ticks_ms() wraps around at 2**29
+TICKS_MASK = (1 << 29) - 1
+
+SCAN_ENGINES = ("keypad", "poll")
+HID_MODES = ("raw", "adafruit")
+DEFAULT_SETTINGS = {
+    "scan": "keypad",
+    "hid": "raw",
+    "debounce_ms": int(DEBOUNCE_INTERVAL * 1000),
+    "poll_interval_ms": int(POLL_INTERVAL * 1000),
+    "scan_interval_ms": 1,
+    "stats_every": 0,
+    "telemetry_ms": 0,
+    "pin_debounce_ms": {},
+}
+NUMERIC_SETTINGS = ("debounce_ms", "poll_interval_ms", "scan_interval_ms", "stats_every", "telemetry_ms")
+
+KEYBOARD_USAGE_PAGE = 0x01
+KEYBOARD_USAGE = 0x06
+CONSUMER_USAGE_PAGE = 0x0C
+CONSUMER_USAGE = 0x01
+KEYBOARD_REPORT_LENGTH = 8
+FIRST_MODIFIER = 0xE0
+LAST_MODIFIER = 0xE7
+
+# Precompiled action table written by the desktop app (config/firmware_compiler.py)
+COMPILED_MAGIC = b"PDLC"
+COMPILED_VERSION = 4
+COMPILED_HEADER = "<4sBBBBHHHHHII"
+COMPILED_HEADER_SIZE = struct.calcsize(COMPILED_HEADER)
+COMPILED_ACTIONS = (None, "key", "cmb", "ccc")
+DEBOUNCE_MODES = ("window", "eager")
+COMPILED_SETTINGS = ("debounce_ms", "poll_interval_ms", "scan_interval_ms", "stats_every", "telemetry_ms")
+UNSET_U8 = 0xFF
+UNSET_U16 = 0xFFFF
+# Default release lockout of "eager" pins: just above typical release bounce
+EAGER_RELEASE_LOCKOUT_MS = 5
+
+# Preset bank: "PDLB" | version u8 | preset count u8, then per preset
+# name length u8 | name | table length u16 | compiled table
+BANK_MAGIC = b"PDLB"
+BANK_VERSION = 1
+MAX_COMMAND_LENGTH = 128
+
+# Upper bounds (ms) of the loop-time histogram buckets; the last bucket
+# counts everything slower.
+TELEMETRY_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+
+# Debounce calibration: a burst of edges ends once the pin has been quiet
+# this long, and runs last at most this many seconds.
+CALIBRATION_QUIET_MS = 30
+CALIBRATION_SECONDS = 20
+MAX_CALIBRATION_SECONDS = 120
+
 
 def resolve_pin(pin_name):
     if not hasattr(board, pin_name):
@@ -35,8 +111,23 @@ def resolve_consumer_value(value):
     return int(value)
 
 
+def normalize_options(raw_options):
+    options = {}
+    if not isinstance(raw_options, dict):
+        return options
+    if raw_options.get("debounce") in DEBOUNCE_MODES:
+        options["debounce"] = raw_options["debounce"]
+    for name in ("press_lockout_ms", "release_lockout_ms"):
+        try:
+            options[name] = max(0, int(raw_options[name]))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return options
+
+
 def normalize_entry(entry):
-    if not isinstance(entry, list) or len(entry) != 3:
+    # [pin, type, value] with optional per-pin options as a 4th element
+    if not isinstance(entry, list) or len(entry) not in (3, 4):
         raise ValueError("Invalid config entry: {}".format(entry))
 
     pin_name = entry[0]
@@ -55,12 +146,133 @@ def normalize_entry(entry):
     else:
         raise ValueError("Unsupported action type: {}".format(action_type))
 
-    return [pin_name, pin, action_type, action_value]
+    options = normalize_options(entry[3]) if len(entry) == 4 else {}
+    return [pin_name, pin, action_type, action_value, options]
+
+
+def load_settings(raw_settings):
+    settings = dict(DEFAULT_SETTINGS)
+    if isinstance(raw_settings, dict):
+        settings.update(raw_settings)
+
+    if settings["scan"] not in SCAN_ENGINES:
+        settings["scan"] = DEFAULT_SETTINGS["scan"]
+    if settings["scan"] == "keypad" and keypad is None:
+        settings["scan"] = "poll"
+    if settings["hid"] not in HID_MODES:
+        settings["hid"] = DEFAULT_SETTINGS["hid"]
+
+    for name in NUMERIC_SETTINGS:
+        try:
+            settings[name] = max(0, int(settings[name]))
+        except (TypeError, ValueError):
+            settings[name] = DEFAULT_SETTINGS[name]
+
+    pin_debounce = {}
+    if isinstance(settings["pin_debounce_ms"], dict):
+        for pin_name, value in settings["pin_debounce_ms"].items():
+            try:
+                pin_debounce[pin_name] = max(0, int(value))
+            except (TypeError, ValueError):
+                pass
+    settings["pin_debounce_ms"] = pin_debounce
+
+    return settings
+
+
+def read_source():
+    try:
+        with open(CONFIG_PATH, "rb") as handle:
+            return handle.read()
+    except OSError:
+        return None
+
+
+def is_stale(source, size, checksum):
+    if source is None:
+        return False
+    if crc32 is None or size != len(source):
+        return True
+    return checksum != crc32(source) & 0xFFFFFFFF
+
+
+def decode_compiled(blob, source=None):
+    fields = struct.unpack_from(COMPILED_HEADER, blob, 0)
+    if fields[0] != COMPILED_MAGIC or fields[1] != COMPILED_VERSION:
+        return None
+    if is_stale(source, fields[10], fields[11]):
+        return None
+
+    raw_settings = {}
+    if fields[3] != UNSET_U8:
+        raw_settings["scan"] = SCAN_ENGINES[fields[3]]
+    if fields[4] != UNSET_U8:
+        raw_settings["hid"] = HID_MODES[fields[4]]
+    for index, name in enumerate(COMPILED_SETTINGS):
+        if fields[5 + index] != UNSET_U16:
+            raw_settings[name] = fields[5 + index]
+
+    config = []
+    pin_debounce = {}
+    offset = COMPILED_HEADER_SIZE
+    for _ in range(fields[2]):
+        length = blob[offset]
+        pin_name = str(blob[offset + 1:offset + 1 + length], "ascii")
+        offset += 1 + length
+        action_type = COMPILED_ACTIONS[blob[offset]]
+        count = blob[offset + 1]
+        offset += 2
+        codes = list(struct.unpack_from("<{}H".format(count), blob, offset))
+        offset += 2 * count
+        debounce, mode, press_lockout, release_lockout = struct.unpack_from("<HBHH", blob, offset)
+        offset += 7
+        if debounce != UNSET_U16:
+            pin_debounce[pin_name] = debounce
+        options = {}
+        if mode != UNSET_U8:
+            options["debounce"] = DEBOUNCE_MODES[mode]
+        if press_lockout != UNSET_U16:
+            options["press_lockout_ms"] = press_lockout
+        if release_lockout != UNSET_U16:
+            options["release_lockout_ms"] = release_lockout
+        value = codes if action_type == "cmb" else codes[0]
+        config.append([pin_name, resolve_pin(pin_name), action_type, value, options])
+
+    if not config:
+        return None
+    if pin_debounce:
+        raw_settings["pin_debounce_ms"] = pin_debounce
+    return load_settings(raw_settings), config
+
+
+def load_compiled_config(source):
+    try:
+        with open(COMPILED_PATH, "rb") as handle:
+            blob = handle.read()
+    except OSError:
+        return None
+
+    try:
+        return decode_compiled(blob, source)
+    except Exception:
+        return None
 
 
 def load_config():
-    with open(CONFIG_PATH, "r") as handle:
-        raw_config = json.load(handle)
+    # The compiled table skips JSON parsing and Keycode lookups at boot;
+    # config.json is only parsed when the table is missing or stale.
+    source = read_source()
+    compiled = load_compiled_config(source)
+    if compiled is not None:
+        return compiled
+    if source is None:
+        raise RuntimeError("config.json not found")
+
+    raw_config = json.loads(str(source, "utf-8"))
+    raw_settings = None
+    if isinstance(raw_config, dict):
+        raw_settings = raw_config.get("settings")
+        raw_config = raw_config.get("buttons", [])
 
     config = []
     for entry in raw_config:
@@ -72,7 +284,86 @@ def load_config():
     if not config:
         raise RuntimeError("No valid button definitions found in config.json")
 
-    return config
+    return load_settings(raw_settings), config
+
+
+def encode_compiled(config, settings):
+    scan = SCAN_ENGINES.index(settings["scan"])
+    hid = HID_MODES.index(settings["hid"])
+    values = [min(settings[name], UNSET_U16) for name in COMPILED_SETTINGS]
+    parts = [
+        struct.pack(COMPILED_HEADER, COMPILED_MAGIC, COMPILED_VERSION, len(config), scan, hid,
+                    values[0], values[1], values[2], values[3], values[4], 0, 0)
+    ]
+    for entry in config:
+        codes = entry[3] if isinstance(entry[3], list) else [entry[3]]
+        pin_name = entry[0].encode("ascii")
+        parts.append(struct.pack("<B", len(pin_name)) + pin_name)
+        parts.append(struct.pack("<BB", COMPILED_ACTIONS.index(entry[2]), len(codes)))
+        parts.append(struct.pack("<{}H".format(len(codes)), *codes))
+        debounce = settings["pin_debounce_ms"].get(entry[0], UNSET_U16)
+        options = entry[4]
+        parts.append(struct.pack(
+            "<HBHH",
+            min(debounce, UNSET_U16),
+            DEBOUNCE_MODES.index(options["debounce"]) if "debounce" in options else UNSET_U8,
+            min(options.get("press_lockout_ms", UNSET_U16), UNSET_U16),
+            min(options.get("release_lockout_ms", UNSET_U16), UNSET_U16),
+        ))
+    return b"".join(parts)
+
+
+def load_bank():
+    try:
+        with open(BANK_PATH, "rb") as handle:
+            blob = handle.read()
+    except OSError:
+        return {}
+
+    bank = {}
+    try:
+        if blob[:4] != BANK_MAGIC or blob[4] != BANK_VERSION:
+            return {}
+        offset = 6
+        for _ in range(blob[5]):
+            length = blob[offset]
+            name = str(blob[offset + 1:offset + 1 + length], "utf-8")
+            offset += 1 + length
+            size = struct.unpack_from("<H", blob, offset)[0]
+            offset += 2
+            bank[name] = blob[offset:offset + size]
+            offset += size
+    except Exception:
+        return {}
+    return bank
+
+
+def ticks_elapsed(now, then):
+    return (now - then) & TICKS_MASK
+
+
+def pin_debounce(settings, entry):
+    return settings["pin_debounce_ms"].get(entry[0], settings["debounce_ms"])
+
+
+def pin_lockouts(settings, entry):
+    """
+    Return (press lockout, release lockout) in ms for one pin.
+
+    A change is applied on its first edge unless it comes within the lockout
+    of the previous change: the press lockout after a press, the release
+    lockout after a release. "window" pins (the default) use their debounce
+    for both. "eager" pins can set them separately; their release lockout
+    defaults to a few ms, so a quick re-press is not held back.
+    """
+    debounce = pin_debounce(settings, entry)
+    options = entry[4]
+    if options.get("debounce") != "eager":
+        return debounce, debounce
+    return (
+        options.get("press_lockout_ms", debounce),
+        options.get("release_lockout_ms", min(debounce, EAGER_RELEASE_LOCKOUT_MS)),
+    )
 
 
 def create_button(pin):
@@ -86,8 +377,9 @@ def press_keyboard(value, keyboard):
     if isinstance(value, list):
         for key in value:
             keyboard.press(key)
-    else:
-        keyboard.press(value)
+        return len(value)
+    keyboard.press(value)
+    return 1
 
 
 def release_keyboard(value, keyboard):
@@ -95,6 +387,7 @@ def release_keyboard(value, keyboard):
         keyboard.release_all()
     else:
         keyboard.release(value)
+    return 1
 
 
 def press_action(entry, keyboard, consumer_control):
@@ -102,9 +395,11 @@ def press_action(entry, keyboard, consumer_control):
     value = entry[3]
 
     if action_type in ("key", "cmb"):
-        press_keyboard(value, keyboard)
-    elif action_type == "ccc":
+        return press_keyboard(value, keyboard)
+    if action_type == "ccc":
         consumer_control.press(value)
+        return 1
+    return 0
 
 
 def release_action(entry, keyboard, consumer_control):
@@ -112,41 +407,616 @@ def release_action(entry, keyboard, consumer_control):
     value = entry[3]
 
     if action_type in ("key", "cmb"):
-        release_keyboard(value, keyboard)
-    elif action_type == "ccc":
+        return release_keyboard(value, keyboard)
+    if action_type == "ccc":
         consumer_control.release()
-
-
-def main():
-    config = load_config()
-    keyboard = Keyboard(usb_hid.devices)
-    consumer_control = ConsumerControl(usb_hid.devices)
+        return 1
+    return 0
+
+
+def build_keyboard_report(codes):
+    report = bytearray(KEYBOARD_REPORT_LENGTH)
+    slot = 2
+    for code in codes:
+        if FIRST_MODIFIER <= code <= LAST_MODIFIER:
+            report[0] |= 1 << (code - FIRST_MODIFIER)
+        elif slot < KEYBOARD_REPORT_LENGTH and code not in report[2:slot]:
+            report[slot] = code
+            slot += 1
+    return report
+
+
+def build_report(entry):
+    if entry[2] == "ccc":
+        return struct.pack("<H", entry[3])
+    if isinstance(entry[3], list):
+        return build_keyboard_report(entry[3])
+    return build_keyboard_report([entry[3]])
+
+
+class AdafruitHid:
+    """Sends actions through adafruit_hid, one report per key of a combo."""
+
+    def __init__(self, devices):
+        self.keyboard = Keyboard(devices)
+        self.consumer_control = ConsumerControl(devices)
+        self.actions = 0
+        self.reports = 0
+
+    def press(self, entry):
+        self.actions += 1
+        self.reports += press_action(entry, self.keyboard, self.consumer_control)
+
+    def release(self, entry):
+        self.reports += release_action(entry, self.keyboard, self.consumer_control)
+
+    def prepare(self, config):
+        pass
+
+    def release_all(self):
+        self.keyboard.release_all()
+        self.consumer_control.release()
+
+
+class RawHid:
+    """Sends the report prebuilt for each action, one send_report per change."""
+
+    def __init__(self, devices):
+        self.keyboard = find_device(devices, usage_page=KEYBOARD_USAGE_PAGE, usage=KEYBOARD_USAGE)
+        self.consumer = find_device(devices, usage_page=CONSUMER_USAGE_PAGE, usage=CONSUMER_USAGE)
+        self.composed = bytearray(KEYBOARD_REPORT_LENGTH)
+        self.empty_keyboard = bytes(KEYBOARD_REPORT_LENGTH)
+        self.empty_consumer = bytes(2)
+        self.held = []
+        self.actions = 0
+        self.reports = 0
+
+    def prepare(self, config):
+        for entry in config:
+            entry[5:] = [build_report(entry)]
+
+    def release_all(self):
+        self.held = []
+        self.keyboard.send_report(self.empty_keyboard)
+        self.consumer.send_report(self.empty_consumer)
+
+    def compose(self):
+        # Only needed while several keyboard pedals are held at once.
+        report = self.composed
+        for index in range(KEYBOARD_REPORT_LENGTH):
+            report[index] = 0
+        slot = 2
+        for prebuilt in self.held:
+            report[0] |= prebuilt[0]
+            for index in range(2, KEYBOARD_REPORT_LENGTH):
+                code = prebuilt[index]
+                if code and slot < KEYBOARD_REPORT_LENGTH and not report_has_code(report, code, slot):
+                    report[slot] = code
+                    slot += 1
+        return report
+
+    def press(self, entry):
+        self.actions += 1
+        self.reports += 1
+        prebuilt = entry[5]
+        if entry[2] == "ccc":
+            self.consumer.send_report(prebuilt)
+            return
+
+        self.held.append(prebuilt)
+        if len(self.held) == 1:
+            self.keyboard.send_report(prebuilt)
+        else:
+            self.keyboard.send_report(self.compose())
+
+    def release(self, entry):
+        self.reports += 1
+        prebuilt = entry[5]
+        if entry[2] == "ccc":
+            self.consumer.send_report(self.empty_consumer)
+            return
+
+        if prebuilt in self.held:
+            self.held.remove(prebuilt)
+        if self.held:
+            self.keyboard.send_report(self.compose())
+        else:
+            self.keyboard.send_report(self.empty_keyboard)
+
+
+def report_has_code(report, code, end):
+    # Same as "code in report[2:end]" without allocating a slice.
+    index = 2
+    while index < end:
+        if report[index] == code:
+            return True
+        index += 1
+    return False
+
+
+def create_hid(settings):
+    if settings["hid"] == "adafruit":
+        return AdafruitHid(usb_hid.devices)
+    return RawHid(usb_hid.devices)
+
+
+class CommandReader:
+    """Collects newline-terminated commands from the USB serial console."""
+
+    def __init__(self, stream, control):
+        self.stream = stream
+        self.control = control
+        self.buffer = b""
+
+    def pending(self):
+        return self.stream is not None and self.stream.in_waiting > 0
+
+    def read_line(self):
+        self.buffer += self.stream.read(self.stream.in_waiting)
+        index = self.buffer.find(b"\n")
+        if index < 0:
+            if len(self.buffer) > MAX_COMMAND_LENGTH:
+                self.buffer = b""
+            return None
+        line = self.buffer[:index]
+        self.buffer = self.buffer[index + 1:]
+        return str(line, "utf-8").strip()
+
+    def poll(self):
+        """Handle pending commands and return a new button config to switch to, if any."""
+        line = self.read_line()
+        while line is not None:
+            config = self.handle(line)
+            if config is not None:
+                return config
+            line = self.read_line() if self.buffer else None
+        return None
+
+    def handle(self, line):
+        command, _, argument = line.partition(" ")
+        if command == "presets":
+            print("ok presets {}".format(",".join(sorted(self.control.bank))))
+        elif command == "preset":
+            try:
+                config = self.control.load_preset(argument)
+            except Exception as exc:
+                print("error preset {}: {}".format(argument, exc))
+                return None
+            print("ok preset {}".format(argument))
+            return config
+        elif command == "calibrate":
+            try:
+                seconds = int(argument) if argument else CALIBRATION_SECONDS
+            except ValueError:
+                print("error calibrate {}: not a number of seconds".format(argument))
+                return None
+            # The scan engine owns the pins; it stops and main() runs the
+            # calibration before restarting it with the same config.
+            self.control.calibration = max(1, min(seconds, MAX_CALIBRATION_SECONDS))
+            return self.control.config
+        elif line:
+            print("error unknown command {}".format(command))
+        return None
+
+
+class ProtocolServer:
+    """Answers framed requests (lib/pedal_protocol.py) on the USB CDC data port."""
+
+    def __init__(self, stream, control):
+        self.stream = stream
+        self.control = control
+        self.decoder = pedal_protocol.FrameDecoder()
+
+    def pending(self):
+        return self.stream.in_waiting > 0
+
+    def poll(self):
+        switched = None
+        for message_type, sequence, body in self.decoder.feed(self.stream.read(self.stream.in_waiting)):
+            try:
+                reply, config = self.handle(message_type, body)
+            except Exception as exc:
+                self.send(pedal_protocol.ERROR, sequence, str(exc).encode("utf-8"))
+                continue
+            self.send(message_type | pedal_protocol.RESPONSE_FLAG, sequence, reply)
+            if config is not None:
+                switched = config
+        return switched
+
+    def handle(self, message_type, body):
+        control = self.control
+        if message_type == pedal_protocol.PING:
+            return body, None
+        if message_type == pedal_protocol.GET_CONFIG:
+            return encode_compiled(control.config, control.settings), None
+        if message_type == pedal_protocol.SET_CONFIG:
+            decoded = decode_compiled(body)
+            if decoded is None:
+                raise ValueError("invalid config table")
+            return b"", decoded[1]
+        if message_type == pedal_protocol.SWITCH_PRESET:
+            return b"", control.load_preset(str(body, "utf-8"))
+        if message_type == pedal_protocol.STREAM_EVENTS:
+            control.streaming = bool(body) and body[0] != 0
+            return b"", None
+        if message_type == pedal_protocol.GET_STATS:
+            stats = struct.pack(
+                pedal_protocol.STATS_FORMAT,
+                control.hid.actions,
+                control.hid.reports,
+                self.decoder.received,
+                self.decoder.rejected,
+            )
+            return stats, None
+        raise ValueError("unknown message type {}".format(message_type))
+
+    def send(self, message_type, sequence, body=b""):
+        self.stream.write(pedal_protocol.encode_frame(message_type, sequence, body))
+
+    def send_event(self, index, is_pressed, stamp):
+        body = struct.pack(pedal_protocol.EVENT_FORMAT, index, 1 if is_pressed else 0, stamp)
+        self.send(pedal_protocol.EVENT, 0, body)
+
+
+class Control:
+    """Serial control plane: text commands on the console, framed requests on the data port."""
+
+    def __init__(self, console, data, bank, settings):
+        self.bank = bank
+        self.settings = settings
+        self.config = None
+        self.hid = None
+        self.streaming = False
+        self.calibration = 0
+        self.commands = CommandReader(console, self)
+        self.protocol = None
+        if data is not None and pedal_protocol is not None:
+            self.protocol = ProtocolServer(data, self)
+
+    def pending(self):
+        if self.commands.pending():
+            return True
+        return self.protocol is not None and self.protocol.pending()
+
+    def poll(self):
+        switched = None
+        if self.commands.pending():
+            switched = self.commands.poll()
+        if self.protocol is not None and self.protocol.pending():
+            switched = self.protocol.poll() or switched
+        return switched
+
+    def load_preset(self, name):
+        table = self.bank.get(name)
+        if table is None:
+            raise ValueError("unknown preset")
+        decoded = decode_compiled(table)
+        if decoded is None:
+            raise ValueError("invalid preset table")
+        return decoded[1]
+
+    def send_event(self, index, is_pressed, stamp):
+        if self.protocol is not None:
+            self.protocol.send_event(index, is_pressed, stamp)
+
+
+def report_stats(hid):
+    print(
+        "stats actions={} reports={} reports_per_action={:.2f}".format(
+            hid.actions, hid.reports, hid.reports / max(1, hid.actions)
+        )
+    )
+
+
+def apply_change(entry, is_pressed, hid, settings):
+    if is_pressed:
+        hid.press(entry)
+        stats_every = settings["stats_every"]
+        if stats_every and hid.actions % stats_every == 0:
+            report_stats(hid)
+    else:
+        hid.release(entry)
+
+
+class Telemetry:
+    """
+    Loop-time histogram, jitter and free heap, printed on the console every
+    interval_ms. tick() runs once per scan loop and does not allocate.
+    """
+
+    def __init__(self, interval_ms):
+        self.interval = interval_ms
+        self.counts = [0] * (len(TELEMETRY_BUCKETS) + 1)
+        self.last_mem_free = gc.mem_free()
+        self.reset(supervisor.ticks_ms())
+
+    def reset(self, now):
+        index = 0
+        while index < len(self.counts):
+            self.counts[index] = 0
+            index += 1
+        self.loops = 0
+        self.fastest = TICKS_MASK
+        self.slowest = 0
+        self.started = now
+        self.last = now
+
+    def tick(self):
+        now = supervisor.ticks_ms()
+        elapsed = ticks_elapsed(now, self.last)
+        self.last = now
+
+        bucket = 0
+        while bucket < len(TELEMETRY_BUCKETS) and elapsed > TELEMETRY_BUCKETS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.loops += 1
+        if elapsed > self.slowest:
+            self.slowest = elapsed
+        if elapsed < self.fastest:
+            self.fastest = elapsed
+
+        if ticks_elapsed(now, self.started) >= self.interval:
+            self.report()
+            # Printing is slow; keep it out of the next loop's timing.
+            self.reset(supervisor.ticks_ms())
+
+    def report(self):
+        mem_free = gc.mem_free()
+        histogram = []
+        for index, count in enumerate(self.counts):
+            if index < len(TELEMETRY_BUCKETS):
+                histogram.append("<={}:{}".format(TELEMETRY_BUCKETS[index], count))
+            else:
+                histogram.append(">{}:{}".format(TELEMETRY_BUCKETS[-1], count))
+        print(
+            "telemetry loops={} max_ms={} jitter_ms={} hist={} mem_free={} mem_delta={}".format(
+                self.loops,
+                self.slowest,
+                self.slowest - min(self.fastest, self.slowest),
+                ",".join(histogram),
+                mem_free,
+                mem_free - self.last_mem_free,
+            )
+        )
+        self.last_mem_free = mem_free
+
+
+def create_telemetry(settings):
+    if not settings["telemetry_ms"]:
+        return None
+    return Telemetry(settings["telemetry_ms"])
+
+
+# The scan loops below run forever, so they avoid heap allocation once
+# started: state lives in preallocated lists, times are supervisor.ticks_ms()
+# small ints instead of floats, and indexes are walked with while loops
+# rather than enumerate()/range() iterators. Anything that allocates
+# (HID reports, serial replies) only runs when a pedal or the host does
+# something.
+def run_poll_engine(config, settings, hid, control, telemetry):
+    poll_interval = settings["poll_interval_ms"] / 1000
 
     buttons = []
+    press_lockout = []
+    release_lockout = []
+    last_change = []
+    start = supervisor.ticks_ms()
     for entry in config:
         buttons.append(create_button(entry[1]))
+        lockouts = pin_lockouts(settings, entry)
+        press_lockout.append(lockouts[0])
+        release_lockout.append(lockouts[1])
+        last_change.append((start - max(lockouts)) & TICKS_MASK)
 
-    pressed = [False] * len(buttons)
-    last_change = [0.0] * len(buttons)
+    count = len(buttons)
+    pressed = [False] * count
 
     while True:
-        now = time.monotonic()
-        for index, button in enumerate(buttons):
-            is_pressed = not button.value
-
+        if control.pending():
+            switched = control.poll()
+            if switched is not None:
+                for button in buttons:
+                    button.deinit()
+                return switched
+
+        now = supervisor.ticks_ms()
+        index = 0
+        while index < count:
+            is_pressed = not buttons[index].value
             if is_pressed != pressed[index]:
-                if now - last_change[index] < DEBOUNCE_INTERVAL:
-                    continue
-
-                if is_pressed:
-                    press_action(config[index], keyboard, consumer_control)
+                if pressed[index]:
+                    lockout = press_lockout[index]
                 else:
-                    release_action(config[index], keyboard, consumer_control)
+                    lockout = release_lockout[index]
+                if ticks_elapsed(now, last_change[index]) >= lockout:
+                    apply_change(config[index], is_pressed, hid, settings)
+                    pressed[index] = is_pressed
+                    last_change[index] = now
+                    if control.streaming:
+                        control.send_event(index, is_pressed, now)
+            index += 1
+
+        if telemetry is not None:
+            telemetry.tick()
+        time.sleep(poll_interval)
+
+
+def run_keypad_engine(config, settings, hid, control, telemetry):
+    pins = [entry[1] for entry in config]
+    press_lockout = []
+    release_lockout = []
+    for entry in config:
+        lockouts = pin_lockouts(settings, entry)
+        press_lockout.append(lockouts[0])
+        release_lockout.append(lockouts[1])
+    keys = keypad.Keys(
+        pins,
+        value_when_pressed=False,
+        pull=True,
+        interval=settings["scan_interval_ms"] / 1000,
+    )
+
+    count = len(pins)
+    raw = [False] * count
+    pressed = [False] * count
+    start = supervisor.ticks_ms()
+    last_change = [(start - max(press_lockout[index], release_lockout[index])) & TICKS_MASK for index in range(count)]
+    unsettled = False
+    event = keypad.Event()
+    events = keys.events
+    # Older CircuitPython releases have no Event.timestamp.
+    timestamped = hasattr(event, "timestamp")
+
+    while True:
+        if control.pending():
+            switched = control.poll()
+            if switched is not None:
+                keys.deinit()
+                return switched
+
+        # Edges are timestamped by the background scanner, so the debounce
+        # window is measured from when the edge happened, not when we see it.
+        while events.get_into(event):
+            index = event.key_number
+            if timestamped:
+                stamp = event.timestamp
+            else:
+                stamp = supervisor.ticks_ms()
+
+            raw[index] = event.pressed
+            if raw[index] == pressed[index]:
+                continue
+            if pressed[index]:
+                lockout = press_lockout[index]
+            else:
+                lockout = release_lockout[index]
+            if ticks_elapsed(stamp, last_change[index]) < lockout:
+                unsettled = True
+                continue
+
+            apply_change(config[index], raw[index], hid, settings)
+            pressed[index] = raw[index]
+            last_change[index] = stamp
+            if control.streaming:
+                control.send_event(index, raw[index], stamp)
+
+        # An edge that arrived inside a lockout is applied once the lockout
+        # has passed, so a short bounce never leaves a key stuck.
+        if unsettled:
+            unsettled = False
+            now = supervisor.ticks_ms()
+            index = 0
+            while index < count:
+                if raw[index] != pressed[index]:
+                    if pressed[index]:
+                        lockout = press_lockout[index]
+                    else:
+                        lockout = release_lockout[index]
+                    if ticks_elapsed(now, last_change[index]) < lockout:
+                        unsettled = True
+                    else:
+                        apply_change(config[index], raw[index], hid, settings)
+                        pressed[index] = raw[index]
+                        last_change[index] = now
+                        if control.streaming:
+                            control.send_event(index, raw[index], now)
+                index += 1
+
+        if telemetry is not None:
+            telemetry.tick()
+
+
+def run_calibration(config, seconds):
+    """
+    Measure contact bounce on every configured pin while the user presses
+    the pedals, then print one line of statistics per pin.
+
+    A burst starts at the first edge after a quiet pin and ends once the pin
+    has been stable for CALIBRATION_QUIET_MS; its length is the bounce time.
+    Timing uses monotonic_ns() for microsecond resolution, so this loop
+    allocates freely: it only runs on request.
+    """
+    buttons = []
+    for entry in config:
+        buttons.append(create_button(entry[1]))
+
+    count = len(buttons)
+    quiet_ns = CALIBRATION_QUIET_MS * 1000000
+    level = [button.value for button in buttons]
+    burst_start = [0] * count
+    last_edge = [0] * count
+    edges = [0] * count
+    # per pin: [presses, press bounce sum, press max, releases, release sum, release max, max edges]
+    stats = [[0, 0, 0, 0, 0, 0, 0] for _ in range(count)]
+
+    print("calibration start seconds={} pins={}".format(seconds, ",".join(entry[0] for entry in config)))
+    deadline = time.monotonic_ns() + seconds * 1000000000
+    now = time.monotonic_ns()
+    while now < deadline:
+        for index in range(count):
+            value = buttons[index].value
+            if value != level[index]:
+                level[index] = value
+                if not edges[index]:
+                    burst_start[index] = now
+                last_edge[index] = now
+                edges[index] += 1
+            elif edges[index] and now - last_edge[index] >= quiet_ns:
+                bounce_us = (last_edge[index] - burst_start[index]) // 1000
+                # Pins idle high; a burst that settles low is a press.
+                offset = 0 if not value else 3
+                pin_stats = stats[index]
+                pin_stats[offset] += 1
+                pin_stats[offset + 1] += bounce_us
+                pin_stats[offset + 2] = max(pin_stats[offset + 2], bounce_us)
+                pin_stats[6] = max(pin_stats[6], edges[index])
+                edges[index] = 0
+        now = time.monotonic_ns()
+
+    for button in buttons:
+        button.deinit()
+    for index in range(count):
+        presses, press_sum, press_max, releases, release_sum, release_max, max_edges = stats[index]
+        print(
+            "calibration {} presses={} press_max_us={} press_mean_us={} "
+            "releases={} release_max_us={} release_mean_us={} max_edges={}".format(
+                config[index][0],
+                presses,
+                press_max,
+                press_sum // max(1, presses),
+                releases,
+                release_max,
+                release_sum // max(1, releases),
+                max_edges,
+            )
+        )
+    print("calibration done")
 
-                pressed[index] = is_pressed
-                last_change[index] = now
 
-        time.sleep(POLL_INTERVAL)
+def main():
+    settings, config = load_config()
+    hid = create_hid(settings)
+    control = Control(usb_cdc.console, usb_cdc.data, load_bank(), settings)
+    control.hid = hid
+
+    # A preset switch or new config from the host swaps the button config
+    # in place, without a file write or a reload of code.py.
+    telemetry = create_telemetry(settings)
+    while True:
+        hid.prepare(config)
+        control.config = config
+        # Start the scan loop from a clean heap so setup garbage does not
+        # trigger a collection on the first pedal press.
+        gc.collect()
+        if settings["scan"] == "keypad":
+            config = run_keypad_engine(config, settings, hid, control, telemetry)
+        else:
+            config = run_poll_engine(config, settings, hid, control, telemetry)
+        hid.release_all()
+        if control.calibration:
+            run_calibration(config, control.calibration)
+            control.calibration = 0
 
 
 main()
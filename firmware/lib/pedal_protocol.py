@@ -0,0 +1,142 @@
+# Message schema shared by the firmware (code.py) and the desktop app
+# (pico_serial/protocol.py). Keep it importable on both CircuitPython and CPython.
+#
+# A frame on the wire is COBS(payload + crc16) followed by a single 0x00.
+# payload = type u8 | sequence u8 | body
+# crc16 is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) of the payload, little-endian.
+#
+# Requests use the types below; a response repeats the request sequence number
+# with RESPONSE_FLAG set on the type. Failures answer with ERROR and a UTF-8
+# message. EVENT frames are sent unprompted while event streaming is on.
+
+import struct
+
+try:
+    from binascii import crc_hqx
+except ImportError:
+    crc_hqx = None
+
+PING = 0x01
+GET_CONFIG = 0x02
+SET_CONFIG = 0x03
+SWITCH_PRESET = 0x04
+STREAM_EVENTS = 0x05
+GET_STATS = 0x06
+EVENT = 0x40
+ERROR = 0x7F
+RESPONSE_FLAG = 0x80
+
+MESSAGE_NAMES = {
+    PING: "ping",
+    GET_CONFIG: "get_config",
+    SET_CONFIG: "set_config",
+    SWITCH_PRESET: "switch_preset",
+    STREAM_EVENTS: "stream_events",
+    GET_STATS: "get_stats",
+    EVENT: "event",
+    ERROR: "error",
+}
+
+# EVENT body: key index u8 | pressed u8 | supervisor.ticks_ms() u32
+EVENT_FORMAT = "<BBI"
+# GET_STATS response body: actions | reports | frames received | frames rejected
+STATS_FORMAT = "<IIII"
+STATS_FIELDS = ("actions", "reports", "frames_received", "frames_rejected")
+
+MAX_FRAME = 1024
+
+
+def crc16(data, crc=0xFFFF):
+    if crc_hqx is not None:
+        return crc_hqx(data, crc)
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+def cobs_encode(data):
+    out = bytearray()
+    block = bytearray()
+    for byte in data:
+        if byte == 0:
+            out.append(len(block) + 1)
+            out.extend(block)
+            block = bytearray()
+        else:
+            block.append(byte)
+            if len(block) == 254:
+                out.append(255)
+                out.extend(block)
+                block = bytearray()
+    out.append(len(block) + 1)
+    out.extend(block)
+    return bytes(out)
+
+
+def cobs_decode(data):
+    out = bytearray()
+    index = 0
+    length = len(data)
+    while index < length:
+        code = data[index]
+        if code == 0:
+            raise ValueError("zero byte inside COBS block")
+        end = index + code
+        if end > length + 1:
+            raise ValueError("truncated COBS block")
+        out.extend(data[index + 1:end])
+        index = end
+        if code < 255 and index < length:
+            out.append(0)
+    return bytes(out)
+
+
+def encode_frame(message_type, sequence, body=b""):
+    payload = bytes((message_type, sequence & 0xFF)) + bytes(body)
+    return cobs_encode(payload + struct.pack("<H", crc16(payload))) + b"\x00"
+
+
+def decode_frame(frame):
+    """Decode one frame without its 0x00 delimiter into (type, sequence, body)."""
+    data = cobs_decode(frame)
+    if len(data) < 4:
+        raise ValueError("frame too short")
+    payload = data[:-2]
+    if struct.unpack("<H", data[-2:])[0] != crc16(payload):
+        raise ValueError("bad frame checksum")
+    return payload[0], payload[1], payload[2:]
+
+
+class FrameDecoder:
+    """Splits a byte stream into decoded frames, counting rejected ones."""
+
+    def __init__(self, max_frame=MAX_FRAME):
+        self.max_frame = max_frame
+        self.buffer = bytearray()
+        self.received = 0
+        self.rejected = 0
+
+    def feed(self, data):
+        frames = []
+        parts = bytes(data).split(b"\x00")
+        parts[0] = bytes(self.buffer) + parts[0]
+        tail = parts.pop()
+        for part in parts:
+            if not part:
+                continue
+            if len(part) > self.max_frame:
+                self.rejected += 1
+                continue
+            try:
+                frames.append(decode_frame(part))
+                self.received += 1
+            except ValueError:
+                self.rejected += 1
+        # An oversized partial frame is truncated and then fails its checksum.
+        self.buffer = bytearray(tail[:self.max_frame + 1])
+        return frames
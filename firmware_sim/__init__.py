@@ -0,0 +1,11 @@
+"""
+Host-side simulator for the CircuitPython firmware.
+
+Runs firmware/code.py unmodified against fake board, digitalio, keypad,
+usb_hid, usb_cdc and adafruit_hid modules driven by a virtual clock, so pin
+traces with contact bounce can be replayed and the resulting HID reports
+checked and timed without hardware.
+"""
+from firmware_sim.fakes import Costs
+from firmware_sim.simulator import FirmwareSimulator, SimulationComplete
+from firmware_sim.traces import check_presses, keyboard_transitions, press_trace, random_presses
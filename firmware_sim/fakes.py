@@ -0,0 +1,367 @@
+import bisect
+import types
+
+from config.action_config import CONSUMER_CONTROL_CODES
+from config.keycode_map import HID_KEYCODES
+
+# supervisor.ticks_ms() wraps around at 2**29
+TICKS_MASK = (1 << 29) - 1
+
+KEYBOARD_REPORT_LENGTH = 8
+FIRST_MODIFIER = 0xE0
+LAST_MODIFIER = 0xE7
+
+
+class Costs:
+    """
+    Virtual microseconds charged for each call into the fake hardware.
+
+    The defaults are rough figures for CircuitPython on an RP2040; they model
+    the time the interpreter spends per loop iteration so that a busy loop
+    advances the virtual clock.
+    """
+
+    pin_read = 15
+    tick_read = 10
+    event_poll = 40
+    serial_poll = 15
+    send_report = 250
+
+
+class Pin:
+    """A board pin whose level follows a scripted trace of (time_us, level) edges."""
+
+    def __init__(self, name):
+        self.name = name
+        self.times = []
+        self.levels = []
+
+    def __repr__(self):
+        return "board.{}".format(self.name)
+
+    def set_trace(self, edges):
+        edges = sorted(edges)
+        self.times = [int(t) for t, _ in edges]
+        self.levels = [bool(level) for _, level in edges]
+
+    def level_at(self, t_us):
+        # Idle level is high: pedals pull the pin low when pressed.
+        index = bisect.bisect_right(self.times, t_us)
+        return self.levels[index - 1] if index else True
+
+
+def build_modules(sim):
+    """Return {module name: fake module} for everything code.py imports from CircuitPython."""
+    clock = sim.clock
+    costs = sim.costs
+    modules = {}
+
+    # --- board ---------------------------------------------------------
+    board = types.ModuleType("board")
+    for name, pin in sim.pins.items():
+        setattr(board, name, pin)
+    modules["board"] = board
+
+    # --- digitalio -----------------------------------------------------
+    digitalio = types.ModuleType("digitalio")
+
+    class Direction:
+        INPUT = "input"
+        OUTPUT = "output"
+
+    class Pull:
+        UP = "up"
+        DOWN = "down"
+
+    class DigitalInOut:
+        def __init__(self, pin):
+            self.pin = pin
+            self.direction = Direction.INPUT
+            self.pull = None
+
+        @property
+        def value(self):
+            clock.advance(costs.pin_read)
+            return self.pin.level_at(clock.now_us)
+
+        def deinit(self):
+            pass
+
+    digitalio.Direction = Direction
+    digitalio.Pull = Pull
+    digitalio.DigitalInOut = DigitalInOut
+    modules["digitalio"] = digitalio
+
+    # --- time / supervisor ---------------------------------------------
+    time_module = types.ModuleType("time")
+
+    def monotonic():
+        clock.advance(costs.tick_read)
+        return clock.now_us / 1000000
+
+    def monotonic_ns():
+        clock.advance(costs.tick_read)
+        return clock.now_us * 1000
+
+    def sleep(seconds):
+        clock.advance(max(1, seconds * 1000000))
+
+    time_module.monotonic = monotonic
+    time_module.monotonic_ns = monotonic_ns
+    time_module.sleep = sleep
+    modules["time"] = time_module
+
+    supervisor = types.ModuleType("supervisor")
+
+    def ticks_ms():
+        clock.advance(costs.tick_read)
+        return (clock.now_us // 1000) & TICKS_MASK
+
+    supervisor.ticks_ms = ticks_ms
+    supervisor.runtime = types.SimpleNamespace(serial_bytes_available=False)
+    modules["supervisor"] = supervisor
+
+    # --- keypad --------------------------------------------------------
+    keypad = types.ModuleType("keypad")
+
+    class Event:
+        def __init__(self, key_number=0, pressed=True):
+            self.key_number = key_number
+            self.pressed = pressed
+            self.timestamp = 0
+
+        @property
+        def released(self):
+            return not self.pressed
+
+    class EventQueue:
+        def __init__(self, keys):
+            self.keys = keys
+            self.queue = []
+            self.overflowed = False
+
+        def get_into(self, event):
+            clock.advance(costs.event_poll)
+            self.keys.scan_until(clock.now_us)
+            if not self.queue:
+                return False
+            event.key_number, event.pressed, event.timestamp = self.queue.pop(0)
+            return True
+
+        def get(self):
+            event = Event()
+            return event if self.get_into(event) else None
+
+        def clear(self):
+            self.queue = []
+
+        def __len__(self):
+            self.keys.scan_until(clock.now_us)
+            return len(self.queue)
+
+    class Keys:
+        """Background scanner: samples every pin once per interval and queues changes."""
+
+        def __init__(self, pins, *, value_when_pressed, pull=True, interval=0.02, max_events=64):
+            self.pins = list(pins)
+            self.value_when_pressed = value_when_pressed
+            self.interval_us = max(1, int(interval * 1000000))
+            self.max_events = max_events
+            self.next_scan = clock.now_us
+            self.state = [False] * len(self.pins)
+            self.events = EventQueue(self)
+
+        @property
+        def key_count(self):
+            return len(self.pins)
+
+        def scan_until(self, t_us):
+            while self.next_scan <= t_us:
+                at = self.next_scan
+                for index, pin in enumerate(self.pins):
+                    pressed = pin.level_at(at) == self.value_when_pressed
+                    if pressed == self.state[index]:
+                        continue
+                    self.state[index] = pressed
+                    if len(self.events.queue) < self.max_events:
+                        self.events.queue.append((index, pressed, (at // 1000) & TICKS_MASK))
+                    else:
+                        self.events.overflowed = True
+                self.next_scan += self.interval_us
+
+        def reset(self):
+            self.state = [False] * len(self.pins)
+
+        def deinit(self):
+            pass
+
+    keypad.Event = Event
+    keypad.EventQueue = EventQueue
+    keypad.Keys = Keys
+    modules["keypad"] = keypad
+
+    # --- usb_hid -------------------------------------------------------
+    usb_hid = types.ModuleType("usb_hid")
+
+    class Device:
+        def __init__(self, name, usage_page, usage):
+            self.name = name
+            self.usage_page = usage_page
+            self.usage = usage
+
+        def send_report(self, report, report_id=None):
+            clock.advance(costs.send_report)
+            sim.reports.append((clock.now_us, self.name, bytes(report)))
+
+    usb_hid.Device = Device
+    usb_hid.devices = [
+        Device("keyboard", 0x01, 0x06),
+        Device("consumer", 0x0C, 0x01),
+    ]
+    modules["usb_hid"] = usb_hid
+
+    # --- usb_cdc -------------------------------------------------------
+    usb_cdc = types.ModuleType("usb_cdc")
+
+    class Serial:
+        """CDC port fed from a script of (time_us, bytes); writes are recorded."""
+
+        def __init__(self, script):
+            self.script = sorted(script)
+            self.buffer = b""
+            self.written = []
+
+        def _fill(self):
+            while self.script and self.script[0][0] <= clock.now_us:
+                self.buffer += self.script.pop(0)[1]
+
+        @property
+        def in_waiting(self):
+            clock.advance(costs.serial_poll)
+            self._fill()
+            return len(self.buffer)
+
+        def read(self, size=1):
+            self._fill()
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+            return data
+
+        def write(self, data):
+            self.written.append((clock.now_us, bytes(data)))
+            return len(data)
+
+    usb_cdc.Serial = Serial
+    usb_cdc.console = Serial(sim.console_input)
+    usb_cdc.data = Serial(sim.data_input) if sim.data_input is not None else None
+    usb_cdc.enable = lambda **kwargs: None
+    modules["usb_cdc"] = usb_cdc
+
+    # --- gc ------------------------------------------------------------
+    gc = types.ModuleType("gc")
+    gc.collect = lambda: None
+    gc.enable = lambda: None
+    gc.disable = lambda: None
+    gc.mem_free = lambda: sim.mem_free
+    gc.mem_alloc = lambda: sim.mem_alloc
+    modules["gc"] = gc
+
+    # --- adafruit_hid --------------------------------------------------
+    hid = types.ModuleType("adafruit_hid")
+
+    def find_device(devices, *, usage_page, usage, timeout=None):
+        for device in devices:
+            if device.usage_page == usage_page and device.usage == usage:
+                return device
+        raise ValueError("Could not find matching HID device.")
+
+    hid.find_device = find_device
+    modules["adafruit_hid"] = hid
+
+    keycode_module = types.ModuleType("adafruit_hid.keycode")
+
+    class Keycode:
+        @staticmethod
+        def modifier_bit(keycode):
+            if FIRST_MODIFIER <= keycode <= LAST_MODIFIER:
+                return 1 << (keycode - FIRST_MODIFIER)
+            return 0
+
+    for name, value in HID_KEYCODES.items():
+        setattr(Keycode, name, value)
+    keycode_module.Keycode = Keycode
+    modules["adafruit_hid.keycode"] = keycode_module
+
+    consumer_code_module = types.ModuleType("adafruit_hid.consumer_control_code")
+
+    class ConsumerControlCode:
+        pass
+
+    for name, value in CONSUMER_CONTROL_CODES.items():
+        setattr(ConsumerControlCode, name, value)
+    consumer_code_module.ConsumerControlCode = ConsumerControlCode
+    modules["adafruit_hid.consumer_control_code"] = consumer_code_module
+
+    keyboard_module = types.ModuleType("adafruit_hid.keyboard")
+
+    class Keyboard:
+        """Same report behaviour as adafruit_hid: one send_report per call."""
+
+        def __init__(self, devices):
+            self._keyboard_device = find_device(devices, usage_page=0x01, usage=0x06)
+            self.report = bytearray(KEYBOARD_REPORT_LENGTH)
+
+        def press(self, *keycodes):
+            for code in keycodes:
+                bit = Keycode.modifier_bit(code)
+                if bit:
+                    self.report[0] |= bit
+                elif code not in self.report[2:]:
+                    for index in range(2, KEYBOARD_REPORT_LENGTH):
+                        if self.report[index] == 0:
+                            self.report[index] = code
+                            break
+            self._keyboard_device.send_report(self.report)
+
+        def release(self, *keycodes):
+            for code in keycodes:
+                bit = Keycode.modifier_bit(code)
+                if bit:
+                    self.report[0] &= ~bit & 0xFF
+                else:
+                    for index in range(2, KEYBOARD_REPORT_LENGTH):
+                        if self.report[index] == code:
+                            self.report[index] = 0
+            self._keyboard_device.send_report(self.report)
+
+        def release_all(self):
+            for index in range(KEYBOARD_REPORT_LENGTH):
+                self.report[index] = 0
+            self._keyboard_device.send_report(self.report)
+
+    keyboard_module.Keyboard = Keyboard
+    modules["adafruit_hid.keyboard"] = keyboard_module
+
+    consumer_module = types.ModuleType("adafruit_hid.consumer_control")
+
+    class ConsumerControl:
+        def __init__(self, devices):
+            self._consumer_device = find_device(devices, usage_page=0x0C, usage=0x01)
+
+        def press(self, code):
+            self._consumer_device.send_report(code.to_bytes(2, "little"))
+
+        def release(self):
+            self._consumer_device.send_report(b"\x00\x00")
+
+        def send(self, code):
+            self.press(code)
+            self.release()
+
+    consumer_module.ConsumerControl = ConsumerControl
+    modules["adafruit_hid.consumer_control"] = consumer_module
+
+    hid.keyboard = keyboard_module
+    hid.keycode = keycode_module
+    hid.consumer_control = consumer_module
+    hid.consumer_control_code = consumer_code_module
+    return modules
@@ -0,0 +1,119 @@
+import builtins
+import io
+import os
+import types
+
+from firmware_sim.fakes import Costs, Pin, build_modules
+
+FIRMWARE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "firmware",
+)
+PIN_COUNT = 29
+
+
+class SimulationComplete(BaseException):
+    """
+    Raised by the virtual clock once the run duration has elapsed.
+
+    Derives from BaseException so ``except Exception`` blocks in code.py do
+    not swallow it.
+    """
+
+
+class VirtualClock:
+    """Microsecond clock that only moves when the firmware calls into the fakes."""
+
+    def __init__(self, end_us):
+        self.now_us = 0
+        self.end_us = end_us
+
+    def advance(self, us):
+        self.now_us += int(us)
+        if self.now_us >= self.end_us:
+            raise SimulationComplete()
+
+
+class FirmwareSimulator:
+    """
+    Run firmware/code.py unmodified on CPython against fake CircuitPython modules.
+
+    ``files`` maps drive file names ("config.json", "config.bin", ...) to their
+    contents. ``traces`` maps pin names ("GP2") to lists of (time_us, level)
+    edges; pins idle high and read low while a pedal is pressed. Console and
+    data port input are lists of (time_ms, bytes).
+
+    After ``run()``, ``reports`` holds (time_us, device, report bytes) for
+    every HID report sent and ``output`` the (time_us, text) of every print().
+    """
+
+    def __init__(self, files, duration_ms, traces=None, costs=None,
+                 console_input=(), data_input=None, firmware_dir=FIRMWARE_DIR):
+        self.firmware_dir = firmware_dir
+        self.files = dict(files)
+        self.clock = VirtualClock(int(duration_ms * 1000))
+        self.costs = costs or Costs()
+        self.console_input = [(int(t * 1000), data) for t, data in console_input]
+        self.data_input = None if data_input is None else [(int(t * 1000), data) for t, data in data_input]
+        self.pins = {"GP{}".format(i): Pin("GP{}".format(i)) for i in range(PIN_COUNT)}
+        self.mem_free = 120000
+        self.mem_alloc = 40000
+        self.modules = {}
+        self.reports = []
+        self.output = []
+        for name, edges in (traces or {}).items():
+            self.pins[name].set_trace(edges)
+
+    def _open(self, path, mode="r", *args, **kwargs):
+        # CIRCUITPY is read-only to code.py while it is mounted on the host.
+        name = path.lstrip("/")
+        if "w" in mode or "a" in mode:
+            raise OSError(30, "Read-only filesystem")
+        if name not in self.files:
+            raise OSError(2, "No such file: {}".format(path))
+        data = self.files[name]
+        if "b" in mode:
+            return io.BytesIO(data if isinstance(data, bytes) else data.encode("utf-8"))
+        return io.StringIO(data if isinstance(data, str) else data.decode("utf-8"))
+
+    def _print(self, *args, sep=" ", end="\n", **kwargs):
+        self.output.append((self.clock.now_us, sep.join(str(arg) for arg in args)))
+
+    def _load_lib(self, name, path, sim_builtins):
+        module = types.ModuleType(name)
+        module.__dict__["__builtins__"] = sim_builtins
+        with open(path, "r", encoding="utf-8") as f:
+            exec(compile(f.read(), path, "exec"), module.__dict__)
+        return module
+
+    def run(self):
+        """Execute code.py until the duration elapses; return the HID reports."""
+        modules = self.modules = build_modules(self)
+        real_import = builtins.__import__
+        lib_dir = os.path.join(self.firmware_dir, "lib")
+        sim_builtins = dict(vars(builtins))
+
+        def sim_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if name not in modules:
+                lib_path = os.path.join(lib_dir, name + ".py")
+                if os.path.exists(lib_path):
+                    modules[name] = self._load_lib(name, lib_path, sim_builtins)
+            if name in modules and (fromlist or "." not in name):
+                return modules[name]
+            top = name.split(".")[0]
+            if top in modules:
+                return modules[top]
+            return real_import(name, globals, locals, fromlist, level)
+
+        sim_builtins["__import__"] = sim_import
+        sim_builtins["open"] = self._open
+        sim_builtins["print"] = self._print
+
+        path = os.path.join(self.firmware_dir, "code.py")
+        with open(path, "r", encoding="utf-8") as f:
+            code = compile(f.read(), path, "exec")
+        try:
+            exec(code, {"__name__": "__main__", "__builtins__": sim_builtins})
+        except SimulationComplete:
+            pass
+        return self.reports
@@ -0,0 +1,108 @@
+import random
+
+# Contact bounce of cheap foot switches: a burst of toggles a few hundred
+# microseconds apart, lasting up to a few milliseconds after the first edge.
+BOUNCE_TOGGLES = (0, 8)
+BOUNCE_GAP_US = (50, 900)
+
+
+def bounce_edges(start_us, settled_level, rng, toggles=BOUNCE_TOGGLES, gap_us=BOUNCE_GAP_US):
+    """
+    Return (edges, settle_us) for one transition that ends at ``settled_level``.
+
+    The pin first moves to ``settled_level`` at ``start_us``, chatters a random
+    number of times and then stays put from ``settle_us`` on.
+    """
+    edges = [(start_us, settled_level)]
+    level = settled_level
+    t = start_us
+    for _ in range(rng.randint(*toggles) * 2):
+        t += rng.randint(*gap_us)
+        level = not level
+        edges.append((t, level))
+    return edges, t
+
+
+def press_trace(press_us, hold_us, rng, **bounce):
+    """
+    Edges for one physical press held for ``hold_us`` after the contact settles.
+
+    Returns (edges, release_us) where release_us is the first release edge.
+    """
+    edges, settled = bounce_edges(press_us, False, rng, **bounce)
+    release_us = settled + hold_us
+    release_edges, _ = bounce_edges(release_us, True, rng, **bounce)
+    return edges + release_edges, release_us
+
+
+def random_presses(rng, duration_us, start_us=20000, hold_us=(30000, 150000),
+                   gap_us=(40000, 200000), **bounce):
+    """
+    Random press/release sequence for one pin within ``duration_us``.
+
+    Returns (edges, presses) where presses is a list of
+    (press_us, release_us) physical edge times.
+    """
+    edges = []
+    presses = []
+    t = start_us + rng.randint(0, gap_us[0])
+    while True:
+        hold = rng.randint(*hold_us)
+        press_edges, release_us = press_trace(t, hold, rng, **bounce)
+        if press_edges[-1][0] + gap_us[0] >= duration_us:
+            break
+        edges.extend(press_edges)
+        presses.append((t, release_us))
+        t = press_edges[-1][0] + rng.randint(*gap_us)
+    return edges, presses
+
+
+def keyboard_transitions(reports):
+    """
+    Turn recorded keyboard reports into (time_us, keycode, pressed) transitions.
+
+    Modifier bits are reported as keycodes 0xE0-0xE7, like adafruit_hid does.
+    """
+    transitions = []
+    held = set()
+    for t, device, report in reports:
+        if device != "keyboard":
+            continue
+        now = {0xE0 + bit for bit in range(8) if report[0] & (1 << bit)}
+        now.update(code for code in report[2:] if code)
+        for code in sorted(now - held):
+            transitions.append((t, code, True))
+        for code in sorted(held - now):
+            transitions.append((t, code, False))
+        held = now
+    return transitions
+
+
+def check_presses(presses, transitions):
+    """
+    Match physical presses of one key against its HID transitions.
+
+    Returns a dict with press/release latencies in microseconds and counts of
+    missed presses, extra (bounce-induced) reports and a key left stuck down.
+    """
+    result = {"press_latency": [], "release_latency": [], "missed": 0, "extra": 0, "stuck": 0}
+    downs = [t for t, _, pressed in transitions if pressed]
+    ups = [t for t, _, pressed in transitions if not pressed]
+    result["extra"] = max(0, len(downs) - len(presses))
+    result["stuck"] = 1 if len(downs) > len(ups) else 0
+
+    di = ui = 0
+    for press_us, release_us in presses:
+        while di < len(downs) and downs[di] < press_us:
+            di += 1
+        if di >= len(downs) or downs[di] >= release_us:
+            result["missed"] += 1
+            continue
+        result["press_latency"].append(downs[di] - press_us)
+        di += 1
+        while ui < len(ups) and ups[ui] < release_us:
+            ui += 1
+        if ui < len(ups):
+            result["release_latency"].append(ups[ui] - release_us)
+            ui += 1
+    return result
@@ -0,0 +1,158 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+DEFAULT_TIMEOUT_MS = 15000
+MAX_WORKERS = 4
+
+
+class JobCancelled(Exception):
+    """Raised by DeviceJob.check() once the job was cancelled or superseded."""
+
+
+class DeviceJob:
+    """
+    Handle a job function receives: report progress with ``progress()`` and
+    call ``check()`` between steps so a cancelled job stops early.
+    """
+
+    def __init__(self, key, function, on_done, timeout_ms, runner):
+        self.key = key
+        self.function = function
+        self.on_done = on_done
+        self.timeout_ms = timeout_ms
+        self.runner = runner
+        self.cancelled = threading.Event()
+        self.timed_out = False
+        self.done = False
+
+    def progress(self, message):
+        """Report what the job is doing; safe to call from the worker thread."""
+        self.runner.jobProgress.emit(self.key, message)
+
+    def check(self):
+        """Raise JobCancelled if the job should stop."""
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class DeviceJobRunner(QObject):
+    """
+    Runs slow device I/O (drive scans, writes, fsync on FAT) on a thread pool
+    so the GUI thread never waits for it.
+
+    Jobs share a lane when they have the same key: at most one runs and one
+    waits. A new submission replaces the waiting job and asks the running one
+    to stop at its next check(), so repeated clicks end with the latest
+    request only. Jobs that write one board use a key per drive, so a job
+    for another board is never replaced; jobs in different lanes that write
+    the same drive wait for each other through pico_sync.drive_lock(). A
+    file that is being written is finished rather than cut off halfway.
+    Results and errors come back on the GUI thread, through ``on_done`` and
+    the signals.
+    """
+
+    jobStarted = Signal(str)
+    jobProgress = Signal(str, str)
+    jobFinished = Signal(str)
+    jobFailed = Signal(str, str)
+    jobCancelled = Signal(str)
+    idle = Signal()
+    _jobDone = Signal(object, object, object)
+
+    def __init__(self, max_workers=MAX_WORKERS, parent=None):
+        super().__init__(parent)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="device-job")
+        self.running = {}
+        self.pending = {}
+        self._jobDone.connect(self._finish)
+
+    # ------------------------------------------------------------------
+
+    def submit(self, key, function, on_done=None, timeout_ms=DEFAULT_TIMEOUT_MS):
+        """
+        Run ``function(job)`` on a worker; ``on_done(result)`` is called on
+        the GUI thread when it succeeds.
+        """
+        job = DeviceJob(key, function, on_done, timeout_ms, self)
+        if key in self.running:
+            if key in self.pending:
+                self.jobCancelled.emit(key)
+            self.pending[key] = job
+            self.running[key].cancel()
+        else:
+            self._start(job)
+        return job
+
+    def cancel(self, key=None):
+        """Cancel the waiting and running jobs of one lane, or of every lane."""
+        keys = [key] if key is not None else list(set(self.running) | set(self.pending))
+        for lane in keys:
+            if self.pending.pop(lane, None) is not None:
+                self.jobCancelled.emit(lane)
+            if lane in self.running:
+                self.running[lane].cancel()
+        if not self.is_busy():
+            self.idle.emit()
+
+    def is_busy(self):
+        return bool(self.running or self.pending)
+
+    def shutdown(self):
+        """Cancel everything and stop accepting work; running I/O is not waited for."""
+        self.cancel()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+
+    def _start(self, job):
+        self.running[job.key] = job
+        self.jobStarted.emit(job.key)
+        if job.timeout_ms:
+            QTimer.singleShot(job.timeout_ms, lambda: self._timeout(job))
+        self.pool.submit(self._run, job)
+
+    def _run(self, job):
+        try:
+            job.check()
+            result, error = job.function(job), None
+        except Exception as e:
+            result, error = None, e
+        self._jobDone.emit(job, result, error)
+
+    def _timeout(self, job):
+        if job.done or self.running.get(job.key) is not job:
+            return
+        # A thread cannot be stopped from outside: report the timeout now and
+        # keep the lane busy until the blocking call returns, so a newer job
+        # never writes the same drive at the same time.
+        job.timed_out = True
+        job.cancel()
+        self.jobFailed.emit(job.key, f"timed out after {job.timeout_ms / 1000:g} s")
+
+    def _finish(self, job, result, error):
+        job.done = True
+        if self.running.get(job.key) is job:
+            del self.running[job.key]
+        if not job.timed_out:
+            if error is None and job.on_done is not None:
+                try:
+                    job.on_done(result)
+                except Exception as e:
+                    error = e
+            if isinstance(error, JobCancelled):
+                self.jobCancelled.emit(job.key)
+            elif error is not None:
+                self.jobFailed.emit(job.key, str(error))
+            else:
+                self.jobFinished.emit(job.key)
+
+        next_job = self.pending.pop(job.key, None)
+        if next_job is not None:
+            self._start(next_job)
+        elif not self.is_busy():
+            self.idle.emit()
@@ -5,23 +5,75 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import QTimer, QObject, Signal
 from PySide6.QtGui import QIcon, QAction
 import PySide6.QtSvg
+import time
 
-from pico_serial.serial_reader import SerialReader
+from pico_serial.calibration import DEFAULT_CALIBRATION_SECONDS, DebounceCalibration
+from pico_serial.devices import DeviceManager
+from pico_serial.protocol import open_protocol_client
 from hotkeys.hotkey_manager import DynamicHotkeyManager
-from config.config_manager import save_config, load_config
-from config.pico_sync import sync_to_pico, sync_from_pico
-from config.preset_manager import list_presets, load_preset, save_preset, delete_preset
+from hotkeys.preset_prewarm import SWITCH_BUDGET_MS, PresetPrewarmer, measure_ms
+from config.config_manager import save_config, load_config, write_config_text
+from config.firmware_compiler import compile_config
+from config.firmware_deploy import deploy_firmware
+from config.fleet_sync import fleet_sync
+from config.pico_sync import (
+    sync_to_pico, sync_from_pico, upload_preset_bank, read_preset_bank, update_device_settings
+)
+from config.preset_archive import export_archive, import_archive
+from config.preset_manager import (
+    PRESET_CATALOG, list_presets, load_preset, save_preset, delete_preset, find_preset
+)
 
+from gui.device_jobs import DeviceJobRunner
 from gui.tabs.device_tab import DeviceTab
 from gui.tabs.config_tab import ConfigTab
 from gui.tabs.hotkeys_tab import HotkeysTab
 
+# The serial timer ticks every 100 ms; look for plugged/unplugged boards every 2 s
+DEVICE_REFRESH_TICKS = 20
+# Names of the background device job lanes, as shown in the log. Lanes that
+# write one board are keyed "<lane>:<drive>", so jobs for different boards
+# do not replace each other; pico_sync.drive_lock() keeps writers of the
+# same drive from overlapping.
+JOB_LABELS = {
+    "drives": "Drive scan",
+    "upload": "Device sync",
+    "download": "Download from device",
+    "fleet": "Fleet sync",
+    "firmware": "Firmware update",
+    "bank": "Preset bank upload",
+    "settings": "Debounce update",
+    "preset-import": "Preset import",
+    "preset-export": "Preset export",
+}
+# Writing every board or the whole firmware bundle takes longer than one config
+LONG_JOB_TIMEOUT_MS = 60000
+# Invalid archive entries listed one by one in the log
+ARCHIVE_ERRORS_SHOWN = 20
+
+
+def drive_lane(lane, drive):
+    """Job key of a lane that writes one drive; None means the first board found."""
+    return f"{lane}:{drive or ''}"
+
+
+def job_label(key):
+    """Name of a job lane for the log, with the drive of per-drive lanes."""
+    lane, _, drive = key.partition(":")
+    label = JOB_LABELS.get(lane, lane)
+    return f"{label} ({drive})" if drive else label
+
 
 class HotkeyBridge(QObject):
     """Bridge object used to emit preset change requests from hotkey threads."""
     presetRequested = Signal(str)
 
 
+class PresetCatalogBridge(QObject):
+    """Bridge object used to announce preset list changes from the catalog watcher thread."""
+    presetsChanged = Signal(object)
+
+
 class PedalsApp(QWidget):
     def __init__(self):
         super().__init__()
@@ -43,6 +95,9 @@ class PedalsApp(QWidget):
         # --- Tabs ---
         self.current_preset_name = None
         self.current_config = []
+        self.device_bank = {}
+        # A hotkey switched presets while the window was hidden; rebuild the editor on show
+        self.editor_stale = False
         self.config_tab = ConfigTab(
             self.select_preset,
             self.save_selected_preset,
@@ -50,16 +105,41 @@ class PedalsApp(QWidget):
             self.save_and_load_selected_preset,
             self.create_preset,
             self.delete_selected_preset,
+            on_import_presets=self.import_preset_archive,
+            on_export_presets=self.export_preset_archive,
         )
-        self.serial = SerialReader(baudrate=115200)
+        self.devices = DeviceManager()
+        self.active_device = None
+        self.device_rows = None
+        self.port_rows = None
+        self.refresh_ticks = 0
+        self.protocol = None
+        self.calibration = DebounceCalibration()
+        self.calibration_device = None
         self.device_tab = DeviceTab(
-            self.refresh_serial_ports,
-            self.connect_serial,
-            self.disconnect_serial,
+            self.refresh_devices,
+            self.select_device,
+            self.connect_device,
+            self.disconnect_device,
+            self.connect_port,
+            self.assign_preset_to_device,
             self.load_current_config_to_device,
+            self.load_current_config_to_all_devices,
             self.download_config_from_device,
+            self.upload_preset_bank,
+            self.deploy_firmware,
+            self.start_debounce_calibration,
+            self.apply_debounce_calibration,
+            self.cancel_device_jobs,
         )
 
+        # --- Background device I/O ---
+        self.jobs = DeviceJobRunner(parent=self)
+        self.jobs.jobProgress.connect(self.show_job_progress)
+        self.jobs.jobFailed.connect(self.report_job_failure)
+        self.jobs.jobCancelled.connect(self.report_job_cancelled)
+        self.jobs.idle.connect(lambda: self.device_tab.set_job_status("", False))
+
         # --- Hotkey bridge (thread-safe signal emitter) ---
         self.bridge = HotkeyBridge()
         self.bridge.presetRequested.connect(self._apply_preset_from_hotkey)
@@ -73,7 +153,21 @@ class PedalsApp(QWidget):
         if self.hotkey_mgr.available:
             self.device_tab.append_log("Global hotkeys initialized.")
 
-        self.hotkeys_tab = HotkeysTab(self.hotkey_mgr, log_callback=self.device_tab.append_log)
+        self.hotkeys_tab = HotkeysTab(
+            self.hotkey_mgr,
+            log_callback=self.device_tab.append_log,
+            on_hotkeys_saved=lambda: self.prewarmer.refresh(),
+        )
+
+        # --- Presets bound to hotkeys, compiled ahead of time ---
+        self.prewarmer = PresetPrewarmer(PRESET_CATALOG, load_preset, lambda: self.hotkey_mgr.hotkey_map.values())
+        self.prewarmer.refresh()
+
+        # --- Preset catalog: keeps the preset lists live, including edits made outside the app ---
+        self.preset_bridge = PresetCatalogBridge()
+        self.preset_bridge.presetsChanged.connect(self.show_presets)
+        PRESET_CATALOG.subscribe(self.preset_bridge.presetsChanged.emit)
+        PRESET_CATALOG.start_watching()
 
         self.tabs.addTab(self.config_tab, "⚙️ Configuration")
         self.tabs.addTab(self.hotkeys_tab, "⌨️ Hotkeys")
@@ -83,8 +177,8 @@ class PedalsApp(QWidget):
         self.timer.timeout.connect(self.check_serial)
         self.timer.start(100)
 
-        self.refresh_serial_ports()
-        self.device_tab.append_log("Select a serial port and click Connect to start reading Pico logs.")
+        self.refresh_devices()
+        self.device_tab.append_log("Select a board and click Connect to start reading its logs.")
 
         # --- Initial load ---
         self.load_initial_editor_state()
@@ -112,53 +206,217 @@ class PedalsApp(QWidget):
     # ---------------------------------------------------------------------
 
     def check_serial(self):
-        """Check if Pico has sent any data and display it in logs."""
-        if not self.serial.is_connected():
-            return
-        line = self.serial.get_line()
-        if line:
-            self.device_tab.append_log(f"[Pico] {line}")
-
-    def refresh_serial_ports(self):
-        """Detect serial ports and refresh the dropdown in the logs tab."""
-        ports = self.serial.list_available_ports()
-        self.device_tab.set_available_ports(ports)
-        if ports:
-            self.device_tab.append_log(f"Detected serial ports: {', '.join(ports)}")
-        else:
-            self.device_tab.append_log("No active serial ports detected.")
+        """Show what the connected boards have logged and notice boards being plugged in or out."""
+        self.refresh_ticks += 1
+        if self.refresh_ticks >= DEVICE_REFRESH_TICKS:
+            self.refresh_ticks = 0
+            self.refresh_devices(quiet=True)
+
+        self.check_protocol_replies()
+        for device, lines, dropped in self.devices.poll():
+            self.device_tab.append_logs([f"[{device.name}] {line}" for line in lines])
+            if dropped:
+                self.device_tab.append_log(
+                    f"[Serial] {dropped} lines dropped from {device.name}, the log buffer was full."
+                )
+            if device is not self.calibration_device:
+                continue
+            for line in lines:
+                if self.calibration.feed(line) and self.calibration.finished:
+                    self.report_debounce_calibration()
 
-    def connect_serial(self, port):
-        """Connect to the selected serial port."""
-        if not port:
-            self.device_tab.append_log("Select a serial port before connecting.")
+    def check_protocol_replies(self):
+        """Report requests the board refused that were sent without waiting (hotkey preset switches)."""
+        if self.protocol is None:
             return
+        try:
+            replies = self.protocol.poll_replies()
+        except Exception as e:
+            self.device_tab.append_log(f"[Control protocol error]: {e}")
+            self.disconnect_protocol()
+            return
+        for _, error in replies:
+            if error is not None:
+                self.device_tab.append_log(f"[Shortcut] The device refused the preset switch: {error}")
 
-        if self.serial.is_connected():
-            if self.serial.port == port:
-                self.device_tab.append_log(f"Already connected to {port}.")
-                return
-            self.disconnect_serial()
+    def refresh_devices(self, quiet=False):
+        """Detect pedal boards and refresh the list in the Device tab."""
+        try:
+            added, removed = self.devices.refresh()
+        except Exception as e:
+            if not quiet:
+                self.device_tab.append_log(f"[Device scan error]: {e}")
+            return
+        for key in added:
+            device = self.devices.get(key)
+            self.device_tab.append_log(f"Detected {device.name} on {device.console_port}.")
+        for key in removed:
+            device = self.devices.get(key)
+            if device is self.active_device:
+                self.disconnect_protocol()
+            self.device_tab.append_log(f"{device.name} was unplugged.")
+        if not quiet and not self.devices.boards():
+            self.device_tab.append_log("No pedal boards detected.")
+        self.show_devices()
+        if self.devices.pairing_due() and "drives" not in self.jobs.running:
+            # Finding drives may read every drive (psutil, boot_out.txt); keep it off the GUI thread
+            self.jobs.submit("drives", lambda job: self.devices.scan_drives(), self.pair_device_drives)
+
+    def pair_device_drives(self, scan):
+        """Match boards to the CIRCUITPY drives found by a background scan."""
+        for key in self.devices.pair_drives(scan):
+            device = self.devices.get(key)
+            self.device_tab.append_log(f"{device.name} drive: {device.drive}.")
+        self.show_devices()
+
+    def show_devices(self):
+        """Redraw the board list and the other serial ports if anything shown changed."""
+        boards = self.devices.boards()
+        rows = [
+            (device.key, device.console_port, device.drive, device.preset, device.state)
+            for device in boards
+        ]
+        if rows != self.device_rows:
+            self.device_rows = rows
+            self.device_tab.set_devices(boards)
+        if self.devices.other_ports != self.port_rows:
+            self.port_rows = list(self.devices.other_ports)
+            self.device_tab.set_available_ports(self.port_rows)
+
+    def select_device(self, key):
+        """Direct single-board actions (upload, calibration, hotkey switches) to the selected board."""
+        device = self.devices.get(key)
+        if device is self.active_device:
+            return
+        self.disconnect_protocol()
+        self.active_device = device
+        self.device_bank = {}
+        if device is not None and device.is_connected():
+            self.attach_device(device)
+
+    def active_drive(self):
+        """CIRCUITPY drive of the selected board; None lets pico_sync use the first one found."""
+        return self.active_device.drive if self.active_device is not None else None
+
+    def active_reader(self):
+        """Console reader of the selected board, or None when it is not connected."""
+        if self.active_device is None or not self.active_device.is_connected():
+            return None
+        return self.active_device.reader
+
+    def connect_device(self, key):
+        """Start reading the logs of the selected board and import its config."""
+        device = self.devices.get(key)
+        if device is None:
+            self.device_tab.append_log("Select a board before connecting.")
+            return
+        if device.is_connected():
+            self.device_tab.append_log(f"Already connected to {device.name}.")
+            return
 
         try:
-            self.serial.start(port=port)
-            self.device_tab.append_log(f"Connected to Pico on {port}.")
+            self.devices.connect(key)
+            self.device_tab.append_log(f"Connected to {device.name} on {device.console_port}.")
+            self.disconnect_protocol()
+            self.active_device = device
+            self.attach_device(device)
             self.import_config_from_device()
         except Exception as e:
             self.device_tab.append_log(f"[Serial connect error]: {e}")
+        self.show_devices()
+
+    def connect_port(self, port):
+        """Connect to a serial port that was not recognized as a pedal board."""
+        if not port:
+            self.device_tab.append_log("Select or type a serial port before connecting.")
+            return
+        try:
+            device = self.devices.add_port(port)
+        except Exception as e:
+            self.device_tab.append_log(f"[Serial connect error]: {e}")
+            return
+        self.show_devices()
+        self.connect_device(device.key)
+
+    def attach_device(self, device):
+        """Open the control protocol and read the preset bank of the active board."""
+        self.connect_protocol(device)
+        self.device_bank = read_preset_bank(device.drive)
+        if self.device_bank:
+            self.device_tab.append_log(f"Device preset bank: {', '.join(sorted(self.device_bank))}")
+
+    def connect_protocol(self, device):
+        """Open the framed control protocol on the board's data port, if it has one."""
+        self.disconnect_protocol()
+        if not device.data_port:
+            return
+        try:
+            self.protocol = open_protocol_client(device.data_port)
+            self.protocol.ping()
+            self.device_tab.append_log(f"Control protocol ready on {device.data_port}.")
+        except Exception as e:
+            self.disconnect_protocol()
+            self.device_tab.append_log(f"[Control protocol unavailable]: {e}")
 
-    def disconnect_serial(self):
-        """Disconnect from the current serial port if connected."""
-        if not self.serial.is_connected():
+    def disconnect_protocol(self):
+        """Close the control protocol port if it is open."""
+        if self.protocol is None:
+            return
+        try:
+            self.protocol.close()
+        finally:
+            self.protocol = None
+
+    def disconnect_device(self, key):
+        """Stop reading the logs of the selected board."""
+        device = self.devices.get(key)
+        if device is None or not device.is_connected():
             self.device_tab.append_log("Serial port is not connected.")
             return
 
-        port = self.serial.port
         try:
-            self.serial.stop()
-            self.device_tab.append_log(f"Disconnected from {port}.")
+            if device is self.active_device:
+                self.disconnect_protocol()
+            self.devices.disconnect(key)
+            self.device_tab.append_log(f"Disconnected from {device.name}.")
         except Exception as e:
             self.device_tab.append_log(f"[Serial disconnect error]: {e}")
+        self.show_devices()
+
+    def assign_preset_to_device(self, key):
+        """Make the selected preset the one a board runs and load it to that board."""
+        device = self.devices.get(key)
+        name = self.config_tab.selected_preset_name()
+        if device is None:
+            self.device_tab.append_log("Select a board before assigning a preset.")
+            return
+        if not name:
+            self.device_tab.append_log("Select a preset to assign.")
+            return
+        try:
+            self.devices.assign_preset(key, name)
+            config = load_preset(name)
+        except Exception as e:
+            self.device_tab.append_log(f"[Preset assign error]: {e}")
+            return
+        self.show_devices()
+        if not device.drive:
+            self.device_tab.append_log(
+                f"📌 Assigned preset '{name}' to {device.name}; its drive is not mounted, so nothing was written."
+            )
+            return
+        self.upload_to_device(
+            config,
+            device.drive,
+            f"📌 Assigned preset '{name}' to {device.name}",
+            f"📌 Assigned preset '{name}' to {device.name} (already up to date)",
+        )
+
+    def show_presets(self, presets):
+        """Refresh the preset selectors and the prewarmed hotkey presets after the catalog changed."""
+        self.config_tab.refresh_presets(presets)
+        self.hotkeys_tab.set_presets(presets)
+        self.prewarmer.refresh()
 
     def load_initial_editor_state(self):
         """Load the first preset into the editor or fall back to config.json."""
@@ -233,7 +491,6 @@ class PedalsApp(QWidget):
             self.current_preset_name = name
             self.current_config = config
             self.config_tab.refresh_presets(list_presets(), selected_name=name)
-            self.hotkeys_tab.redraw_hotkeys_ui()
             self.device_tab.append_log(f"💾 Saved preset '{name}'.")
             self.update_status(f"✅ Active preset: {name}")
         except Exception as e:
@@ -245,22 +502,239 @@ class PedalsApp(QWidget):
             config = self.config_tab.get_current_config()
             save_config(config)
             self.current_config = config
-            path = sync_to_pico()
-            self.device_tab.append_log(f"🔌 Loaded current editor state to Pico → {path}")
         except Exception as e:
             self.device_tab.append_log(f"[Device sync error]: {e}")
+            return
+        self.upload_to_device(
+            config,
+            self.active_drive(),
+            "🔌 Loaded current editor state to Pico",
+            "🔌 Pico is already up to date",
+        )
 
-    def download_config_from_device(self):
-        """Download config.json from the Pico and load it into the editor."""
+    def upload_to_device(self, config, drive, written_message, unchanged_message):
+        """Write a config to a board in the background; a newer upload replaces a pending one."""
+        def upload(job):
+            job.progress("Writing the config to the Pico…")
+            return sync_to_pico(drive, config, check=job.check)
+
+        def done(result):
+            path, written = result
+            self.device_tab.append_log(f"{written_message if written else unchanged_message} → {path}")
+
+        self.jobs.submit(drive_lane("upload", drive), upload, done)
+
+    def load_current_config_to_all_devices(self):
+        """Send the current editor state to every connected board in parallel."""
         try:
-            self.import_config_from_device()
+            config = self.config_tab.get_current_config()
+            save_config(config)
+            self.current_config = config
+        except Exception as e:
+            self.device_tab.append_log(f"[Fleet sync error]: {e}")
+            return
+        drives = [device.drive for device in self.devices.boards() if device.present and device.drive]
+
+        def sync_all(job):
+            job.progress(f"Writing the config to {len(drives) or 'all'} boards…")
+            return fleet_sync(config, drives or None, check=job.check)
+
+        def done(report):
+            for result in report.results:
+                if result.up_to_date:
+                    self.device_tab.append_log(f"🚀 {result.drive}: already up to date")
+                elif result.ok:
+                    self.device_tab.append_log(
+                        f"🚀 {result.drive}: {result.bytes_written} bytes written and verified "
+                        f"in {result.seconds * 1000:.0f} ms"
+                    )
+                else:
+                    self.device_tab.append_log(f"[Fleet sync error] {result.drive}: {result.error}")
+            self.device_tab.append_log(report.summary())
+
+        self.jobs.submit("fleet", sync_all, done, timeout_ms=LONG_JOB_TIMEOUT_MS)
+
+    def upload_preset_bank(self):
+        """Store every preset on the Pico so hotkeys can switch them without a reload."""
+        drive = self.active_drive()
+        try:
+            presets = [(name, load_preset(name)) for name in list_presets()]
         except Exception as e:
-            self.device_tab.append_log(f"[Download error from device]: {e}")
+            self.device_tab.append_log(f"[Preset bank error]: {e}")
+            return
+
+        def upload(job):
+            job.progress("Writing the preset bank to the Pico…")
+            path = upload_preset_bank(presets, drive)
+            return path, read_preset_bank(drive)
+
+        def done(result):
+            path, self.device_bank = result
+            self.device_tab.append_log(f"🗂 Uploaded preset bank ({len(presets)} presets) → {path}")
+
+        self.jobs.submit(drive_lane("bank", drive), upload, done)
+
+    def deploy_firmware(self):
+        """Install or upgrade the firmware bundle on the board, copying only changed files."""
+        drive = self.active_drive()
+
+        def deploy(job):
+            job.progress("Copying changed firmware files…")
+            return deploy_firmware(drive, check=job.check)
+
+        def done(report):
+            for path in report.copied:
+                self.device_tab.append_log(f"📦 Copied {path}")
+            for path in report.removed:
+                self.device_tab.append_log(f"📦 Removed {path}")
+            for path in report.rejected:
+                self.device_tab.append_log(f"[Firmware update] Ignored {path}: outside the drive")
+            self.device_tab.append_log(f"📦 {report.summary()} → {report.drive}")
+            if report.reset_required:
+                self.device_tab.append_log(
+                    "⚠️ boot.py changed: press the board's reset button (or unplug and replug it) "
+                    "so it takes effect and the data port appears."
+                )
+
+        self.jobs.submit(drive_lane("firmware", drive), deploy, done, timeout_ms=LONG_JOB_TIMEOUT_MS)
+
+    def import_preset_archive(self, path, overwrite=False):
+        """Import a preset archive in the background; validation runs in worker processes."""
+
+        def run(job):
+            job.progress("Reading preset archive…")
+            return import_archive(path, overwrite, progress=job.progress, check=job.check)
+
+        self.jobs.submit("preset-import", run, self.report_preset_archive, timeout_ms=LONG_JOB_TIMEOUT_MS)
+
+    def export_preset_archive(self, path):
+        """Write every preset to an archive in the background."""
+
+        def run(job):
+            job.progress("Writing preset archive…")
+            return export_archive(path, progress=job.progress, check=job.check)
+
+        self.jobs.submit("preset-export", run, self.report_preset_archive, timeout_ms=LONG_JOB_TIMEOUT_MS)
+
+    def report_preset_archive(self, report):
+        """Log the outcome of a preset import or export, with each invalid entry."""
+        errors = sorted(report.errors.items())
+        for member, error in errors[:ARCHIVE_ERRORS_SHOWN]:
+            self.device_tab.append_log(f"[Preset archive] Skipped {member}: {error}")
+        if len(errors) > ARCHIVE_ERRORS_SHOWN:
+            self.device_tab.append_log(f"[Preset archive] … and {len(errors) - ARCHIVE_ERRORS_SHOWN} more invalid entries")
+        self.device_tab.append_log(f"📦 {report.summary()} ({report.path})")
+
+    def show_job_progress(self, key, message):
+        """Show what a background device job is doing."""
+        self.device_tab.set_job_status(message, True)
+
+    def report_job_failure(self, key, message):
+        """Log a background device job that failed or timed out."""
+        self.device_tab.append_log(f"[{job_label(key)} error]: {message}")
+
+    def report_job_cancelled(self, key):
+        """Log a background device job that was cancelled or replaced by a newer request."""
+        self.device_tab.append_log(f"[{job_label(key)}] cancelled.")
+
+    def cancel_device_jobs(self):
+        """Cancel every background device job that has not finished writing yet."""
+        self.jobs.cancel()
+
+    def start_debounce_calibration(self):
+        """Ask the Pico to measure contact bounce on every configured pin."""
+        reader = self.active_reader()
+        if reader is None:
+            self.device_tab.append_log("Connect to the Pico serial port before calibrating.")
+            return
+        try:
+            self.calibration = DebounceCalibration()
+            self.calibration_device = self.active_device
+            self.device_tab.set_calibration_ready(False)
+            reader.write_line(f"calibrate {DEFAULT_CALIBRATION_SECONDS}")
+            self.device_tab.append_log(
+                f"⏱ Calibrating for {DEFAULT_CALIBRATION_SECONDS} s: press and release every pedal "
+                "several times, at different speeds."
+            )
+        except Exception as e:
+            self.device_tab.append_log(f"[Calibration error]: {e}")
+
+    def report_debounce_calibration(self):
+        """Log the measured bounce and the debounce time recommended for each pin."""
+        recommended = self.calibration.recommendations()
+        for pin, stats in sorted(self.calibration.pins.items()):
+            if pin in recommended:
+                worst = max(stats.get("press_max_us", 0), stats.get("release_max_us", 0))
+                self.device_tab.append_log(
+                    f"⏱ {pin}: worst bounce {worst} µs over {stats.get('presses', 0)} presses "
+                    f"→ debounce {recommended[pin]} ms"
+                )
+            else:
+                self.device_tab.append_log(f"⏱ {pin}: not pressed during calibration, keeping its debounce.")
+        self.device_tab.set_calibration_ready(bool(recommended))
+
+    def apply_debounce_calibration(self):
+        """Write the recommended per-pin debounce times into the device config."""
+        recommended = self.calibration.recommendations()
+        if not recommended:
+            self.device_tab.append_log("Run a debounce calibration first.")
+            return
+        drive = self.calibration_device.drive if self.calibration_device is not None else None
+
+        def apply(job):
+            job.progress("Writing debounce times to the Pico…")
+            return update_device_settings({"pin_debounce_ms": recommended}, drive)
+
+        def done(path):
+            self.device_tab.set_calibration_ready(False)
+            self.device_tab.append_log(f"💾 Saved per-pin debounce times to Pico → {path}")
+
+        self.jobs.submit(drive_lane("settings", drive), apply, done)
+
+    def switch_device_preset(self, name, compiled=None):
+        """
+        Ask the Pico to switch to a preset from its bank. Returns True when sent.
+        ``compiled`` is the current config's table when the caller already has it.
+        """
+        reader = self.active_reader()
+        if reader is None or name not in self.device_bank:
+            return False
+        if compiled is None:
+            try:
+                compiled = compile_config(self.current_config)
+            except ValueError as e:
+                self.device_tab.append_log(f"[Preset switch error] '{name}' cannot be compiled: {e}")
+                return False
+        if compiled != self.device_bank[name]:
+            self.device_tab.append_log(
+                f"Preset '{name}' changed since the bank was uploaded; upload the preset bank again."
+            )
+            return False
+        if self.protocol is not None:
+            # Not waiting for the answer keeps the GUI thread free; check_serial() reports failures
+            self.protocol.switch_preset(name, wait=False)
+        else:
+            reader.write_line(f"preset {name}")
+        return True
+
+    def download_config_from_device(self):
+        """Download config.json from the Pico and load it into the editor."""
+        self.import_config_from_device()
 
     def import_config_from_device(self):
-        """Import the connected device config and map it to a matching or new preset."""
-        path = sync_from_pico()
-        device_config = load_config()
+        """Download the connected device config in the background, then import it."""
+        drive = self.active_drive()
+
+        def download(job):
+            job.progress("Reading config.json from the Pico…")
+            path = sync_from_pico(drive)
+            return path, load_config()
+
+        self.jobs.submit("download", download, self.apply_device_config)
+
+    def apply_device_config(self, result):
+        """Map a downloaded device config to a matching or new preset."""
+        path, device_config = result
         self.current_config = device_config
         self.device_tab.append_log(f"📂 Downloaded config.json from Pico → {path}")
 
@@ -276,7 +750,6 @@ class PedalsApp(QWidget):
         self.current_config = device_config
         self.config_tab.refresh_presets(list_presets(), selected_name=preset_name)
         self.config_tab.load_config(device_config)
-        self.hotkeys_tab.redraw_hotkeys_ui()
         self.device_tab.append_log(f"Created new preset '{preset_name}' from device config.")
         self.update_status(f"✅ Active preset: {preset_name}")
 
@@ -293,12 +766,16 @@ class PedalsApp(QWidget):
             self.current_preset_name = name
             self.current_config = config
             self.config_tab.refresh_presets(list_presets(), selected_name=name)
-            self.hotkeys_tab.redraw_hotkeys_ui()
-            path = sync_to_pico()
-            self.device_tab.append_log(f"💾🔌 Saved preset '{name}' and loaded it to Pico → {path}")
             self.update_status(f"✅ Active preset: {name}")
         except Exception as e:
             self.device_tab.append_log(f"[Save and load error]: {e}")
+            return
+        self.upload_to_device(
+            config,
+            self.active_drive(),
+            f"💾🔌 Saved preset '{name}' and loaded it to Pico",
+            f"💾 Saved preset '{name}'; Pico is already up to date",
+        )
 
     def create_preset(self, name):
         """Create a new preset from the current editor state."""
@@ -311,7 +788,6 @@ class PedalsApp(QWidget):
             self.current_preset_name = name
             self.current_config = config
             self.config_tab.refresh_presets(list_presets(), selected_name=name)
-            self.hotkeys_tab.redraw_hotkeys_ui()
             self.device_tab.append_log(f"Created preset '{name}'.")
             self.update_status(f"✅ Active preset: {name}")
         except Exception as e:
@@ -321,9 +797,10 @@ class PedalsApp(QWidget):
         """Delete a preset and load the next available editor state."""
         try:
             delete_preset(name)
+            self.devices.forget_preset(name)
+            self.show_devices()
             presets = list_presets()
             self.config_tab.refresh_presets(presets)
-            self.hotkeys_tab.redraw_hotkeys_ui()
             self.device_tab.append_log(f"Deleted preset '{name}'.")
 
             if presets:
@@ -337,22 +814,71 @@ class PedalsApp(QWidget):
             self.device_tab.append_log(f"[Preset delete error]: {e}")
 
     def _apply_preset_from_hotkey(self, name: str):
-        """Slot called from background thread via signal."""
+        """
+        Slot called from background thread via signal.
+
+        Only the switch itself runs here, from the prewarmed preset; writing
+        config.json and the editor rebuild follow once the switch is done.
+        """
+        start = time.perf_counter()
         try:
-            self.select_preset(name)
-            self.device_tab.append_log(f"[Shortcut] Loaded preset: {name}")
+            warm = self.prewarmer.get(name)
         except Exception as e:
             self.device_tab.append_log(f"[Shortcut] Failed to load preset '{name}': {e}")
+            return
+        self.current_preset_name = name
+        self.current_config = warm.config
+        switched = False
+        error = None
+        try:
+            switched = self.switch_device_preset(name, warm.compiled)
+        except Exception as e:
+            error = e
+        elapsed_ms = measure_ms(start)
+        self.prewarmer.latency.record(elapsed_ms)
+        QTimer.singleShot(0, lambda: self.finish_hotkey_switch(warm, switched, error, elapsed_ms))
+
+    def finish_hotkey_switch(self, warm, switched, error, elapsed_ms):
+        """The part of a hotkey switch that can wait: config.json, the editor and the log."""
+        name = warm.name
+        if self.current_preset_name == name:
+            try:
+                write_config_text(warm.config_text, warm.config)
+            except Exception as e:
+                self.device_tab.append_log(f"[Save error]: {e}")
+            if self.isVisible():
+                self.show_current_preset()
+            else:
+                self.editor_stale = True
+            self.update_status(f"✅ Active preset: {name}")
+
+        self.device_tab.append_log(f"[Shortcut] Loaded preset: {name} ({elapsed_ms:.1f} ms)")
+        if switched:
+            self.device_tab.append_log(f"[Shortcut] Sent preset switch to device: {name}")
+        if error is not None:
+            self.device_tab.append_log(f"[Shortcut] Failed to switch device to preset '{name}': {error}")
+        if elapsed_ms > SWITCH_BUDGET_MS:
+            self.device_tab.append_log(
+                f"[Shortcut] Switch took {elapsed_ms:.1f} ms, over the {SWITCH_BUDGET_MS:g} ms budget."
+            )
+
+    def show_current_preset(self):
+        """Rebuild the editor from the active preset."""
+        self.editor_stale = False
+        self.config_tab.load_config(self.current_config)
+        if self.current_preset_name:
+            self.config_tab.refresh_presets(list_presets(), selected_name=self.current_preset_name)
+
+    def hotkey_switch_stats(self):
+        """Latency of recent hotkey switches and prewarm hit counters."""
+        return self.prewarmer.stats()
 
     def find_matching_preset(self, config):
         """Return the name of the preset whose config exactly matches the provided config."""
-        for preset_name in list_presets():
-            try:
-                if load_preset(preset_name) == config:
-                    return preset_name
-            except Exception:
-                continue
-        return None
+        try:
+            return find_preset(config)
+        except Exception:
+            return None
 
     def create_device_preset_name(self):
         """Create a unique preset name for a config downloaded from the device."""
@@ -389,8 +915,11 @@ class PedalsApp(QWidget):
             self.hotkey_mgr.stop()
         except Exception:
             pass
+        self.jobs.shutdown()
+        PRESET_CATALOG.stop_watching()
         try:
-            self.serial.stop()
+            self.disconnect_protocol()
+            self.devices.disconnect_all()
         except Exception:
             pass
         self.tray_icon.hide()
@@ -416,6 +945,12 @@ class PedalsApp(QWidget):
                     3000
                 )
 
+    def showEvent(self, event):
+        """Catch up with hotkey switches made while the window was hidden."""
+        super().showEvent(event)
+        if self.editor_stale:
+            self.show_current_preset()
+
     def show_from_tray(self):
         """Restore window from tray."""
         self.showNormal()
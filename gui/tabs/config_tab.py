@@ -1,10 +1,10 @@
 from PySide6.QtCore import QSignalBlocker
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QGroupBox, QHBoxLayout,
-    QLabel, QComboBox, QPushButton, QMessageBox, QInputDialog
+    QLabel, QComboBox, QPushButton, QMessageBox, QInputDialog, QCheckBox, QFileDialog
 )
 
-from config.action_config import normalize_config_entry
+from config.action_config import LOCKOUT_OPTIONS, normalize_config_entry
 from gui.widgets.action_value_widget import ActionValueWidget
 
 
@@ -19,6 +19,8 @@ class ConfigTab(QWidget):
         on_save_and_load,
         on_create_preset,
         on_delete_preset,
+        on_import_presets=None,
+        on_export_presets=None,
     ):
         super().__init__()
         self.on_preset_selected = on_preset_selected
@@ -27,6 +29,8 @@ class ConfigTab(QWidget):
         self.on_save_and_load = on_save_and_load
         self.on_create_preset = on_create_preset
         self.on_delete_preset = on_delete_preset
+        self.on_import_presets = on_import_presets
+        self.on_export_presets = on_export_presets
 
         self.layout = QVBoxLayout()
 
@@ -45,6 +49,18 @@ class ConfigTab(QWidget):
         delete_preset_btn.clicked.connect(self.delete_selected_preset)
         preset_row.addWidget(delete_preset_btn)
 
+        if on_import_presets is not None:
+            import_btn = QPushButton("📥 Import…")
+            import_btn.setToolTip("Add the presets of a .zip or .tar.gz archive")
+            import_btn.clicked.connect(self.import_presets)
+            preset_row.addWidget(import_btn)
+
+        if on_export_presets is not None:
+            export_btn = QPushButton("📤 Export…")
+            export_btn.setToolTip("Save every preset to a .zip or .tar.gz archive")
+            export_btn.clicked.connect(self.export_presets)
+            preset_row.addWidget(export_btn)
+
         preset_container = QWidget()
         preset_container.setLayout(preset_row)
         self.layout.addWidget(preset_container)
@@ -119,6 +135,33 @@ class ConfigTab(QWidget):
 
     # ------------------------------------------------------------------
 
+    def import_presets(self):
+        """Ask for a preset archive and import it."""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import presets", "", "Preset archives (*.zip *.tar *.tar.gz *.tgz)"
+        )
+        if path:
+            overwrite = QMessageBox.question(
+                self,
+                "Import presets",
+                "Replace presets that already exist with the ones from the archive?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No,
+            ) == QMessageBox.Yes
+            self.on_import_presets(path, overwrite)
+
+    # ------------------------------------------------------------------
+
+    def export_presets(self):
+        """Ask where to save a preset archive and export every preset to it."""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export presets", "presets.zip", "Zip archive (*.zip);;Tar archive (*.tar.gz)"
+        )
+        if path:
+            self.on_export_presets(path)
+
+    # ------------------------------------------------------------------
+
     def delete_selected_preset(self):
         """Ask for confirmation and delete the selected preset."""
         name = self.selected_preset_name()
@@ -156,9 +199,9 @@ class ConfigTab(QWidget):
     # ------------------------------------------------------------------
 
     def get_current_config(self):
-        """Return current configuration as a list of [pin, type, value]."""
+        """Return current configuration as a list of [pin, type, value(, options)]."""
         new_config = []
-        for pin_label, type_box, value_edit, _ in self.input_widgets:
+        for pin_label, type_box, value_edit, eager_box, _ in self.input_widgets:
             pin = pin_label.text()
             action_type = type_box.currentText()
             if not value_edit.is_valid():
@@ -169,7 +212,11 @@ class ConfigTab(QWidget):
                 )
                 raise ValueError("{}: {}".format(pin, value_edit.validation_message))
             value = value_edit.get_parsed_value(action_type, pin)
-            new_config.append(normalize_config_entry([pin, action_type, value], strict=True))
+            entry = [pin, action_type, value]
+            options = self.row_options(eager_box)
+            if options:
+                entry.append(options)
+            new_config.append(normalize_config_entry(entry, strict=True))
         return new_config
 
     # ------------------------------------------------------------------
@@ -180,7 +227,7 @@ class ConfigTab(QWidget):
             pin_index = len(self.input_widgets)
             entry = [f"GP{pin_index}", "key", "A"]
 
-        pin, action_type, value = entry
+        pin, action_type, value = entry[:3]
         row = QHBoxLayout()
 
         pin_label = QLabel(pin)
@@ -196,6 +243,17 @@ class ConfigTab(QWidget):
         value_edit.set_value(value, action_type)
         row.addWidget(value_edit)
 
+        # Lockout values are only editable in config.json; keep them on the
+        # checkbox so saving from the editor does not drop them.
+        eager_box = QCheckBox("⚡ Eager")
+        eager_box.setToolTip(
+            "Act on the first edge and accept a re-press 5 ms after a release\n"
+            "instead of after the whole debounce time."
+        )
+        eager_box.entry_options = dict(entry[3]) if len(entry) > 3 else {}
+        eager_box.setChecked(eager_box.entry_options.get("debounce") == "eager")
+        row.addWidget(eager_box)
+
         remove_btn = QPushButton("❌")
         row.addWidget(remove_btn)
 
@@ -203,15 +261,29 @@ class ConfigTab(QWidget):
         container.setLayout(row)
         self.config_layout.insertWidget(len(self.input_widgets), container)
 
-        self.input_widgets.append((pin_label, type_box, value_edit, container))
+        self.input_widgets.append((pin_label, type_box, value_edit, eager_box, container))
         type_box.currentTextChanged.connect(value_edit.set_action_type)
         remove_btn.clicked.connect(lambda: self.remove_pin_row(container))
 
     # ------------------------------------------------------------------
 
+    def row_options(self, eager_box):
+        """Return the per-pin options of one row, following its eager checkbox."""
+        options = dict(eager_box.entry_options)
+        if eager_box.isChecked():
+            options["debounce"] = "eager"
+        else:
+            options = {
+                name: option for name, option in options.items()
+                if name != "debounce" and name not in LOCKOUT_OPTIONS
+            }
+        return options
+
+    # ------------------------------------------------------------------
+
     def remove_pin_row(self, widget):
         """Remove a selected pin row."""
-        for i, (_, _, _, w) in enumerate(self.input_widgets):
+        for i, (*_, w) in enumerate(self.input_widgets):
             if w == widget:
                 self.input_widgets.pop(i)
                 widget.setParent(None)
@@ -1,19 +1,31 @@
+from PySide6.QtCore import QSignalBlocker, Qt
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QTextEdit, QPushButton,
-    QHBoxLayout, QComboBox
+    QHBoxLayout, QTreeWidget, QTreeWidgetItem, QComboBox
 )
 
+DEVICE_COLUMNS = ["Board", "Serial port", "Drive", "Preset", "State"]
+
 
 class DeviceTab(QWidget):
     """Tab that groups device connection, sync actions, and runtime logs."""
 
     def __init__(
         self,
-        on_refresh_ports,
+        on_refresh_devices,
+        on_device_selected,
+        on_connect_device,
+        on_disconnect_device,
         on_connect_port,
-        on_disconnect_port,
+        on_assign_preset,
         on_upload_config,
+        on_sync_all,
         on_download_config,
+        on_upload_bank,
+        on_deploy_firmware,
+        on_calibrate,
+        on_apply_calibration,
+        on_cancel_jobs,
     ):
         super().__init__()
         self.layout = QVBoxLayout()
@@ -21,41 +33,114 @@ class DeviceTab(QWidget):
         self.label = QLabel("🔌 Device Connection and Logs")
         self.layout.addWidget(self.label)
 
+        self.device_list = QTreeWidget()
+        self.device_list.setHeaderLabels(DEVICE_COLUMNS)
+        self.device_list.setRootIsDecorated(False)
+        self.device_list.setMaximumHeight(140)
+        self.device_list.itemSelectionChanged.connect(
+            lambda: on_device_selected(self.selected_device())
+        )
+        self.layout.addWidget(self.device_list)
+
         serial_layout = QHBoxLayout()
-        self.port_box = QComboBox()
-        self.port_box.setPlaceholderText("Select a serial port")
-        serial_layout.addWidget(self.port_box)
 
-        refresh_btn = QPushButton("🔄 Refresh Ports")
-        refresh_btn.clicked.connect(on_refresh_ports)
+        refresh_btn = QPushButton("🔄 Refresh Devices")
+        refresh_btn.clicked.connect(on_refresh_devices)
         serial_layout.addWidget(refresh_btn)
 
         connect_btn = QPushButton("🔌 Connect")
-        connect_btn.clicked.connect(lambda: on_connect_port(self.selected_port()))
+        connect_btn.clicked.connect(lambda: on_connect_device(self.selected_device()))
         serial_layout.addWidget(connect_btn)
 
         disconnect_btn = QPushButton("⏹ Disconnect")
-        disconnect_btn.clicked.connect(on_disconnect_port)
+        disconnect_btn.clicked.connect(lambda: on_disconnect_device(self.selected_device()))
         serial_layout.addWidget(disconnect_btn)
 
+        assign_btn = QPushButton("📌 Assign Preset")
+        assign_btn.setToolTip("Make the selected preset the one this board runs and load it to the board.")
+        assign_btn.clicked.connect(lambda: on_assign_preset(self.selected_device()))
+        serial_layout.addWidget(assign_btn)
+
         serial_container = QWidget()
         serial_container.setLayout(serial_layout)
         self.layout.addWidget(serial_container)
 
+        port_layout = QHBoxLayout()
+        self.port_box = QComboBox()
+        self.port_box.setEditable(True)
+        self.port_box.setPlaceholderText("Other serial port")
+        self.port_box.setToolTip("A board that is not listed above, e.g. one without a USB serial number.")
+        port_layout.addWidget(self.port_box, 1)
+
+        connect_port_btn = QPushButton("🔌 Connect Port")
+        connect_port_btn.clicked.connect(lambda: on_connect_port(self.selected_port()))
+        port_layout.addWidget(connect_port_btn)
+
+        port_container = QWidget()
+        port_container.setLayout(port_layout)
+        self.layout.addWidget(port_container)
+
         sync_layout = QHBoxLayout()
 
         upload_btn = QPushButton("⬆️ Upload to Device")
         upload_btn.clicked.connect(on_upload_config)
         sync_layout.addWidget(upload_btn)
 
+        sync_all_btn = QPushButton("🚀 Upload to All Boards")
+        sync_all_btn.setToolTip("Write the current configuration to every connected board at once.")
+        sync_all_btn.clicked.connect(on_sync_all)
+        sync_layout.addWidget(sync_all_btn)
+
         download_btn = QPushButton("⬇️ Download from Device")
         download_btn.clicked.connect(on_download_config)
         sync_layout.addWidget(download_btn)
 
+        bank_btn = QPushButton("🗂 Upload Preset Bank")
+        bank_btn.setToolTip("Store all presets on the device so hotkeys can switch them over serial.")
+        bank_btn.clicked.connect(on_upload_bank)
+        sync_layout.addWidget(bank_btn)
+
+        firmware_btn = QPushButton("📦 Update Firmware")
+        firmware_btn.setToolTip("Copy the changed files of the firmware bundle to the board.")
+        firmware_btn.clicked.connect(on_deploy_firmware)
+        sync_layout.addWidget(firmware_btn)
+
         sync_container = QWidget()
         sync_container.setLayout(sync_layout)
         self.layout.addWidget(sync_container)
 
+        calibration_layout = QHBoxLayout()
+
+        calibrate_btn = QPushButton("⏱ Calibrate Debounce")
+        calibrate_btn.setToolTip("Measure contact bounce of every pedal while you press them repeatedly.")
+        calibrate_btn.clicked.connect(on_calibrate)
+        calibration_layout.addWidget(calibrate_btn)
+
+        self.apply_calibration_btn = QPushButton("💾 Apply Debounce")
+        self.apply_calibration_btn.setToolTip("Write the measured per-pedal debounce times to the device.")
+        self.apply_calibration_btn.setEnabled(False)
+        self.apply_calibration_btn.clicked.connect(on_apply_calibration)
+        calibration_layout.addWidget(self.apply_calibration_btn)
+
+        calibration_container = QWidget()
+        calibration_container.setLayout(calibration_layout)
+        self.layout.addWidget(calibration_container)
+
+        job_layout = QHBoxLayout()
+
+        self.job_label = QLabel("")
+        job_layout.addWidget(self.job_label, 1)
+
+        self.cancel_jobs_btn = QPushButton("✖ Cancel")
+        self.cancel_jobs_btn.setToolTip("Stop the device operations that are still running.")
+        self.cancel_jobs_btn.setEnabled(False)
+        self.cancel_jobs_btn.clicked.connect(on_cancel_jobs)
+        job_layout.addWidget(self.cancel_jobs_btn)
+
+        job_container = QWidget()
+        job_container.setLayout(job_layout)
+        self.layout.addWidget(job_container)
+
         self.log_box = QTextEdit()
         self.log_box.setReadOnly(True)
         self.layout.addWidget(self.log_box)
@@ -66,15 +151,60 @@ class DeviceTab(QWidget):
         """Append a new line of text to the log display."""
         self.log_box.append(text)
 
+    def append_logs(self, lines):
+        """Append several lines with a single update of the log display."""
+        if lines:
+            self.log_box.append("\n".join(lines))
+
+    def set_calibration_ready(self, ready):
+        """Enable the apply button once calibration results are available."""
+        self.apply_calibration_btn.setEnabled(ready)
+
+    def set_job_status(self, text, busy):
+        """Show what the background device operations are doing."""
+        self.job_label.setText(text)
+        self.cancel_jobs_btn.setEnabled(busy)
+
     def selected_port(self):
-        """Return the currently selected serial port or None."""
+        """Return the serial port chosen or typed for a manual connection, or None."""
         port = self.port_box.currentText().strip()
         return port or None
 
     def set_available_ports(self, ports):
-        """Refresh the serial port dropdown while preserving selection if possible."""
+        """Refresh the manual serial port dropdown while preserving the selection if possible."""
         current = self.selected_port()
-        self.port_box.clear()
-        self.port_box.addItems(ports)
-        if current and current in ports:
-            self.port_box.setCurrentText(current)
+        with QSignalBlocker(self.port_box):
+            self.port_box.clear()
+            self.port_box.addItems(ports)
+            if current:
+                self.port_box.setCurrentText(current)
+            else:
+                self.port_box.setCurrentIndex(-1)
+
+    def selected_device(self):
+        """Return the key of the selected board or None."""
+        item = self.device_list.currentItem()
+        return item.data(0, Qt.UserRole) if item is not None else None
+
+    def set_devices(self, devices):
+        """Refresh the board list while preserving the selection if possible."""
+        current = self.selected_device()
+        with QSignalBlocker(self.device_list):
+            self.device_list.clear()
+            for device in devices:
+                item = QTreeWidgetItem([
+                    device.name,
+                    device.console_port or "",
+                    device.drive or "",
+                    device.preset or "",
+                    device.state,
+                ])
+                item.setData(0, Qt.UserRole, device.key)
+                item.setToolTip(0, device.key)
+                self.device_list.addTopLevelItem(item)
+                if device.key == current:
+                    self.device_list.setCurrentItem(item)
+            for column in range(len(DEVICE_COLUMNS)):
+                self.device_list.resizeColumnToContents(column)
+        if current is None and self.device_list.topLevelItemCount():
+            self.device_list.setCurrentItem(self.device_list.topLevelItem(0))
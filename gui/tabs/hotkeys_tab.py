@@ -1,3 +1,4 @@
+from PySide6.QtCore import Qt
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QComboBox, QMessageBox
@@ -6,15 +7,20 @@ from hotkeys.hotkey_manager import DynamicHotkeyManager
 from config.preset_manager import list_presets
 from gui.widgets.key_capture_lineedit import KeyCaptureLineEdit
 
+# Shown for a bound preset that was deleted or renamed, so the row keeps it
+MISSING_PRESET_LABEL = "⚠ {} (missing)"
+
 
 class HotkeysTab(QWidget):
     """Tab responsible for managing global hotkeys assigned to presets."""
 
-    def __init__(self, hotkey_mgr: DynamicHotkeyManager, log_callback=None):
+    def __init__(self, hotkey_mgr: DynamicHotkeyManager, log_callback=None, on_hotkeys_saved=None):
         super().__init__()
         self.hotkey_mgr = hotkey_mgr
         self.log = log_callback or (lambda msg: None)
+        self.on_hotkeys_saved = on_hotkeys_saved or (lambda: None)
         self.layout = QVBoxLayout()
+        self.presets = list_presets()
 
         self.entries = []
         self.redraw_hotkeys_ui()
@@ -42,12 +48,44 @@ class HotkeysTab(QWidget):
         for hotkey, preset in self.hotkey_mgr.hotkey_map.items():
             self.add_hotkey_row(hotkey, preset)
 
+    def set_presets(self, presets):
+        """
+        Update the preset choices of every row, keeping each row's selection.
+        A selected preset that no longer exists stays selected, marked as missing.
+        """
+        self.presets = presets
+        for _, preset_box, _, _ in self.entries:
+            self.fill_preset_box(preset_box, preset_box.currentData())
+
+    def fill_preset_box(self, preset_box, selected):
+        """List the presets in a row's selector and select ``selected``, even if it is missing."""
+        preset_box.clear()
+        for name in self.presets:
+            preset_box.addItem(name, name)
+        if not selected:
+            return
+        if selected not in self.presets:
+            preset_box.addItem(MISSING_PRESET_LABEL.format(selected), selected)
+            preset_box.setItemData(
+                preset_box.count() - 1,
+                "This preset was deleted or renamed; pick another one before saving.",
+                Qt.ToolTipRole,
+            )
+        preset_box.setCurrentIndex(preset_box.findData(selected))
+
+    def missing_presets(self):
+        """Return the presets selected in a row that no longer exist."""
+        presets = set(self.presets)
+        return sorted({
+            preset_box.currentData() for _, preset_box, _, _ in self.entries
+            if preset_box.currentData() and preset_box.currentData() not in presets
+        })
+
     # ------------------------------------------------------------------
 
     def add_empty_row(self):
         """Add an empty row to create a new hotkey binding."""
-        presets = list_presets()
-        self.add_hotkey_row("", presets[0] if presets else "")
+        self.add_hotkey_row("", self.presets[0] if self.presets else "")
 
     # ------------------------------------------------------------------
 
@@ -62,9 +100,7 @@ class HotkeysTab(QWidget):
 
         # Preset selector
         preset_box = QComboBox()
-        preset_box.addItems(list_presets())
-        if preset in list_presets():
-            preset_box.setCurrentText(preset)
+        self.fill_preset_box(preset_box, preset)
         row.addWidget(preset_box)
 
         # Remove button
@@ -95,9 +131,23 @@ class HotkeysTab(QWidget):
         new_map = {}
         seen = set()
 
+        missing = self.missing_presets()
+        if missing:
+            answer = QMessageBox.warning(
+                self,
+                "Missing presets",
+                "These presets no longer exist: {}.\n\n"
+                "Their shortcuts will do nothing until a preset with that name is created. "
+                "Save anyway?".format(", ".join(missing)),
+                QMessageBox.Save | QMessageBox.Cancel,
+                QMessageBox.Cancel,
+            )
+            if answer != QMessageBox.Save:
+                return
+
         for key_input, preset_box, _, _ in self.entries:
             combo = key_input.text().strip().lower()
-            preset = preset_box.currentText()
+            preset = preset_box.currentData() or ""
 
             if not combo:
                 self.log("[Hotkeys] Skipped empty entry.")
@@ -116,6 +166,7 @@ class HotkeysTab(QWidget):
 
         self.hotkey_mgr.save_hotkeys(new_map)
         self.hotkey_mgr.reload_hooks()
+        self.on_hotkeys_saved()
 
         self.log("[Hotkeys] Saved and reloaded active shortcuts.")
         QMessageBox.information(
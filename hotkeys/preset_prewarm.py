@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+
+from config.action_config import normalize_config
+from config.firmware_compiler import compile_config
+
+# Host-side time a hotkey switch should stay under
+SWITCH_BUDGET_MS = 10.0
+# Number of recent switch timings kept for the statistics
+LATENCY_WINDOW = 200
+
+
+class WarmPreset:
+    """A preset ready to switch to: its config, compiled table and config.json text."""
+
+    def __init__(self, name, config, info_hash):
+        self.name = name
+        self.config = config
+        self.compiled = compile_config(config)
+        self.config_text = json.dumps(normalize_config(config), indent=4)
+        self.info_hash = info_hash
+
+
+class LatencyStats:
+    """Durations of the recent hotkey switches, in milliseconds."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.samples = []
+        self.count = 0
+        self.last_ms = None
+        self.lock = threading.Lock()
+
+    def record(self, ms):
+        with self.lock:
+            self.samples.append(ms)
+            if len(self.samples) > self.window:
+                del self.samples[0]
+            self.count += 1
+            self.last_ms = ms
+
+    def summary(self):
+        """Return {"count", "last_ms", "median_ms", "p95_ms", "max_ms"} over the recent switches."""
+        with self.lock:
+            ordered = sorted(self.samples)
+            summary = {"count": self.count, "last_ms": self.last_ms}
+        if ordered:
+            summary["median_ms"] = ordered[len(ordered) // 2]
+            summary["p95_ms"] = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            summary["max_ms"] = ordered[-1]
+        return summary
+
+
+class PresetPrewarmer:
+    """
+    Keeps the presets bound to hotkeys loaded, compiled and serialized, so a
+    hotkey switch does no parsing, validation or compiling.
+
+    ``bound_names()`` returns the preset names the hotkeys point at. Call
+    ``refresh()`` from the thread that owns the hotkey bindings (the GUI
+    thread) when the catalog or the bindings change; only presets whose hash
+    changed are prepared again.
+    """
+
+    def __init__(self, catalog, load, bound_names):
+        self.catalog = catalog
+        self.load = load
+        self.bound_names = bound_names
+        self.lock = threading.Lock()
+        self.presets = {}
+        self.hits = 0
+        self.misses = 0
+        self.latency = LatencyStats()
+
+    def get(self, name):
+        """Return the WarmPreset of ``name``, preparing it now if it is not warm yet."""
+        with self.lock:
+            warm = self.presets.get(name)
+        info = self.catalog.info(name)
+        if warm is not None and info is not None and warm.info_hash == info.hash:
+            self.hits += 1
+            return warm
+        self.misses += 1
+        return self._prepare(name)
+
+    def refresh(self):
+        """Prepare the bound presets that are new or changed and drop the others."""
+        names = set(self.bound_names())
+        with self.lock:
+            for name in [name for name in self.presets if name not in names]:
+                del self.presets[name]
+        for name in names:
+            info = self.catalog.info(name)
+            with self.lock:
+                warm = self.presets.get(name)
+            if info is None:
+                with self.lock:
+                    self.presets.pop(name, None)
+            elif warm is None or warm.info_hash != info.hash:
+                try:
+                    self._prepare(name)
+                except (OSError, ValueError):
+                    # A broken preset is reported when its hotkey is used
+                    with self.lock:
+                        self.presets.pop(name, None)
+
+    def stats(self):
+        summary = self.latency.summary()
+        with self.lock:
+            summary.update({"warm": len(self.presets), "hits": self.hits, "misses": self.misses})
+        return summary
+
+    # ------------------------------------------------------------------
+
+    def _prepare(self, name):
+        info = self.catalog.info(name)
+        warm = WarmPreset(name, self.load(name), info.hash if info is not None else None)
+        with self.lock:
+            self.presets[name] = warm
+        return warm
+
+
+def measure_ms(start):
+    """Milliseconds since ``start`` (a time.perf_counter() value)."""
+    return (time.perf_counter() - start) * 1000.0
@@ -1,9 +1,13 @@
+import multiprocessing
 import sys
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QIcon
 from gui.main_window import PedalsApp
 
 if __name__ == "__main__":
+    # Preset archive validation starts worker processes; in the frozen build
+    # they re-run this entry point and must stop here.
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon("icons/pedals.ico"))
     window = PedalsApp()
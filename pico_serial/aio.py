@@ -0,0 +1,370 @@
+import asyncio
+import os
+import struct
+import threading
+
+from config.firmware_compiler import compile_config, decode_compiled_config
+from pico_serial.protocol import (
+    ERROR,
+    EVENT,
+    GET_CONFIG,
+    GET_STATS,
+    PING,
+    RESPONSE_FLAG,
+    SET_CONFIG,
+    STREAM_EVENTS,
+    SWITCH_PRESET,
+    FrameDecoder,
+    ProtocolError,
+    encode_frame,
+    schema,
+)
+from pico_serial.serial_reader import (
+    DEFAULT_CAPACITY,
+    DROP_OLDEST,
+    LineBuffer,
+    LineSplitter,
+    SerialReader,
+    decode_line,
+)
+
+READ_SIZE = 65536
+OPEN_TIMEOUT = 5.0
+EVENT_QUEUE_SIZE = 1000
+
+
+def asyncio_serial_supported():
+    """add_reader() on a serial port fd needs a selector event loop, which Windows lacks."""
+    return os.name == "posix"
+
+
+class AsyncSerialConnection:
+    """
+    A serial port driven by an asyncio event loop instead of a reader thread.
+
+    pyserial opens and configures the port; its file descriptor is then made
+    non-blocking and registered with ``loop.add_reader()``. Every chunk read
+    is passed to the callables in ``receivers``. Writes are buffered and
+    flushed whenever the fd is writable. POSIX only.
+    """
+
+    def __init__(self, ser, loop):
+        self.ser = ser
+        self.port = ser.port
+        self.loop = loop
+        self.fd = ser.fileno()
+        os.set_blocking(self.fd, False)
+        self.receivers = []
+        self.write_buffer = bytearray()
+        self.writing = False
+        self.closed = loop.create_future()
+        loop.add_reader(self.fd, self._read_ready)
+
+    @classmethod
+    async def open(cls, port, baudrate=115200):
+        """Open a serial port on the running loop."""
+        import serial
+        return cls(serial.Serial(port, baudrate, timeout=0), asyncio.get_running_loop())
+
+    def is_open(self):
+        return not self.closed.done()
+
+    # ------------------------------------------------------------------
+
+    def _read_ready(self):
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as exc:
+            self.close(exc)
+            return
+        if not data:
+            # A tty reads b"" once the board is unplugged or reset.
+            self.close(EOFError("Serial port closed by the device."))
+            return
+        for receiver in list(self.receivers):
+            receiver(data)
+
+    def write(self, data):
+        """Queue bytes for the device. Must be called on the loop thread."""
+        if not self.is_open():
+            raise ConnectionError("Serial port is closed.")
+        self.write_buffer += data
+        if not self.writing:
+            self._write_ready()
+
+    def _write_ready(self):
+        try:
+            written = os.write(self.fd, self.write_buffer)
+        except (BlockingIOError, InterruptedError):
+            written = 0
+        except OSError as exc:
+            self.close(exc)
+            return
+        del self.write_buffer[:written]
+        if self.write_buffer and not self.writing:
+            self.loop.add_writer(self.fd, self._write_ready)
+            self.writing = True
+        elif not self.write_buffer and self.writing:
+            self.loop.remove_writer(self.fd)
+            self.writing = False
+
+    def close(self, exc=None):
+        """Unregister the fd and close the port; ``exc`` is the reason, if any."""
+        if self.closed.done():
+            return
+        self.loop.remove_reader(self.fd)
+        if self.writing:
+            self.loop.remove_writer(self.fd)
+            self.writing = False
+        self.ser.close()
+        self.closed.set_result(exc)
+
+    async def wait_closed(self):
+        """Wait until the port is closed and return the reason (None for close())."""
+        return await asyncio.shield(self.closed)
+
+    # ------------------------------------------------------------------
+
+    async def lines(self, capacity=DEFAULT_CAPACITY, overflow=DROP_OLDEST):
+        """
+        Async iterator over decoded, non-blank lines until the port closes.
+
+        Lines are buffered like SerialReader does: a slow consumer loses
+        lines according to ``overflow`` instead of growing memory.
+        """
+        buffer = LineBuffer(capacity, overflow)
+        splitter = LineSplitter()
+        ready = asyncio.Event()
+
+        def receive(data):
+            lines = splitter.feed(data)
+            if lines:
+                buffer.extend(lines)
+                ready.set()
+
+        def wake(_):
+            ready.set()
+
+        self.receivers.append(receive)
+        self.closed.add_done_callback(wake)
+        try:
+            while True:
+                for line in buffer.drain():
+                    text = decode_line(line)
+                    if text:
+                        yield text
+                if self.closed.done() and not len(buffer):
+                    return
+                ready.clear()
+                if not len(buffer) and not self.closed.done():
+                    await ready.wait()
+        finally:
+            self.receivers.remove(receive)
+            self.closed.remove_done_callback(wake)
+
+
+class AsyncProtocolClient:
+    """
+    Awaitable request/response client for the framed protocol (see
+    pico_serial/protocol.py) on an AsyncSerialConnection.
+
+    Several requests may be in flight at once; replies are matched to them
+    by sequence number. EVENT frames are queued for ``events()``.
+    """
+
+    def __init__(self, connection, timeout=1.0):
+        self.connection = connection
+        self.timeout = timeout
+        self.decoder = FrameDecoder()
+        self.pending = {}
+        self.event_queue = asyncio.Queue(EVENT_QUEUE_SIZE)
+        self.dropped_events = 0
+        self._sequence = 0
+        connection.receivers.append(self._receive)
+        connection.closed.add_done_callback(self._connection_closed)
+
+    def _next_sequence(self):
+        for _ in range(256):
+            self._sequence = (self._sequence + 1) & 0xFF
+            if self._sequence not in self.pending:
+                return self._sequence
+        raise ProtocolError("Too many requests in flight.")
+
+    def _receive(self, data):
+        for message_type, sequence, body in self.decoder.feed(data):
+            if message_type == EVENT:
+                self._queue_event(struct.unpack(schema.EVENT_FORMAT, body))
+                continue
+            request = self.pending.pop(sequence, None)
+            if request is None or request[1].done():
+                continue
+            expected, future = request
+            if message_type == ERROR:
+                future.set_exception(ProtocolError(body.decode("utf-8", errors="replace")))
+            elif message_type == expected | RESPONSE_FLAG:
+                future.set_result(body)
+            else:
+                future.set_exception(ProtocolError("Unexpected reply type {}.".format(message_type)))
+
+    def _queue_event(self, event):
+        if self.event_queue.full():
+            self.event_queue.get_nowait()
+            self.dropped_events += 1
+        self.event_queue.put_nowait(event)
+
+    def _connection_closed(self, closed):
+        for _, future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Serial port closed."))
+        self.pending.clear()
+        if self.event_queue.full():
+            self.event_queue.get_nowait()
+        self.event_queue.put_nowait(None)
+
+    # ------------------------------------------------------------------
+
+    async def request(self, message_type, body=b"", timeout=None):
+        """Send one request and return the body of the matching response."""
+        sequence = self._next_sequence()
+        future = self.connection.loop.create_future()
+        self.pending[sequence] = (message_type, future)
+        try:
+            self.connection.write(encode_frame(message_type, sequence, body))
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("No response from device for message type {}.".format(message_type))
+        finally:
+            self.pending.pop(sequence, None)
+
+    async def ping(self, payload=b""):
+        """Round-trip a payload and return the echoed bytes."""
+        return await self.request(PING, payload)
+
+    async def get_config(self):
+        """Return (settings, entries of HID codes) currently active on the device."""
+        return decode_compiled_config(await self.request(GET_CONFIG))
+
+    async def set_config(self, config):
+        """Apply a config on the device in RAM, without writing the drive."""
+        await self.request(SET_CONFIG, compile_config(config))
+
+    async def switch_preset(self, name):
+        """Switch to a preset from the device preset bank."""
+        await self.request(SWITCH_PRESET, name.encode("utf-8"))
+
+    async def stream_events(self, enabled=True):
+        """Turn unsolicited pedal EVENT frames on or off."""
+        await self.request(STREAM_EVENTS, b"\x01" if enabled else b"\x00")
+
+    async def get_stats(self):
+        """Return the device counters as a dict."""
+        values = struct.unpack(schema.STATS_FORMAT, await self.request(GET_STATS))
+        return dict(zip(schema.STATS_FIELDS, values))
+
+    async def events(self):
+        """Async iterator of (key index, pressed, ticks_ms) until the port closes."""
+        while True:
+            event = await self.event_queue.get()
+            if event is None:
+                return
+            yield event
+
+
+class EventLoopThread:
+    """One background thread running the asyncio loop shared by all async ports."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="pico-serial-asyncio", daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine):
+        """Schedule a coroutine on the loop and return a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def call(self, callback, *args):
+        """Run a plain callable on the loop thread."""
+        self.loop.call_soon_threadsafe(callback, *args)
+
+
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+
+
+def shared_event_loop():
+    """Return the process-wide EventLoopThread, starting it on first use."""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            _shared_loop = EventLoopThread()
+        return _shared_loop
+
+
+class AsyncSerialReader(SerialReader):
+    """
+    SerialReader with the same polling API (start/stop/get_lines/write_line),
+    served by the shared asyncio loop instead of a thread of its own.
+
+    This is how the Qt app uses the async transport: the Device tab keeps
+    draining lines on its timer, and any number of ports share one thread.
+    """
+
+    def __init__(self, port=None, baudrate=115200, capacity=DEFAULT_CAPACITY, overflow=DROP_OLDEST):
+        super().__init__(port, baudrate, capacity, overflow)
+        self.connection = None
+
+    def is_connected(self):
+        """Return True when the serial port is currently open."""
+        return self.connection is not None and self.connection.is_open()
+
+    def start(self, port=None):
+        """Open the serial port on the shared event loop."""
+        if port is not None:
+            self.port = port
+        if not self.port:
+            raise ValueError("No serial port selected.")
+        if self.is_connected():
+            return
+        self.connection = shared_event_loop().run(self._open()).result(timeout=OPEN_TIMEOUT)
+
+    async def _open(self):
+        connection = await AsyncSerialConnection.open(self.port, self.baudrate)
+        splitter = LineSplitter()
+
+        def receive(data):
+            lines = splitter.feed(data)
+            if lines:
+                self.buffer.extend(lines)
+
+        def closed(future):
+            if future.result() is not None:
+                self.buffer.put(f"[Serial error: {future.result()}]".encode("utf-8"))
+
+        connection.receivers.append(receive)
+        connection.closed.add_done_callback(closed)
+        return connection
+
+    def stop(self):
+        """Close the serial port."""
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            shared_event_loop().run(self._close(connection)).result(timeout=OPEN_TIMEOUT)
+
+    @staticmethod
+    async def _close(connection):
+        connection.close()
+
+    def write_line(self, text):
+        """Send one newline-terminated command to the Pico."""
+        if not self.is_connected():
+            raise RuntimeError("Serial port is not connected.")
+        shared_event_loop().call(self.connection.write, (text + "\n").encode("utf-8"))
+
+
+def create_serial_reader(**kwargs):
+    """Return an AsyncSerialReader where the platform supports it, else a threaded SerialReader."""
+    if asyncio_serial_supported():
+        return AsyncSerialReader(**kwargs)
+    return SerialReader(**kwargs)
@@ -0,0 +1,78 @@
+import math
+
+# Lines printed by run_calibration() in firmware/code.py:
+#   calibration start seconds=20 pins=GP0,GP1
+#   calibration GP0 presses=12 press_max_us=850 press_mean_us=230 releases=12 ...
+#   calibration done
+CALIBRATION_PREFIX = "calibration "
+DEFAULT_CALIBRATION_SECONDS = 20
+
+# The recommended window is the longest bounce seen, widened by this factor
+# to cover bursts that did not show up while calibrating.
+SAFETY_MARGIN = 1.5
+MIN_DEBOUNCE_MS = 1
+
+
+def parse_calibration_line(line):
+    """
+    Parse one calibration line from the Pico console.
+
+    Returns ("start", fields), ("pin", fields), ("done", {}) or None for any
+    other line. Numeric fields are converted to int.
+    """
+    if not line.startswith(CALIBRATION_PREFIX):
+        return None
+    words = line[len(CALIBRATION_PREFIX):].split()
+    if not words:
+        return None
+    if words[0] == "done":
+        return "done", {}
+
+    fields = {}
+    for word in words[1:]:
+        name, _, value = word.partition("=")
+        fields[name] = int(value) if value.isdigit() else value
+    if words[0] == "start":
+        return "start", fields
+    fields["pin"] = words[0]
+    return "pin", fields
+
+
+def recommend_debounce(stats, margin=SAFETY_MARGIN, minimum=MIN_DEBOUNCE_MS):
+    """Return the debounce window in ms for one pin's statistics, or None without samples."""
+    if not stats.get("presses") and not stats.get("releases"):
+        return None
+    worst_us = max(stats.get("press_max_us", 0), stats.get("release_max_us", 0))
+    return max(minimum, math.ceil(worst_us * margin / 1000))
+
+
+class DebounceCalibration:
+    """Collects calibration lines from the serial log into per-pin results."""
+
+    def __init__(self):
+        self.pins = {}
+        self.finished = False
+
+    def feed(self, line):
+        """Consume one serial line. Returns True if it was a calibration line."""
+        parsed = parse_calibration_line(line)
+        if parsed is None:
+            return False
+        kind, fields = parsed
+        if kind == "start":
+            self.pins = {}
+            self.finished = False
+        elif kind == "pin":
+            self.pins[fields["pin"]] = fields
+        else:
+            self.finished = True
+        return True
+
+    def recommendations(self):
+        """Return {pin: debounce_ms} for every pin that was pressed during calibration."""
+        result = {}
+        for pin, stats in self.pins.items():
+            debounce = recommend_debounce(stats)
+            if debounce is not None:
+                result[pin] = debounce
+        return result
@@ -0,0 +1,403 @@
+import json
+import os
+import re
+
+from serial.tools import list_ports
+
+from config.pico_sync import drive_serial, find_circuitpy_drives
+from pico_serial.aio import create_serial_reader
+from pico_serial.protocol import DATA_INTERFACE_MARKER
+
+# Preset assigned to each board, keyed by device_key()
+ASSIGNMENTS_PATH = "config/devices.json"
+
+CONNECTED = "connected"
+AVAILABLE = "available"
+MISSING = "missing"
+
+# USB vendor IDs of the boards the pedal firmware runs on: Raspberry Pi, Adafruit
+CIRCUITPYTHON_VIDS = (0x2E8A, 0x239A)
+# CircuitPython names its serial interfaces "CircuitPython CDC control", "... CDC2 ..."
+CIRCUITPYTHON_INTERFACE_MARKER = "CircuitPython"
+# Key prefix of ports added by hand, which have no stable USB identity
+MANUAL_KEY_PREFIX = "PORT:"
+# USB interface number at the end of a port location: "1-1:1.2" (Linux), "1-1:x.2" (Windows)
+INTERFACE_NUMBER = re.compile(r":(?:\d+|x)\.(\d+)")
+
+
+def device_key(vid, pid, serial_number):
+    """Stable identity of a board: USB VID:PID plus its serial number."""
+    return "{:04X}:{:04X}:{}".format(vid, pid, serial_number.upper())
+
+
+class PedalDevice:
+    """One pedal board: its serial ports, CIRCUITPY drive, log reader and assigned preset."""
+
+    def __init__(self, key, vid, pid, serial_number, description=""):
+        self.key = key
+        self.vid = vid
+        self.pid = pid
+        self.serial_number = serial_number.upper()
+        self.description = description
+        self.console_port = None
+        self.data_port = None
+        self.drive = None
+        self.preset = None
+        self.present = True
+        self.reader = None
+        self.reported_drops = 0
+        # Added by hand with DeviceManager.add_port() rather than found by scan_usb_boards()
+        self.manual = False
+
+    @property
+    def name(self):
+        """Short name for logs: the description and the end of the serial number (or the port)."""
+        return "{} {}".format(self.description or "Pico", self.serial_number[-6:] or self.console_port)
+
+    def is_connected(self):
+        """Return True while the board's console log is being read."""
+        return self.reader is not None and self.reader.is_connected()
+
+    @property
+    def state(self):
+        if self.is_connected():
+            return CONNECTED
+        return AVAILABLE if self.present else MISSING
+
+
+def is_circuitpython_port(port):
+    """True for the serial ports of a CircuitPython board, not any USB serial adapter."""
+    if CIRCUITPYTHON_INTERFACE_MARKER in (port.interface or ""):
+        return True
+    return port.vid in CIRCUITPYTHON_VIDS
+
+
+def port_name_key(name):
+    """Sort key that puts COM9 before COM10."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def interface_number(port):
+    """USB interface number of a serial port, from its location or hardware ID, or None."""
+    for text in (port.location, port.hwid):
+        match = INTERFACE_NUMBER.search(text or "")
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def port_order(port):
+    """Order the ports of one board by USB interface: the console comes before the data port."""
+    number = interface_number(port)
+    return (number is None, number or 0, port_name_key(port.device))
+
+
+def scan_usb_boards(ports=None):
+    """
+    Group the serial ports of CircuitPython boards by USB identity and
+    return {key: PedalDevice}.
+
+    A board with the data port enabled shows up as two ports with the same
+    serial number. Where the interface names are known, the one naming CDC2
+    is the data port. Without them (Windows) the ports are ordered by USB
+    interface number: the console interface comes first. Ports without a USB
+    serial number cannot be told apart across replugs and are skipped; they
+    can still be connected with DeviceManager.add_port().
+    """
+    if ports is None:
+        ports = list_ports.comports()
+    groups = {}
+    for port in ports:
+        if port.vid is None or not port.serial_number or not is_circuitpython_port(port):
+            continue
+        groups.setdefault(device_key(port.vid, port.pid, port.serial_number), []).append(port)
+
+    boards = {}
+    for key, group in sorted(groups.items()):
+        group.sort(key=port_order)
+        first = group[0]
+        board = boards[key] = PedalDevice(key, first.vid, first.pid, first.serial_number, first.product or "")
+        named = any(port.interface for port in group)
+        for port in group:
+            if DATA_INTERFACE_MARKER in (port.interface or ""):
+                board.data_port = port.device
+            elif board.console_port is None:
+                board.console_port = port.device
+            elif not named and board.data_port is None:
+                board.data_port = port.device
+    return boards
+
+
+def scan_drive_serials(drives=None):
+    """
+    Return [(CIRCUITPY drive, USB serial number or None)]. May read
+    boot_out.txt from every drive, so the GUI calls it on a worker thread.
+    """
+    if drives is None:
+        drives = find_circuitpy_drives()
+    return [(drive, drive_serial(drive)) for drive in drives]
+
+
+class DeviceManager:
+    """
+    Registry of pedal boards keyed by USB identity.
+
+    refresh() groups each board's serial ports; scan_drives() and
+    pair_drives() then match the boards to their CIRCUITPY drives. The scan
+    reads the drives, so the GUI runs it on a worker thread. Ports that are
+    not recognized as a board can be added by hand with add_port().
+
+    Console readers of all connected boards share the asyncio loop thread of
+    pico_serial.aio and poll() drains them together, so one GUI timer serves
+    any number of boards. Boards that are unplugged stay listed as missing,
+    with their preset assignment, until they come back.
+    """
+
+    def __init__(self, assignments_path=ASSIGNMENTS_PATH, baudrate=115200):
+        self.assignments_path = assignments_path
+        self.baudrate = baudrate
+        self.assignments = self._load_assignments()
+        self.devices = {}
+        # Keys of the present boards, and the boards and drives of the last pairing
+        self.port_signature = ()
+        self.paired_ports = None
+        self.paired_drives = None
+        # Serial ports that belong to no listed board, for connecting by hand
+        self.other_ports = []
+
+    # ------------------------------------------------------------------
+
+    def _load_assignments(self):
+        if not os.path.exists(self.assignments_path):
+            return {}
+        try:
+            with open(self.assignments_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {str(key): str(name) for key, name in data.items()} if isinstance(data, dict) else {}
+
+    def _save_assignments(self):
+        os.makedirs(os.path.dirname(self.assignments_path) or ".", exist_ok=True)
+        tmp = self.assignments_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.assignments, f, indent=4, sort_keys=True)
+        os.replace(tmp, self.assignments_path)
+
+    # ------------------------------------------------------------------
+
+    def boards(self):
+        """Return every known board, present ones first, in a stable order."""
+        return sorted(self.devices.values(), key=lambda device: (not device.present, device.key))
+
+    def get(self, key):
+        """Return the board with this key, or None."""
+        return self.devices.get(key)
+
+    def connected(self):
+        """Return the boards whose console log is being read."""
+        return [device for device in self.devices.values() if device.is_connected()]
+
+    # ------------------------------------------------------------------
+
+    def refresh(self, ports=None, drives=None):
+        """
+        Rescan serial ports and return (keys that appeared, keys that disappeared).
+
+        Drives are paired right away only when ``drives`` is given; otherwise
+        check pairing_due() and run scan_drives() off the GUI thread.
+        """
+        if ports is None:
+            ports = list_ports.comports()
+        ports = list(ports)
+        boards = scan_usb_boards(ports)
+        names = {port.device for port in ports}
+        added, removed = [], []
+        for key, board in boards.items():
+            device = self.devices.get(key)
+            if device is None:
+                device = self.devices[key] = board
+                device.preset = self.assignments.get(key)
+                added.append(key)
+            elif not device.present:
+                device.present = True
+                added.append(key)
+            device.console_port = board.console_port
+            device.data_port = board.data_port
+        for key, device in self.devices.items():
+            present = device.console_port in names if device.manual else key in boards
+            if device.present and not present:
+                device.present = False
+                device.drive = None
+                self._stop_reader(device)
+                removed.append(key)
+            elif present and not device.present:
+                device.present = True
+                added.append(key)
+
+        claimed = {port for device in self.devices.values() for port in (device.console_port, device.data_port)}
+        self.other_ports = sorted(names - claimed, key=port_name_key)
+        self._update_signature()
+        if drives is not None:
+            self.pair_drives((self.port_signature, scan_drive_serials(drives)))
+        return added, removed
+
+    def add_port(self, port):
+        """
+        List a serial port that scan_usb_boards() does not recognize (no USB
+        serial number, or another vendor ID) as a board, so it can be connected.
+        """
+        key = MANUAL_KEY_PREFIX + port
+        device = self.devices.get(key)
+        if device is None:
+            info = next((found for found in list_ports.comports() if found.device == port), None)
+            device = PedalDevice(
+                key,
+                info.vid if info is not None else None,
+                info.pid if info is not None else None,
+                "",
+                (info.product or "") if info is not None else "",
+            )
+            device.manual = True
+            device.console_port = port
+            device.preset = self.assignments.get(key)
+            self.devices[key] = device
+        device.present = True
+        if port in self.other_ports:
+            self.other_ports.remove(port)
+        self._update_signature()
+        return device
+
+    def _update_signature(self):
+        self.port_signature = tuple(sorted(key for key, device in self.devices.items() if device.present))
+
+    # ------------------------------------------------------------------
+
+    def pairing_due(self):
+        """True when the boards changed since drives were last paired, or one still waits for its drive."""
+        if self.paired_ports != self.port_signature:
+            return True
+        return any(device.present and device.drive is None for device in self.devices.values())
+
+    def scan_drives(self):
+        """
+        Look up the CIRCUITPY drives and their serial numbers for pair_drives().
+
+        Returns None when neither the boards nor the mounted drives changed
+        since the last pairing, so a board whose drive is hidden does not
+        make every refresh read boot_out.txt again. Only reads the manager,
+        so it can run on a worker thread.
+        """
+        ports = self.port_signature
+        drives = tuple(find_circuitpy_drives())
+        if ports == self.paired_ports and drives == self.paired_drives:
+            return None
+        return ports, scan_drive_serials(drives)
+
+    def pair_drives(self, scan):
+        """
+        Match CIRCUITPY drives to boards by USB serial number, taken from
+        sysfs or from the UID CircuitPython writes to boot_out.txt. ``scan``
+        is the result of scan_drives(). Returns the keys of the boards whose
+        drive changed to a new one.
+        """
+        if scan is None:
+            return []
+        self.paired_ports, drive_serials = scan
+        self.paired_drives = tuple(drive for drive, _ in drive_serials)
+        present = [device for device in self.devices.values() if device.present]
+        by_serial = {device.serial_number: device for device in present if device.serial_number}
+        previous = {device.key: device.drive for device in present}
+        for device in present:
+            device.drive = None
+        unmatched = []
+        for drive, serial in drive_serials:
+            device = by_serial.get(serial)
+            if device is not None:
+                device.drive = drive
+            else:
+                unmatched.append(drive)
+        unpaired = [device for device in present if device.drive is None]
+        if len(unpaired) == 1 and len(unmatched) == 1:
+            # Older CircuitPython releases do not write the UID; with one
+            # board and one drive left over they can only belong together.
+            unpaired[0].drive = unmatched[0]
+        return [device.key for device in present if device.drive and device.drive != previous[device.key]]
+
+    # ------------------------------------------------------------------
+
+    def connect(self, key):
+        """Start reading the console log of a board."""
+        device = self.devices.get(key)
+        if device is None or not device.present:
+            raise ValueError(f"Device {key} is not connected.")
+        if not device.console_port:
+            raise ValueError(f"Device {device.name} has no console serial port.")
+        if device.is_connected():
+            return device
+        device.reader = create_serial_reader(port=device.console_port, baudrate=self.baudrate)
+        device.reported_drops = 0
+        device.reader.start()
+        return device
+
+    def disconnect(self, key):
+        """Stop reading the console log of a board."""
+        device = self.devices.get(key)
+        if device is not None:
+            self._stop_reader(device)
+
+    def disconnect_all(self):
+        """Stop every console reader."""
+        for device in self.devices.values():
+            self._stop_reader(device)
+
+    @staticmethod
+    def _stop_reader(device):
+        reader, device.reader = device.reader, None
+        if reader is not None:
+            reader.stop()
+
+    # ------------------------------------------------------------------
+
+    def poll(self):
+        """
+        Drain the console logs of all connected boards at once.
+
+        Returns [(device, lines, lines dropped since the last poll)] for the
+        boards that had anything to report.
+        """
+        batches = []
+        for device in self.devices.values():
+            reader = device.reader
+            if reader is None or not reader.is_connected():
+                continue
+            lines = reader.get_lines()
+            dropped = reader.dropped - device.reported_drops
+            device.reported_drops = reader.dropped
+            if lines or dropped:
+                batches.append((device, lines, dropped))
+        return batches
+
+    # ------------------------------------------------------------------
+
+    def assign_preset(self, key, name):
+        """Remember which preset a board should run; None clears the assignment."""
+        device = self.devices.get(key)
+        if device is None:
+            raise ValueError(f"Unknown device {key}.")
+        device.preset = name
+        if name:
+            self.assignments[key] = name
+        else:
+            self.assignments.pop(key, None)
+        self._save_assignments()
+
+    def forget_preset(self, name):
+        """Drop the assignments of a deleted preset."""
+        keys = [key for key, preset in self.assignments.items() if preset == name]
+        for key in keys:
+            del self.assignments[key]
+            if key in self.devices:
+                self.devices[key].preset = None
+        if keys:
+            self._save_assignments()
@@ -0,0 +1,184 @@
+import importlib.util
+import os
+import struct
+import time
+from collections import deque
+
+from config.firmware_compiler import compile_config, decode_compiled_config
+
+# The message schema lives in the firmware bundle so the board and the app
+# always speak the same protocol; load it from there instead of copying it.
+SHARED_SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "firmware",
+    "lib",
+    "pedal_protocol.py",
+)
+
+
+def _load_shared_schema():
+    spec = importlib.util.spec_from_file_location("pedal_protocol", SHARED_SCHEMA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+schema = _load_shared_schema()
+
+PING = schema.PING
+GET_CONFIG = schema.GET_CONFIG
+SET_CONFIG = schema.SET_CONFIG
+SWITCH_PRESET = schema.SWITCH_PRESET
+STREAM_EVENTS = schema.STREAM_EVENTS
+GET_STATS = schema.GET_STATS
+EVENT = schema.EVENT
+ERROR = schema.ERROR
+RESPONSE_FLAG = schema.RESPONSE_FLAG
+FrameDecoder = schema.FrameDecoder
+encode_frame = schema.encode_frame
+decode_frame = schema.decode_frame
+
+# CircuitPython names the interface of the second CDC port "... CDC2 ..."
+DATA_INTERFACE_MARKER = "CDC2"
+
+
+class ProtocolError(RuntimeError):
+    """Raised when the device answers a request with an ERROR frame."""
+
+
+def find_data_port(ports=None):
+    """Return the device name of the CircuitPython data serial port, or None."""
+    if ports is None:
+        from serial.tools import list_ports
+        ports = list_ports.comports()
+    for port in ports:
+        if DATA_INTERFACE_MARKER in (getattr(port, "interface", None) or ""):
+            return port.device
+    return None
+
+
+def open_protocol_client(port, baudrate=115200, timeout=1.0):
+    """Open the data serial port and return a ProtocolClient for it."""
+    import serial
+    return ProtocolClient(serial.Serial(port, baudrate, timeout=0.05), timeout=timeout)
+
+
+class ProtocolClient:
+    """
+    Request/response client for the framed protocol on the CDC data port.
+
+    ``stream`` is an open pyserial ``Serial`` (or anything with ``read``,
+    ``write`` and ``in_waiting``). Not thread-safe: use it from one thread.
+    """
+
+    def __init__(self, stream, timeout=1.0):
+        self.stream = stream
+        self.timeout = timeout
+        self.decoder = FrameDecoder()
+        self.events = deque()
+        # Requests sent with send(), by sequence number, and their answers so far
+        self.pending = {}
+        self.replies = deque()
+        self._sequence = 0
+
+    # ------------------------------------------------------------------
+
+    def close(self):
+        """Close the underlying serial port."""
+        self.stream.close()
+
+    def _next_sequence(self):
+        self._sequence = (self._sequence + 1) & 0xFF
+        # An unanswered send() from 256 requests ago is not coming back
+        self.pending.pop(self._sequence, None)
+        return self._sequence
+
+    def _read_frames(self):
+        waiting = self.stream.in_waiting
+        data = self.stream.read(waiting or 1)
+        for message_type, sequence, body in self.decoder.feed(data):
+            if message_type == EVENT:
+                self.events.append(struct.unpack(schema.EVENT_FORMAT, body))
+            elif sequence in self.pending:
+                request_type = self.pending.pop(sequence)
+                error = body.decode("utf-8", errors="replace") if message_type == ERROR else None
+                self.replies.append((request_type, error))
+            else:
+                yield message_type, sequence, body
+
+    def request(self, message_type, body=b"", timeout=None):
+        """Send one request and return the body of the matching response."""
+        sequence = self._next_sequence()
+        self.stream.write(encode_frame(message_type, sequence, body))
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+
+        while time.monotonic() < deadline:
+            for reply_type, reply_sequence, reply_body in self._read_frames():
+                if reply_sequence != sequence:
+                    continue
+                if reply_type == ERROR:
+                    raise ProtocolError(reply_body.decode("utf-8", errors="replace"))
+                if reply_type == message_type | RESPONSE_FLAG:
+                    return reply_body
+        raise TimeoutError("No response from device for message type {}.".format(message_type))
+
+    def send(self, message_type, body=b""):
+        """
+        Send one request without waiting for its answer, which poll_replies()
+        collects later. Returns the sequence number.
+        """
+        sequence = self._next_sequence()
+        self.pending[sequence] = message_type
+        self.stream.write(encode_frame(message_type, sequence, body))
+        return sequence
+
+    def poll_replies(self):
+        """Return (request message type, error text or None) for the send() requests answered so far."""
+        while self.stream.in_waiting:
+            for _ in self._read_frames():
+                pass
+        replies = list(self.replies)
+        self.replies.clear()
+        return replies
+
+    # ------------------------------------------------------------------
+
+    def ping(self, payload=b""):
+        """Round-trip a payload and return the echoed bytes."""
+        return self.request(PING, payload)
+
+    def get_config(self):
+        """Return (settings, entries of HID codes) currently active on the device."""
+        return decode_compiled_config(self.request(GET_CONFIG))
+
+    def set_config(self, config):
+        """Apply a config on the device in RAM, without writing the drive."""
+        self.request(SET_CONFIG, compile_config(config))
+
+    def switch_preset(self, name, wait=True):
+        """
+        Switch to a preset from the device preset bank. With ``wait=False``
+        the frame is only sent; a failure shows up in poll_replies().
+        """
+        if wait:
+            self.request(SWITCH_PRESET, name.encode("utf-8"))
+        else:
+            self.send(SWITCH_PRESET, name.encode("utf-8"))
+
+    def stream_events(self, enabled=True):
+        """Turn unsolicited pedal EVENT frames on or off."""
+        self.request(STREAM_EVENTS, b"\x01" if enabled else b"\x00")
+
+    def get_stats(self):
+        """Return the device counters as a dict."""
+        values = struct.unpack(schema.STATS_FORMAT, self.request(GET_STATS))
+        return dict(zip(schema.STATS_FIELDS, values))
+
+    def poll_events(self):
+        """Return (key index, pressed, ticks_ms) tuples received so far."""
+        while self.stream.in_waiting:
+            for _ in self._read_frames():
+                pass
+        events = list(self.events)
+        self.events.clear()
+        return events
@@ -1,16 +1,114 @@
 import serial
 import threading
-import queue
+from collections import deque
 from serial.tools import list_ports
 
+DROP_OLDEST = "oldest"
+DROP_NEWEST = "newest"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+DEFAULT_CAPACITY = 2000
+# read() returns after this long without data, so stop() is never kept waiting
+READ_TIMEOUT = 0.05
+# A "line" longer than this without a newline is passed on as it is
+MAX_LINE_LENGTH = 64 * 1024
+
+
+class LineBuffer:
+    """
+    Bounded, thread-safe buffer of log lines.
+
+    When full, ``overflow`` decides which line is lost: DROP_OLDEST keeps the
+    most recent output (a live log), DROP_NEWEST keeps the start of a burst.
+    Lost lines are counted in ``dropped``.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, overflow=DROP_OLDEST):
+        if capacity < 1:
+            raise ValueError("Line buffer capacity must be at least 1.")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported overflow policy: {overflow}")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.lines = deque()
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.lines)
+
+    def put(self, line):
+        """Store one line, dropping a line if the buffer is full."""
+        self.extend((line,))
+
+    def extend(self, lines):
+        """Store several lines under a single lock acquisition."""
+        with self.lock:
+            for line in lines:
+                if len(self.lines) >= self.capacity:
+                    self.dropped += 1
+                    if self.overflow == DROP_NEWEST:
+                        continue
+                    self.lines.popleft()
+                self.lines.append(line)
+
+    def get(self):
+        """Return the oldest line, or None if the buffer is empty."""
+        with self.lock:
+            return self.lines.popleft() if self.lines else None
+
+    def drain(self):
+        """Remove and return every buffered line, oldest first."""
+        with self.lock:
+            lines = list(self.lines)
+            self.lines.clear()
+        return lines
+
+
+class LineSplitter:
+    """
+    Splits a byte stream into lines as chunks arrive.
+
+    Bytes are collected in one reusable bytearray and lines are sliced out
+    through a memoryview; they stay undecoded bytes until a consumer reads them.
+    """
+
+    def __init__(self, max_line=MAX_LINE_LENGTH):
+        self.max_line = max_line
+        self.pending = bytearray()
+
+    def feed(self, data):
+        """Add a chunk and return the complete lines it finished, without newlines."""
+        pending = self.pending
+        pending += data
+        lines = []
+        start = 0
+        with memoryview(pending) as view:
+            end = pending.find(b"\n")
+            while end >= 0:
+                if end > start:
+                    lines.append(bytes(view[start:end]))
+                start = end + 1
+                end = pending.find(b"\n", start)
+        if start:
+            del pending[:start]
+        if len(pending) > self.max_line:
+            lines.append(bytes(pending))
+            pending.clear()
+        return lines
+
+
+def decode_line(line):
+    """Decode one raw line from the Pico; returns "" for blank lines."""
+    return line.decode("utf-8", errors="ignore").strip()
+
 
 class SerialReader:
     """Background serial reader that continuously polls data from the Pico."""
 
-    def __init__(self, port=None, baudrate=115200):
+    def __init__(self, port=None, baudrate=115200, capacity=DEFAULT_CAPACITY, overflow=DROP_OLDEST):
         self.port = port
         self.baudrate = baudrate
-        self.q = queue.Queue()
+        self.buffer = LineBuffer(capacity, overflow)
         self.running = False
         self.thread = None
         self.ser = None
@@ -39,7 +137,7 @@ class SerialReader:
         if self.is_connected():
             return
 
-        self.ser = serial.Serial(self.port, self.baudrate, timeout=1)
+        self.ser = serial.Serial(self.port, self.baudrate, timeout=READ_TIMEOUT)
         self.running = True
         self.thread = threading.Thread(target=self._read_loop, daemon=True)
         self.thread.start()
@@ -47,36 +145,71 @@ class SerialReader:
     # ------------------------------------------------------------------
 
     def _read_loop(self):
-        """Continuously read lines from the serial port and push them to the queue."""
+        """Read whatever has arrived in bulk and push complete lines to the line buffer."""
+        ser = self.ser
+        splitter = LineSplitter()
         while self.running:
             try:
-                line = self.ser.readline().decode("utf-8", errors="ignore").strip()
-                if line:
-                    self.q.put(line)
+                # Everything already received, or block (up to READ_TIMEOUT) for the next byte.
+                data = ser.read(ser.in_waiting or 1)
             except Exception as e:
-                self.q.put(f"[Serial error: {e}]")
+                if self.running:
+                    self.buffer.put(f"[Serial error: {e}]".encode("utf-8"))
                 self.running = False
+                break
+            if data:
+                lines = splitter.feed(data)
+                if lines:
+                    self.buffer.extend(lines)
 
     # ------------------------------------------------------------------
 
     def stop(self):
         """Stop reading and close the serial port."""
         self.running = False
+        if self.ser and self.ser.is_open and hasattr(self.ser, "cancel_read"):
+            # Wake a read() that is waiting for data instead of sitting out its timeout.
+            self.ser.cancel_read()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=READ_TIMEOUT * 10)
+        self.thread = None
         if self.ser:
             try:
                 if self.ser.is_open:
                     self.ser.close()
             finally:
                 self.ser = None
-        if self.thread and self.thread.is_alive():
-            self.thread.join(timeout=0.5)
-        self.thread = None
+
+    # ------------------------------------------------------------------
+
+    def write_line(self, text):
+        """Send one newline-terminated command to the Pico."""
+        if not self.is_connected():
+            raise RuntimeError("Serial port is not connected.")
+        self.ser.write((text + "\n").encode("utf-8"))
+        self.ser.flush()
 
     # ------------------------------------------------------------------
 
     def get_line(self):
-        """Return the next line from the queue, or None if no data is available."""
-        try:
-            return self.q.get_nowait()
-        except queue.Empty:
-            return None
+        """Return the next non-blank line from the buffer, or None if no data is available."""
+        while True:
+            line = self.buffer.get()
+            if line is None:
+                return None
+            line = decode_line(line)
+            if line:
+                return line
+
+    # ------------------------------------------------------------------
+
+    def get_lines(self):
+        """Return every pending non-blank line at once, oldest first."""
+        return [line for line in map(decode_line, self.buffer.drain()) if line]
+
+    # ------------------------------------------------------------------
+
+    @property
+    def dropped(self):
+        """Number of lines lost because the buffer was full."""
+        return self.buffer.dropped